@@ -0,0 +1,128 @@
+# benchmarks/bench_entity_resolution.py
+#
+# Measures nlp.entity_resolution.cluster_names: pairwise precision and
+# recall on a labeled sample of company names, and throughput on synthetic
+# names (random base names in several suffix/case/typo variants, so the
+# true clusters are known there too). No network or database needed.
+#
+#   python -m benchmarks.bench_entity_resolution
+#   python -m benchmarks.bench_entity_resolution --synthetic 1000000 --threshold 0.75
+#
+# --exhaustive also compares every pair of keys without blocking, to show
+# how many true matches the LSH candidates miss (only sensible for small inputs).
+
+import os
+import csv
+import json
+import time
+import random
+import string
+import argparse
+from itertools import combinations
+from nlp.entity_resolution import (
+    cluster_names, normalize_company_name, match_key, similarity, RESOLVE_THRESHOLD,
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+LABELED_PATH = os.path.join(FIXTURES_DIR, "company_names_labeled.csv")
+
+SUFFIXES    = [", Inc.", " Inc", " INC", " Corp.", ", LLC", " Ltd", " AG", ""]
+DESCRIPTORS = [" Therapeutics", " Pharmaceuticals", " Biosciences", " Bio", ""]
+
+def load_labeled(path):
+    with open(path, encoding="utf-8", newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    return [r['name'] for r in rows], [r['entity'] for r in rows]
+
+def typo(word, rng):
+    i = rng.randrange(1, len(word))
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+def synthetic_names(count, seed=7):
+    """(names, labels): ~count names in clusters of 1-4 variants of a random base name."""
+    rng = random.Random(seed)
+    names, labels = [], []
+    entity = 0
+    while len(names) < count:
+        base = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10))).capitalize()
+        descriptor = rng.choice(DESCRIPTORS)
+        for _ in range(rng.randint(1, 4)):
+            variant = f"{base}{descriptor}{rng.choice(SUFFIXES)}"
+            roll = rng.random()
+            if roll < 0.2:
+                variant = variant.upper()
+            elif roll < 0.3:
+                variant = f"{typo(base, rng)}{descriptor}"
+            names.append(variant)
+            labels.append(entity)
+        entity += 1
+    return names[:count], labels[:count]
+
+def pairwise_scores(representatives, labels):
+    """Precision/recall/F1 over the pairs of names placed in the same cluster."""
+    def pairs(assignment):
+        groups = {}
+        for i, g in enumerate(assignment):
+            groups.setdefault(g, []).append(i)
+        return {p for members in groups.values() for p in combinations(members, 2)}
+    predicted, actual = pairs(representatives), pairs(labels)
+    true_pos = len(predicted & actual)
+    precision = true_pos / len(predicted) if predicted else 1.0
+    recall    = true_pos / len(actual) if actual else 1.0
+    return {
+        'pairs_predicted': len(predicted),
+        'pairs_actual':    len(actual),
+        'precision':       round(precision, 4),
+        'recall':          round(recall, 4),
+        'f1':              round(2 * precision * recall / (precision + recall), 4)
+                           if precision + recall else 0.0,
+    }
+
+def exhaustive_recall_gap(names, threshold):
+    """Similar key pairs an all-pairs comparison finds that are not in the same cluster."""
+    keys = sorted({match_key(normalize_company_name(n)) for n in names} - {''})
+    found = cluster_names(keys, threshold=threshold)
+    return sum(1 for i, j in combinations(range(len(keys)), 2)
+               if found[i] != found[j] and similarity(keys[i], keys[j]) >= threshold)
+
+def bench(label, names, labels, threshold, exhaustive):
+    stats = {}
+    start = time.perf_counter()
+    representatives = cluster_names(names, threshold=threshold, stats=stats)
+    elapsed = time.perf_counter() - start
+    result = dict(
+        sample=label, threshold=threshold, seconds=round(elapsed, 3),
+        names_per_s=round(len(names) / elapsed) if elapsed else None,
+        **stats, **pairwise_scores(representatives, labels),
+    )
+    if exhaustive:
+        result['missed_by_blocking'] = exhaustive_recall_gap(names, threshold)
+    return result
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark company entity resolution")
+    ap.add_argument("--labeled", default=LABELED_PATH, help="CSV with name,entity columns")
+    ap.add_argument("--synthetic", type=int, default=100000, help="synthetic names (0 to skip)")
+    ap.add_argument("--threshold", type=float, default=RESOLVE_THRESHOLD)
+    ap.add_argument("--exhaustive", action="store_true")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    results = [bench("labeled", *load_labeled(args.labeled), args.threshold, args.exhaustive)]
+    if args.synthetic:
+        results.append(bench(f"synthetic-{args.synthetic}", *synthetic_names(args.synthetic),
+                             args.threshold, args.exhaustive))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        line = (f"{r['sample']:<20} {r['names']:>8} names  {r['seconds']:8.3f} s  "
+                f"({r['names_per_s']:,} names/s, {r['comparisons']:,} comparisons)  "
+                f"precision {r['precision']:.3f}  recall {r['recall']:.3f}  f1 {r['f1']:.3f}")
+        if 'missed_by_blocking' in r:
+            line += f"  missed by blocking {r['missed_by_blocking']}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_fierce_parse.py
+#
+# Times ingestion.fierce_parser.parse_tracker against saved tracker HTML,
+# once per BeautifulSoup tree builder. No network or database needed.
+#
+#   python -m benchmarks.bench_fierce_parse
+#   python -m benchmarks.bench_fierce_parse path/to/saved_tracker.html --repeat 20 --scale 50
+#
+# --scale repeats each fixture's sections to simulate a larger page.
+
+import os
+import re
+import json
+import time
+import argparse
+from ingestion.fierce_parser import parse_tracker
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+PARSERS      = ["lxml", "html.parser"]
+
+def scale_html(html, factor):
+    """Repeat the article body `factor` times (enough to stress the parser)."""
+    if factor <= 1:
+        return html
+    m = re.search(r'(<h2>.*)(</div>\s*</body>)', html, re.S)
+    if not m:
+        return html
+    return html[:m.start(1)] + m.group(1) * factor + html[m.start(2):]
+
+def bench(html, parser, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        entries = parse_tracker(html, "2025", parser=parser)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        'parser':      parser,
+        'entries':     len(entries),
+        'bytes':       len(html),
+        'best_s':      round(best, 6),
+        'mean_s':      round(sum(timings) / len(timings), 6),
+        'entries_per_s': round(len(entries) / best) if best else None,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark Fierce tracker parsing")
+    ap.add_argument("fixtures", nargs="*", help="saved tracker HTML files (default: benchmarks/fixtures)")
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--scale", type=int, default=1)
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    paths = args.fixtures or sorted(
+        os.path.join(FIXTURES_DIR, f) for f in os.listdir(FIXTURES_DIR) if f.endswith(".html")
+    )
+    results = []
+    for path in paths:
+        with open(path, encoding="utf-8") as fh:
+            html = scale_html(fh.read(), args.scale)
+        for parser in PARSERS:
+            results.append(dict(fixture=os.path.basename(path), **bench(html, parser, args.repeat)))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(f"{r['fixture']:<32} {r['parser']:<12} {r['entries']:>6} entries  "
+              f"best {r['best_s'] * 1000:8.2f} ms  ({r['entries_per_s']:,} entries/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_import_time.py
+#
+# Startup budget for the pipeline entry points. Each module is imported in a
+# fresh interpreter with `python -X importtime`, best of --repeat runs, and
+# checked against its budget and against the heavy packages it must not pull
+# in at import time (they belong to the stage that uses them, see
+# pipeline/clients.py). No network, database or API keys needed.
+#
+#   python -m benchmarks.bench_import_time
+#   python -m benchmarks.bench_import_time graph.neo4j_loader --repeat 10 --check
+#
+# --check exits non-zero when a module is over budget or imports a forbidden
+# package, so the budget can be enforced in CI or before a deploy.
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages only the stages that call them should load
+HEAVY = ['langchain', 'openai', 'sec_api', 'selenium', 'webdriver_manager', 'neo4j']
+
+# (module, budget in ms or None, packages it must not import). The entry
+# points leave SQLAlchemy and db.session to the code that queries; the modules
+# that query at their core pay SQLAlchemy's own ~300 ms import.
+TARGETS = [
+    ('main',                   150, HEAVY),
+    ('pipeline.runner',        150, HEAVY),
+    ('db.canonical',           600, HEAVY),
+    ('graph.neo4j_loader',     600, [p for p in HEAVY if p != 'neo4j']),
+    ('graph.bulk_export',      600, HEAVY),
+    ('ingestion.formd_secapi', 650, HEAVY),
+    ('ingestion.crunchbase',   650, HEAVY),
+    ('ingestion.fierce_layoff', 900, HEAVY),
+    ('nlp.layoff_extractor',   500, HEAVY),
+]
+
+LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def importtime_lines(statement):
+    """(self us, cumulative us, depth, module) per import made by a fresh interpreter."""
+    env = dict(os.environ)
+    # db.session builds its engine (without connecting) at import, so any URL will do
+    env.setdefault('DATABASE_URL', 'postgresql+psycopg2://bench@localhost/bench')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        errors = [l for l in proc.stderr.strip().splitlines() if not l.startswith('import time:')]
+        raise RuntimeError(f"{statement!r} failed: {errors[-1] if errors else proc.returncode}")
+    return [(int(m[1]), int(m[2]), len(m[3]), m[4])
+            for m in map(LINE_RE.match, proc.stderr.splitlines()) if m]
+
+def import_profile(module, startup):
+    """
+    (total ms, {top-level package: self ms}, set of loaded packages) for one
+    cold import, leaving out the modules in `startup` that every interpreter loads.
+    """
+    total, by_package = 0, {}
+    for self_us, cumulative_us, depth, name in importtime_lines(f'import {module}'):
+        if name in startup:
+            continue
+        if depth == 1:  # imported by the -c statement itself; cumulative covers the rest
+            total += cumulative_us
+        package = name.split('.')[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    return total / 1000, {p: us / 1000 for p, us in by_package.items()}, set(by_package)
+
+def bench(module, budget, forbidden, repeat, startup):
+    runs = [import_profile(module, startup) for _ in range(repeat)]
+    ms, by_package, loaded = min(runs, key=lambda r: r[0])
+    heaviest = sorted(by_package.items(), key=lambda p: -p[1])[:5]
+    return {
+        'module':    module,
+        'ms':        round(ms, 1),
+        'budget_ms': budget,
+        'over':      budget is not None and ms > budget,
+        'forbidden': sorted(p for p in forbidden if p in loaded),
+        'heaviest':  [(p, round(t, 1)) for p, t in heaviest],
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure import time of the pipeline entry points")
+    ap.add_argument("modules", nargs="*", help="modules to measure (default: all targets)")
+    ap.add_argument("--repeat", type=int, default=5, help="cold imports per module; the best counts")
+    ap.add_argument("--check", action="store_true", help="exit 1 if any module breaks its budget")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    targets = [t for t in TARGETS if not args.modules or t[0] in args.modules]
+    targets += [(m, None, HEAVY) for m in args.modules if m not in {t[0] for t in TARGETS}]
+    startup = {line[3] for line in importtime_lines('pass')}
+    results = [bench(module, budget, forbidden, args.repeat, startup)
+               for module, budget, forbidden in targets]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            status = "OVER" if r['over'] else "ok"
+            line = f"{r['module']:<24} {r['ms']:8.1f} ms  (budget {r['budget_ms'] or '-'} ms, {status})"
+            if r['forbidden']:
+                line += f"  imports {', '.join(r['forbidden'])}"
+            print(line)
+            print("    " + ", ".join(f"{p} {t:.1f} ms" for p, t in r['heaviest']))
+
+    failed = [r for r in results if r['over'] or r['forbidden']]
+    if args.check and failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
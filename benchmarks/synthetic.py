@@ -0,0 +1,351 @@
+# benchmarks/synthetic.py
+#
+# Deterministic synthetic data for benchmarks/bench_pipeline.py, and stand-ins
+# for the network clients registered in pipeline/clients.py that serve it.
+# Every record is derived from (seed, index) on demand, so a 10M-row run
+# needs no pregenerated data and two runs with the same seed see exactly the
+# same input.
+#
+#   data = SyntheticData(scale=100000, seed=1)
+#   data.install()        # fierce_http, sec_query, sec_extractor, crunchbase_http
+#   recorder = RecordingDriver()
+#   clients.register('neo4j_driver', lambda: recorder)
+
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from datetime import date, timedelta
+from urllib.parse import urlparse
+from pipeline import clients
+
+SYLLABLES = [
+    'ac', 'al', 'am', 'ar', 'ba', 'be', 'bi', 'ca', 'ce', 'co', 'da', 'de', 'di', 'el',
+    'en', 'ex', 'ge', 'ha', 'in', 'ka', 'la', 'le', 'li', 'lo', 'ma', 'me', 'mi', 'na',
+    'ne', 'no', 'or', 'pa', 'ra', 're', 'ri', 'sa', 'ta', 'te', 'va', 'vi', 'xa', 'zo',
+]
+DESCRIPTORS  = ['Therapeutics', 'Pharmaceuticals', 'Biosciences', 'Bio', 'Medicines', 'Genomics', '']
+# How the same company is written by the SEC and the tracker
+ISSUER_FORMS = ['{} INC', '{}, Inc.', '{} CORP /DE/', '{} LLC', '{}']
+SERIES       = ['seed', 'series_a', 'series_b', 'series_c', 'series_d']
+MONTHS       = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+                'September', 'October', 'November', 'December']
+
+TRACKER_URL   = "https://bench.invalid/tracker/p{page:05d}/layoff-tracker-{year}"
+ENTRIES_PER_PAGE = 2000   # tracker pages are split so no single page gets huge
+FILINGS_PER_DAY  = 1000   # keeps a weekly backfill window under the search API cap
+FORMD_START      = date(2020, 1, 1)
+# Base names are NAME_SYLLABLES syllables; the multiplier is coprime with the
+# name space, so indexes below it map to distinct names
+NAME_SYLLABLES   = 5
+NAME_SPACE       = len(SYLLABLES) ** NAME_SYLLABLES
+NAME_MULTIPLIER  = 2654435761
+
+def _rng(seed, kind, i):
+    """A Random for record i of one kind, independent of generation order."""
+    digest = hashlib.blake2b(f"{seed}:{kind}:{i}".encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, 'big'))
+
+class SyntheticData:
+    """
+    `scale` companies, `scale` layoff entries and `scale` Form D filings,
+    with Crunchbase profiles (0-3 rounds, 1-3 investors each from a pool of
+    scale/20) for every company. Sources name the same companies differently
+    so the name resolution has real work to do.
+    """
+    def __init__(self, scale: int, seed: int = 1):
+        self.scale     = scale
+        self.seed      = seed
+        self.investors = max(10, scale // 20)
+        self.pages     = -(-scale // ENTRIES_PER_PAGE)
+        self.days      = -(-scale // FILINGS_PER_DAY)
+        self.html_bytes   = 0
+        self.stub_seconds = 0.0   # spent generating responses, to tell apart from pipeline time
+        self._lock        = threading.Lock()
+
+    def serve(self, fn, *args):
+        """Call a generator method on behalf of a stand-in client, timing it into stub_seconds."""
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.stub_seconds += time.perf_counter() - start
+
+    # -- entities ------------------------------------------------------------
+
+    def company_base(self, k: int) -> str:
+        """A distinct base name per index: k scrambled, then spelled in SYLLABLES."""
+        n = (k * NAME_MULTIPLIER + self.seed) % NAME_SPACE
+        parts = []
+        for _ in range(NAME_SYLLABLES):
+            n, digit = divmod(n, len(SYLLABLES))
+            parts.append(SYLLABLES[digit])
+        return ''.join(parts).capitalize()
+
+    def company_name(self, k: int) -> str:
+        descriptor = DESCRIPTORS[_rng(self.seed, 'descriptor', k).randrange(len(DESCRIPTORS))]
+        return f"{self.company_base(k)} {descriptor}".strip()
+
+    def investor_name(self, j: int) -> str:
+        return f"{self.company_base(j + self.scale).replace('a', 'o', 1)} Capital"
+
+    # -- Fierce tracker pages ------------------------------------------------
+
+    def tracker_urls(self) -> list:
+        return [TRACKER_URL.format(page=p, year=2000 + p % 26) for p in range(self.pages)]
+
+    def layoff_entry(self, i: int) -> str:
+        rng = _rng(self.seed, 'layoff', i)
+        name = self.company_name(rng.randrange(self.scale))
+        month = rng.randrange(12)
+        count, pct = rng.randrange(5, 2000), rng.randrange(3, 60)
+        # Always states one count and one percentage, so the regex path
+        # extracts it and no LLM call is ever needed
+        return (f"<p><strong>{MONTHS[month]} {rng.randrange(1, 29)} - {name}:</strong> "
+                f"The company is cutting {count:,} employees, or {pct}% of its workforce. "
+                f"<a href=\"https://bench.invalid/story/{i}\">Story</a></p>")
+
+    def tracker_page(self, page: int) -> str:
+        lo = page * ENTRIES_PER_PAGE
+        hi = min(lo + ENTRIES_PER_PAGE, self.scale)
+        parts = ['<html><body><div class="article-body">']
+        per_month = -(-(hi - lo) // 12)
+        for m, month in enumerate(reversed(MONTHS)):
+            parts.append(f"<h2>{month}</h2>")
+            parts += [self.layoff_entry(i) for i in range(lo + m * per_month,
+                                                          min(lo + (m + 1) * per_month, hi))]
+        parts.append('</div></body></html>')
+        html = '\n'.join(parts)
+        with self._lock:
+            self.html_bytes += len(html)
+        return html
+
+    # -- SEC Form D ----------------------------------------------------------
+
+    def formd_range(self):
+        """(start, end) ISO dates spanning every filing."""
+        return FORMD_START.isoformat(), (FORMD_START + timedelta(days=self.days - 1)).isoformat()
+
+    def filing(self, i: int) -> dict:
+        rng = _rng(self.seed, 'filing', i)
+        k = rng.randrange(self.scale)
+        cik = 1_000_000 + k
+        accession = f"{9_000_000_000 + i // 1_000_000:010d}-{i // 10_000 % 100:02d}-{i % 10_000:06d}"
+        filed = FORMD_START + timedelta(days=i // FILINGS_PER_DAY)
+        return {
+            'accessionNo':  accession,
+            'nameOfIssuer': ISSUER_FORMS[rng.randrange(len(ISSUER_FORMS))].format(
+                self.company_base(k).upper() if rng.random() < 0.5 else self.company_name(k)),
+            'linkToHtml':   f"https://bench.invalid/edgar/data/{cik}/{accession.replace('-', '')}/{i}.html",
+            'filedAt':      f"{filed.isoformat()}T16:00:00-04:00",
+        }
+
+    def formd_extract(self, url: str) -> dict:
+        i = int(url.rsplit('/', 1)[-1].split('.')[0])
+        rng = _rng(self.seed, 'extract', i)
+        first_sale = FORMD_START + timedelta(days=i // FILINGS_PER_DAY - rng.randrange(30))
+        return {'entity': {
+            'offeringAmount':  {'value': str(rng.randrange(1, 500) * 100_000)},
+            'dateOfFirstSale': first_sale.isoformat(),
+        }}
+
+    def search_filings(self, query: dict) -> dict:
+        m = re.search(r'filedAt:\[(\S+) TO (\S+)\]', query['query']['query_string']['query'])
+        start = max((date.fromisoformat(m[1]) - FORMD_START).days, 0)
+        end   = min((date.fromisoformat(m[2]) - FORMD_START).days, self.days - 1)
+        lo, hi = start * FILINGS_PER_DAY, min((end + 1) * FILINGS_PER_DAY, self.scale)
+        total = max(0, hi - lo)
+        offset, size = int(query['from']), int(query['size'])
+        # Newest first, as the query sorts on filedAt desc
+        indexes = range(hi - 1 - offset, max(hi - 1 - offset - size, lo - 1), -1)
+        # Like sec-api, large totals are reported as a lower bound at the paging cap
+        reported = {'value': total, 'relation': 'eq'} if total < 10000 else {'value': 10000, 'relation': 'gte'}
+        return {'total': reported, 'filings': [self.filing(i) for i in indexes]}
+
+    # -- Crunchbase ----------------------------------------------------------
+
+    def crunchbase_uuid(self, name: str) -> str:
+        return hashlib.md5(f"{self.seed}:{name}".encode()).hexdigest()
+
+    def crunchbase_details(self, uuid: str) -> dict:
+        rng = _rng(self.seed, 'cb', uuid)
+        return {'data': {'properties': {
+            'homepage_url': f"https://{uuid[:12]}.bench.invalid",
+            'primary_role': 'company',
+            'founded_on':   f"{rng.randrange(1990, 2024)}-01-01",
+        }}}
+
+    def crunchbase_rounds(self, uuid: str) -> dict:
+        rng = _rng(self.seed, 'cb_rounds', uuid)
+        rounds = []
+        for r in range(rng.randrange(4)):
+            investors = [self.investor_name(rng.randrange(self.investors))
+                         for _ in range(rng.randrange(1, 4))]
+            rounds.append({
+                'uuid': f"{uuid}-{r}",
+                'properties': {
+                    'announced_on':      f"{rng.randrange(2010, 2025)}-{rng.randrange(1, 13):02d}-01",
+                    'series':            SERIES[r],
+                    'money_raised_usd':  rng.randrange(1, 300) * 1_000_000,
+                    'short_description': f"{SERIES[r]} round",
+                },
+                'relationships': {'investors': {'items': [{'properties': {'name': n}} for n in investors]}},
+            })
+        return {'data': rounds}
+
+    # -- client stand-ins ----------------------------------------------------
+
+    def install(self):
+        """Register the stand-ins in place of the real network clients."""
+        # Import the modules that register the real providers first; importing
+        # one later would re-register its provider over the stand-in
+        import ingestion.fierce_layoff, ingestion.formd_secapi, ingestion.crunchbase  # noqa: F401
+        clients.register('fierce_http',     lambda: FakeFierceSession(self))
+        clients.register('sec_query',       lambda: FakeQueryApi(self))
+        clients.register('sec_extractor',   lambda: FakeExtractorApi(self))
+        clients.register('crunchbase_http', lambda: FakeCrunchbaseSession(self))
+
+class FakeResponse:
+    def __init__(self, status_code=200, text='', payload=None, headers=None):
+        self.status_code = status_code
+        self.text        = text
+        self.headers     = headers or {}
+        self._payload    = payload
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+class FakeFierceSession:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, url, headers=None, timeout=None):
+        page = int(re.search(r'/p(\d+)/', url)[1])
+        return FakeResponse(text=self.data.serve(self.data.tracker_page, page), headers={'ETag': f'"{page}"'})
+
+class FakeQueryApi:
+    def __init__(self, data):
+        self.data = data
+
+    def get_filings(self, query):
+        return self.data.serve(self.data.search_filings, query)
+
+class FakeExtractorApi:
+    def __init__(self, data):
+        self.data = data
+
+    def get_extracted_data(self, url):
+        return self.data.serve(self.data.formd_extract, url)
+
+class FakeCrunchbaseSession:
+    def __init__(self, data):
+        self.data = data
+
+    def request(self, method, url, json=None, timeout=None):
+        path = urlparse(url).path
+        if method == 'POST':
+            name = json['query']['values'][0]
+            items = [{'uuid': self.data.serve(self.data.crunchbase_uuid, name)}]
+            return FakeResponse(payload={'data': {'items': items}})
+        uuid = path.split('/')[4]
+        if path.endswith('/funding_rounds'):
+            return FakeResponse(payload=self.data.serve(self.data.crunchbase_rounds, uuid))
+        return FakeResponse(payload=self.data.serve(self.data.crunchbase_details, uuid))
+
+# -- Neo4j stand-in ------------------------------------------------------------
+
+class _Result:
+    def __init__(self, records=()):
+        self.records = list(records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+    def consume(self):
+        return None
+
+class RecordingDriver:
+    """
+    Neo4j driver stand-in for load_to_neo4j: accepts every statement,
+    encodes its parameters (roughly the serialization cost of a Bolt
+    round trip) and records statement, row and byte counts per query. Index
+    checks report every index ONLINE; the load generation (graph/queries.py)
+    is counted per driver.
+    """
+    def __init__(self):
+        self.statements = {}   # first query line -> [statements, rows, bytes]
+        self.generation = 0
+
+    def session(self, **kwargs):
+        return RecordingSession(self)
+
+    def close(self):
+        pass
+
+    def record(self, query, params):
+        if query.lstrip().startswith('SHOW INDEXES'):
+            return _Result({'name': n, 'state': 'ONLINE'} for n in params.get('names', []))
+        if 'GraphMeta' in query:
+            if query.lstrip().startswith('MERGE'):
+                self.generation += 1
+            return _Result([{'generation': self.generation}] if self.generation else [])
+        encoded = json.dumps(params, default=str)
+        key = next((line.strip() for line in query.strip().splitlines()
+                    if not line.startswith('UNWIND')), query.strip())[:80]
+        stats = self.statements.setdefault(key, [0, 0, 0])
+        stats[0] += 1
+        stats[1] += len(params.get('rows', ())) or 1
+        stats[2] += len(encoded)
+        return _Result()
+
+    def summary(self) -> dict:
+        return {
+            'statements': sum(s[0] for s in self.statements.values()),
+            'rows':       sum(s[1] for s in self.statements.values()),
+            'bytes':      sum(s[2] for s in self.statements.values()),
+        }
+
+class RecordingSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None, **params):
+        return self.driver.record(query, {**(parameters or {}), **params})
+
+    def execute_write(self, fn, *args, **kwargs):
+        return fn(self, *args, **kwargs)
+
+    def begin_transaction(self):
+        return RecordingTransaction(self)
+
+    def close(self):
+        pass
+
+class RecordingTransaction:
+    def __init__(self, session):
+        self.run = session.run
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        pass
@@ -1,6 +1,8 @@
 from db.session import engine
 from db.models import Base
+from db.migrations import apply_migrations
 
 if __name__ == "__main__":
     Base.metadata.create_all(bind=engine)
-    print("Postgres tables created.")
\ No newline at end of file
+    apply_migrations(engine)
+    print("Postgres tables created.")
@@ -0,0 +1,160 @@
+# db/bulk.py
+#
+# Buffered, set-based write path shared by the ingesters. Rows are collected
+# per table and flushed in batches with PostgreSQL INSERT ... ON CONFLICT,
+# and company/investor names are resolved to ids in bulk and remembered for
+# the rest of the run, instead of one query-then-commit per row.
+
+import os
+from collections import defaultdict
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from db.models import Company, Investor
+from nlp.entity_resolution import normalize_company_name
+from dotenv import load_dotenv
+
+load_dotenv()
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+class BulkWriter:
+    """
+    Buffers inserts for one session. Nothing is committed here: callers flush()
+    and commit at their own batch boundaries.
+    """
+    def __init__(self, session, batch_size: int = BULK_BATCH_SIZE):
+        self.session      = session
+        self.batch_size   = batch_size
+        self.company_ids  = {}   # name -> canonical company_id, for this run
+        self.investor_ids = {}   # name -> investor_id, for this run
+        self.buffers      = defaultdict(list)
+        self.conflicts    = {}
+        self.inserted     = defaultdict(int)
+
+    # -- name -> id resolution ------------------------------------------------
+
+    def _resolve(self, model, id_column, names, known):
+        missing = list({n for n in names if n and n not in known})
+        for chunk in chunks(missing, self.batch_size):
+            created = self.session.execute(
+                pg_insert(model)
+                .values([{'name': n} for n in chunk])
+                .on_conflict_do_nothing(index_elements=['name'])
+                .returning(model.name, id_column)
+            ).all()
+            known.update(created)
+            existing = [n for n in chunk if n not in known]
+            if existing:
+                known.update(self.session.execute(
+                    select(model.name, id_column).where(model.name.in_(existing))
+                ).all())
+        return {n: known[n] for n in names if n}
+
+    def company_ids_for(self, names) -> dict:
+        """
+        Map each name to its canonical company_id (see db/canonical.py). A new
+        name becomes an alias of the canonical company with the same
+        normalized name if there is one, else a new canonical company.
+        """
+        known = self.company_ids
+        canonical_of = func.coalesce(Company.canonical_id, Company.company_id)
+        missing = list({n for n in names if n and n not in known})
+        for chunk in chunks(missing, self.batch_size):
+            keys = {n: normalize_company_name(n) for n in chunk}
+            # Lowest id first so that, with duplicates, the oldest row wins
+            by_key = dict(self.session.execute(
+                select(Company.name_key, Company.company_id)
+                .where(Company.name_key.in_(set(keys.values())), Company.canonical_id.is_(None))
+                .order_by(Company.company_id.desc())
+            ).all())
+            created = self.session.execute(
+                pg_insert(Company)
+                .values([{'name': n, 'name_key': keys[n], 'canonical_id': by_key.get(keys[n])}
+                         for n in chunk])
+                .on_conflict_do_nothing(index_elements=['name'])
+                .returning(Company.name, canonical_of)
+            ).all()
+            known.update(created)
+            existing = [n for n in chunk if n not in known]
+            if existing:
+                known.update(self.session.execute(
+                    select(Company.name, canonical_of).where(Company.name.in_(existing))
+                ).all())
+        return {n: known[n] for n in names if n}
+
+    def company_id(self, name) -> int:
+        return self.company_ids_for([name])[name]
+
+    def investor_ids_for(self, names) -> dict:
+        """Map each name to its investor_id, creating missing investors."""
+        return self._resolve(Investor, Investor.investor_id, names, self.investor_ids)
+
+    # -- buffered inserts -----------------------------------------------------
+
+    def on_conflict(self, model, index_elements=None, update=None):
+        """
+        Configure conflict handling for model: DO NOTHING by default, or
+        DO UPDATE of the `update` columns when the row matches index_elements.
+        """
+        self.conflicts[model] = (index_elements, update)
+
+    def insert_statement(self, model):
+        stmt = pg_insert(model)
+        index_elements, update = self.conflicts.get(model, (None, None))
+        if update:
+            set_ = {col: stmt.excluded[col] for col in update}
+            if 'updated_at' in model.__table__.c:
+                # Core upserts bypass the ORM onupdate; keep incremental sync aware
+                set_['updated_at'] = func.now()
+            return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+        return stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+    def add(self, model, row: dict):
+        buf = self.buffers[model]
+        buf.append(row)
+        if len(buf) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model=None):
+        """Write buffered rows (of one model, or all) and count the rows actually inserted."""
+        for m in ([model] if model is not None else list(self.buffers)):
+            rows = self.buffers.pop(m, [])
+            if not rows:
+                continue
+            pk = m.__table__.primary_key.columns.values()[0]
+            returned = self.session.execute(self.insert_statement(m).returning(pk), rows).all()
+            self.inserted[m] += len(returned)
+
+    def insert_returning(self, model, rows: list, *columns):
+        """
+        Insert rows immediately and return `columns` for each inserted (or
+        updated) row in parameter order. Rows skipped by DO NOTHING are absent,
+        so include a key column when a conflict is possible.
+        """
+        if not rows:
+            return []
+        stmt = self.insert_statement(model).returning(*columns, sort_by_parameter_order=True)
+        return self.session.execute(stmt, rows).all()
+
+    # -- set-based dedup ------------------------------------------------------
+
+    def existing_keys(self, model, key_columns, company_ids, **filters) -> set:
+        """Natural-key tuples already stored for the given companies, in one query."""
+        cols = [getattr(model, c) for c in key_columns]
+        keys = set()
+        for chunk in chunks(list(set(company_ids)), self.batch_size):
+            stmt = select(*cols).where(model.company_id.in_(chunk)).filter_by(**filters)
+            keys.update(tuple(r) for r in self.session.execute(stmt))
+        return keys
+
+    def existing_source_keys(self, model, source_keys) -> set:
+        """The subset of source_keys already stored in model, in one query per batch."""
+        found = set()
+        for chunk in chunks([k for k in set(source_keys) if k], self.batch_size):
+            found.update(self.session.execute(
+                select(model.source_key).where(model.source_key.in_(chunk))
+            ).scalars())
+        return found
@@ -0,0 +1,170 @@
+# db/canonical.py
+#
+# Canonical-company mapping. Every Company row is either canonical
+# (canonical_id IS NULL) or an alias pointing at its canonical row. The
+# ingesters resolve names to canonical ids through BulkWriter, and the graph
+# loader only creates nodes for canonical companies.
+#
+# resolve_companies() clusters the canonical names with
+# nlp.entity_resolution and folds every cluster into its oldest row: layoffs
+# and funding rounds move to the canonical company, the other rows become
+# aliases, and their graph nodes are tombstoned for the next Neo4j sync.
+#
+#   python -m db.canonical [--threshold 0.7] [--dry-run]
+
+import time
+import argparse
+from sqlalchemy import select, update, text
+from db.session import SessionLocal
+from db.models import Company
+from db.bulk import chunks, BULK_BATCH_SIZE
+from nlp.entity_resolution import normalize_company_name, cluster_names, RESOLVE_THRESHOLD
+from pipeline import metrics
+
+# Set-based merge, driven by the company_merges temp table (alias_id -> canonical_id)
+MERGE_STATEMENTS = [
+    # Layoffs that become duplicates once moved: keep the oldest, tombstone the rest
+    """
+    WITH moved AS (
+        SELECT e.layoff_id, coalesce(m.canonical_id, e.company_id) AS company_id,
+               e.date, e.source_url
+        FROM layoff_events e
+        LEFT JOIN company_merges m ON m.alias_id = e.company_id
+        WHERE e.company_id IN (SELECT alias_id FROM company_merges
+                               UNION SELECT canonical_id FROM company_merges)
+    ), ranked AS (
+        SELECT layoff_id,
+               row_number() OVER (PARTITION BY company_id, date, source_url
+                                  ORDER BY layoff_id) AS n
+        FROM moved
+    ), doomed AS (
+        DELETE FROM layoff_events
+        WHERE layoff_id IN (SELECT layoff_id FROM ranked WHERE n > 1)
+        RETURNING layoff_id
+    )
+    INSERT INTO deleted_records (entity, entity_id)
+    SELECT 'LayoffEvent', layoff_id FROM doomed
+    """,
+    # The layoff source_key fingerprints company_id, so it moves with it
+    """
+    UPDATE layoff_events e
+    SET company_id = m.canonical_id,
+        source_key = encode(sha256(convert_to(
+            m.canonical_id::text || '|' || e.date::text || '|' || coalesce(e.source_url, ''),
+            'UTF8')), 'hex'),
+        updated_at = now()
+    FROM company_merges m
+    WHERE e.company_id = m.alias_id
+    """,
+    """
+    UPDATE funding_rounds f
+    SET company_id = m.canonical_id, updated_at = now()
+    FROM company_merges m
+    WHERE f.company_id = m.alias_id
+    """,
+    # Existing aliases of a merged company follow it, so there are no chains
+    """
+    UPDATE companies c
+    SET canonical_id = m.canonical_id, updated_at = now()
+    FROM company_merges m
+    WHERE c.company_id = m.alias_id OR c.canonical_id = m.alias_id
+    """,
+    """
+    INSERT INTO deleted_records (entity, entity_id)
+    SELECT 'Company', alias_id FROM company_merges
+    """,
+]
+
+def backfill_name_keys(session, batch_size: int = BULK_BATCH_SIZE) -> int:
+    """Fill name_key for companies created before it existed."""
+    rows = session.execute(
+        select(Company.company_id, Company.name).where(Company.name_key.is_(None))
+    ).all()
+    for chunk in chunks(rows, batch_size):
+        session.execute(update(Company), [
+            {'company_id': r.company_id, 'name_key': normalize_company_name(r.name)}
+            for r in chunk
+        ])
+    return len(rows)
+
+def find_merges(session, threshold: float = RESOLVE_THRESHOLD, batch_size: int = BULK_BATCH_SIZE,
+                stats=None) -> dict:
+    """Cluster the canonical companies; returns {alias company_id: canonical company_id}."""
+    rows = session.execute(
+        select(Company.company_id, Company.name)
+        .where(Company.canonical_id.is_(None))
+        .order_by(Company.company_id)
+        .execution_options(yield_per=batch_size)
+    ).all()
+    ids = [r.company_id for r in rows]
+    representatives = cluster_names([r.name for r in rows], threshold=threshold, stats=stats)
+    return {ids[i]: ids[rep] for i, rep in enumerate(representatives) if rep != i}
+
+def apply_merges(session, merges: dict, batch_size: int = BULK_BATCH_SIZE):
+    """Fold each alias into its canonical company (see MERGE_STATEMENTS)."""
+    session.execute(text(
+        "CREATE TEMP TABLE company_merges "
+        "(alias_id INTEGER PRIMARY KEY, canonical_id INTEGER NOT NULL) ON COMMIT DROP"
+    ))
+    rows = [{'alias_id': a, 'canonical_id': c} for a, c in merges.items()]
+    for chunk in chunks(rows, batch_size):
+        session.execute(
+            text("INSERT INTO company_merges VALUES (:alias_id, :canonical_id)"), chunk
+        )
+    for stmt in MERGE_STATEMENTS:
+        session.execute(text(stmt))
+
+def resolve_companies(threshold: float = RESOLVE_THRESHOLD, batch_size: int = BULK_BATCH_SIZE,
+                      dry_run: bool = False) -> dict:
+    """
+    Run entity resolution over all canonical companies and merge the
+    clusters in one transaction. Returns {alias company_id: canonical company_id}.
+    """
+    session = SessionLocal()
+    try:
+        filled = backfill_name_keys(session, batch_size)
+        if filled:
+            print(f"  … computed name_key for {filled} companies")
+
+        start = time.perf_counter()
+        stats = {}
+        with metrics.stage('resolve_companies', threshold=threshold) as st:
+            merges = find_merges(session, threshold, batch_size, stats)
+            st.rows = len(merges)
+            st.fields.update(stats)
+        print(f"Resolved {stats.get('names', 0)} companies in {time.perf_counter() - start:.1f}s "
+              f"({stats.get('comparisons', 0)} comparisons): {len(merges)} aliases")
+        if stats.get('skipped_buckets'):
+            print(f"  ⚠️ {stats['skipped_buckets']} oversized LSH buckets skipped")
+
+        if dry_run:
+            session.rollback()
+            return merges
+        if merges:
+            apply_merges(session, merges, batch_size)
+        session.commit()
+        return merges
+    finally:
+        session.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Merge duplicate companies into canonical rows")
+    ap.add_argument("--threshold", type=float, default=RESOLVE_THRESHOLD)
+    ap.add_argument("--dry-run", action="store_true", help="report the merges without applying them")
+    args = ap.parse_args()
+
+    merges = resolve_companies(args.threshold, dry_run=args.dry_run)
+    if args.dry_run:
+        session = SessionLocal()
+        try:
+            names = dict(session.execute(
+                select(Company.company_id, Company.name)
+                .where(Company.company_id.in_(set(merges) | set(merges.values())))
+            ).all())
+        finally:
+            session.close()
+        for alias, canonical in sorted(merges.items(), key=lambda m: m[1]):
+            print(f"  {names[alias]!r} -> {names[canonical]!r}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# db/migrations.py
+#
+# Idempotent DDL for databases created before a column or index was added to
+# db/models.py. `Base.metadata.create_all` only creates missing tables, so
+# anything added to an existing table must also be listed here.
+
+from sqlalchemy import text
+
+TRACKED_TABLES = [
+    'companies',
+    'layoff_events',
+    'investors',
+    'funding_rounds',
+    'funding_round_investors',
+]
+
+MIGRATIONS = []
+for _table in TRACKED_TABLES:
+    MIGRATIONS += [
+        f"ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+        f"ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+        f"CREATE INDEX IF NOT EXISTS ix_{_table}_updated_at ON {_table} (updated_at)",
+    ]
+
+# Natural-key indexes and source keys for bulk dedup. Existing duplicates keep
+# a NULL source_key (only the oldest row of each group gets one) so the
+# unique index can always be built.
+MIGRATIONS += [
+    "ALTER TABLE layoff_events ADD COLUMN IF NOT EXISTS source_key VARCHAR(64)",
+    """
+    UPDATE layoff_events SET source_key = k.source_key
+    FROM (
+        SELECT layoff_id,
+               encode(sha256(convert_to(
+                   company_id::text || '|' || date::text || '|' || coalesce(source_url, ''),
+                   'UTF8')), 'hex') AS source_key,
+               row_number() OVER (PARTITION BY company_id, date, source_url
+                                  ORDER BY layoff_id) AS n
+        FROM layoff_events
+    ) k
+    WHERE layoff_events.layoff_id = k.layoff_id
+      AND k.n = 1
+      AND layoff_events.source_key IS NULL
+      AND NOT EXISTS (SELECT 1 FROM layoff_events e WHERE e.source_key = k.source_key)
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_layoff_events_natural_key "
+    "ON layoff_events (company_id, date, source_url)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_layoff_events_source_key ON layoff_events (source_key)",
+
+    "ALTER TABLE funding_rounds ADD COLUMN IF NOT EXISTS source_key VARCHAR(128)",
+    # Form D rounds: recover the accession number from the filing URL in details
+    """
+    UPDATE funding_rounds SET source_key = k.source_key
+    FROM (
+        SELECT round_id, source_key,
+               row_number() OVER (PARTITION BY source_key ORDER BY round_id) AS n
+        FROM (
+            SELECT round_id,
+                   'sec:' || regexp_replace(
+                       substring(details FROM '/edgar/data/[0-9]+/([0-9]{18})/'),
+                       '^([0-9]{10})([0-9]{2})([0-9]{6})$', '\\1-\\2-\\3') AS source_key
+            FROM funding_rounds
+            WHERE round_type = 'Form D' AND source_key IS NULL
+        ) parsed
+        WHERE source_key IS NOT NULL
+    ) k
+    WHERE funding_rounds.round_id = k.round_id
+      AND k.n = 1
+      AND NOT EXISTS (SELECT 1 FROM funding_rounds f WHERE f.source_key = k.source_key)
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_funding_rounds_natural_key "
+    "ON funding_rounds (company_id, date, round_type, amount)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_funding_rounds_source_key ON funding_rounds (source_key)",
+]
+
+# Crunchbase freshness tracking, and one link per (round, investor) so that
+# re-enrichment can upsert links. Exact duplicate links are dropped first.
+MIGRATIONS += [
+    "ALTER TABLE companies ADD COLUMN IF NOT EXISTS crunchbase_enriched_at TIMESTAMPTZ",
+    "CREATE INDEX IF NOT EXISTS ix_companies_crunchbase_enriched_at "
+    "ON companies (crunchbase_enriched_at)",
+    """
+    DELETE FROM funding_round_investors a
+    USING funding_round_investors b
+    WHERE a.round_id = b.round_id
+      AND a.investor_id = b.investor_id
+      AND a.id > b.id
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_funding_round_investors_pair "
+    "ON funding_round_investors (round_id, investor_id)",
+]
+
+# Canonical-company mapping; name_key is filled in by db/canonical.py
+MIGRATIONS += [
+    "ALTER TABLE companies ADD COLUMN IF NOT EXISTS name_key VARCHAR(255)",
+    "ALTER TABLE companies ADD COLUMN IF NOT EXISTS canonical_id INTEGER "
+    "REFERENCES companies (company_id)",
+    "CREATE INDEX IF NOT EXISTS ix_companies_name_key ON companies (name_key)",
+    "CREATE INDEX IF NOT EXISTS ix_companies_canonical_id ON companies (canonical_id)",
+]
+
+# Full-text search (db/search.py): generated tsvector columns, so every insert
+# and update maintains them, with GIN indexes. Adding a stored generated
+# column rewrites the table once.
+SEARCH_CONFIG = 'english'
+SEARCH_DOCUMENTS = {
+    'layoff_events':  "coalesce(description, '')",
+    'funding_rounds': "coalesce(round_type, '') || ' ' || coalesce(details, '')",
+}
+for _table, _document in SEARCH_DOCUMENTS.items():
+    MIGRATIONS += [
+        f"ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', {_document})) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{_table}_search_vector ON {_table} USING gin (search_vector)",
+    ]
+
+def apply_migrations(engine):
+    """Run every statement in MIGRATIONS; each one is safe to re-run."""
+    with engine.begin() as conn:
+        for stmt in MIGRATIONS:
+            conn.execute(text(stmt))
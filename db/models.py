@@ -1,10 +1,20 @@
-from sqlalchemy import Column, Integer, String, Date, Text, JSON, Float, ForeignKey
+from sqlalchemy import (
+    Column, Integer, String, Date, DateTime, Text, JSON, Float, ForeignKey,
+    Index, UniqueConstraint, event, func,
+)
+import hashlib
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
-class Company(Base):
+class TimestampMixin:
+    # Change tracking for incremental graph sync (see graph/neo4j_loader.py)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(),
+                        onupdate=func.now(), nullable=False, index=True)
+
+class Company(TimestampMixin, Base):
     __tablename__ = 'companies'
     company_id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(255), unique=True, nullable=False)
@@ -14,12 +24,22 @@ class Company(Base):
     employee_count = Column(Integer)
     hq_location = Column(String(255))
     external_ids = Column(JSON)
+    # When ingestion/crunchbase.py last refreshed this company (NULL = never)
+    crunchbase_enriched_at = Column(DateTime(timezone=True), index=True)
+    # Entity resolution (db/canonical.py): normalized name, and the company this
+    # row is an alias of (NULL for canonical companies)
+    name_key     = Column(String(255), index=True)
+    canonical_id = Column(Integer, ForeignKey('companies.company_id'), index=True)
 
     layoff_events = relationship('LayoffEvent', back_populates='company')
     funding_rounds  = relationship('FundingRound', back_populates='company')
 
-class LayoffEvent(Base):
+class LayoffEvent(TimestampMixin, Base):
     __tablename__ = 'layoff_events'
+    __table_args__ = (
+        Index('ix_layoff_events_natural_key', 'company_id', 'date', 'source_url'),
+        Index('uq_layoff_events_source_key', 'source_key', unique=True),
+    )
     layoff_id = Column(Integer, primary_key=True, autoincrement=True)
     company_id = Column(Integer, ForeignKey('companies.company_id'), nullable=False)
     date = Column(Date, nullable=False)
@@ -27,10 +47,12 @@ class LayoffEvent(Base):
     percent_laid_off = Column(Float)
     description = Column(Text)
     source_url = Column(String(512))
+    # Content fingerprint of the natural key, see layoff_source_key()
+    source_key = Column(String(64))
 
     company = relationship('Company', back_populates='layoff_events')
 
-class Investor(Base):
+class Investor(TimestampMixin, Base):
     __tablename__ = 'investors'
     investor_id = Column(Integer, primary_key=True, autoincrement=True)
     name       = Column(String(255), unique=True, nullable=False)
@@ -39,23 +61,114 @@ class Investor(Base):
 
     funding_rounds = relationship('FundingRoundInvestor', back_populates='investor')
 
-class FundingRound(Base):
+class FundingRound(TimestampMixin, Base):
     __tablename__ = 'funding_rounds'
+    __table_args__ = (
+        Index('ix_funding_rounds_natural_key', 'company_id', 'date', 'round_type', 'amount'),
+        Index('uq_funding_rounds_source_key', 'source_key', unique=True),
+    )
     round_id   = Column(Integer, primary_key=True, autoincrement=True)
     company_id = Column(Integer, ForeignKey('companies.company_id'), nullable=False)
     date       = Column(Date)
     round_type = Column(String(50))
     amount     = Column(Float)
     details    = Column(Text)
+    # Stable id from the source, e.g. 'sec:<accession number>'
+    source_key = Column(String(128))
 
     company = relationship('Company', back_populates='funding_rounds')
     investors = relationship('FundingRoundInvestor', back_populates='round')
 
-class FundingRoundInvestor(Base):
+class FundingRoundInvestor(TimestampMixin, Base):
     __tablename__ = 'funding_round_investors'
+    __table_args__ = (
+        Index('uq_funding_round_investors_pair', 'round_id', 'investor_id', unique=True),
+    )
     id          = Column(Integer, primary_key=True, autoincrement=True)
     round_id    = Column(Integer, ForeignKey('funding_rounds.round_id'), nullable=False)
     investor_id = Column(Integer, ForeignKey('investors.investor_id'), nullable=False)
 
     round    = relationship('FundingRound', back_populates='investors')
-    investor = relationship('Investor', back_populates='funding_rounds')
\ No newline at end of file
+    investor = relationship('Investor', back_populates='funding_rounds')
+
+def layoff_source_key(company_id, date, source_url) -> str:
+    """Fingerprint of a layoff's natural key (matches the backfill in db/migrations.py)."""
+    raw = f"{company_id}|{date.isoformat()}|{source_url or ''}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+class DeletedRecord(Base):
+    """Tombstones for rows deleted through the ORM, replayed by the graph sync."""
+    __tablename__ = 'deleted_records'
+    id         = Column(Integer, primary_key=True, autoincrement=True)
+    entity     = Column(String(50), nullable=False)
+    entity_id  = Column(Integer, nullable=False)
+    payload    = Column(JSON)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+class GraphSyncState(Base):
+    """Per-entity high-water mark of the last successful Neo4j sync."""
+    __tablename__ = 'graph_sync_state'
+    entity          = Column(String(50), primary_key=True)
+    high_water_mark = Column(DateTime(timezone=True))
+    last_synced_at  = Column(DateTime(timezone=True))
+
+class IngestionCheckpoint(Base):
+    """Completed sub-windows of a sharded backfill, so a restart can skip them."""
+    __tablename__ = 'ingestion_checkpoints'
+    __table_args__ = (UniqueConstraint('source', 'window_start', 'window_end'),)
+    id           = Column(Integer, primary_key=True, autoincrement=True)
+    source       = Column(String(50), nullable=False)
+    window_start = Column(Date, nullable=False)
+    window_end   = Column(Date, nullable=False)
+    records_seen     = Column(Integer)
+    records_inserted = Column(Integer)
+    completed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class PageFingerprint(Base):
+    """Content hashes of a scraped page and its sections, to skip unchanged content."""
+    __tablename__ = 'page_fingerprints'
+    url          = Column(String(512), primary_key=True)
+    section      = Column(String(255), primary_key=True)  # '' for the whole page
+    content_hash = Column(String(64), nullable=False)
+    entry_hashes = Column(JSON)
+    checked_at   = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class PipelineStageRun(Base):
+    """Per-stage status of a main.py run, so a failed run can resume where it stopped."""
+    __tablename__ = 'pipeline_stage_runs'
+    run_id      = Column(String(64), primary_key=True)
+    stage       = Column(String(50), primary_key=True)
+    run_key     = Column(String(64), nullable=False, index=True)  # hash of stages + params
+    status      = Column(String(20), nullable=False)
+    started_at  = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True))
+    error       = Column(Text)
+
+# Graph entity name and primary-key attribute for each tracked model
+TRACKED_ENTITIES = {
+    Company:              ('Company', 'company_id'),
+    LayoffEvent:          ('LayoffEvent', 'layoff_id'),
+    Investor:             ('Investor', 'investor_id'),
+    FundingRound:         ('FundingRound', 'round_id'),
+    FundingRoundInvestor: ('INVESTED_IN', 'id'),
+}
+
+def _record_deletion(mapper, connection, target):
+    entity, pk = TRACKED_ENTITIES[mapper.class_]
+    payload = None
+    if isinstance(target, FundingRoundInvestor):
+        payload = {'investor_id': target.investor_id, 'round_id': target.round_id}
+    elif isinstance(target, (LayoffEvent, FundingRound)):
+        # Lets the graph sync refresh the company's rollups (graph/aggregates.py)
+        payload = {'company_id': target.company_id}
+    connection.execute(
+        DeletedRecord.__table__.insert().values(
+            entity=entity,
+            entity_id=getattr(target, pk),
+            payload=payload,
+        )
+    )
+
+# Note: only session.delete() fires these; bulk query(...).delete() does not.
+for _model in TRACKED_ENTITIES:
+    event.listen(_model, 'after_delete', _record_deletion)
@@ -0,0 +1,96 @@
+# db/search.py
+#
+# Ranked full-text search over layoff descriptions and funding round details.
+# Both tables carry a generated `search_vector` tsvector column with a GIN
+# index (db/migrations.py), so matching is an index lookup instead of an
+# ILIKE scan; only the matching rows are ranked (ts_rank_cd) and only the
+# returned page gets a highlighted snippet.
+#
+#   python -m db.search layoffs "clinical hold"
+#   python -m db.search layoffs "restructuring -merger" --since 2024-01-01
+#   python -m db.search rounds "series b" --limit 5
+#
+# Queries use web-search syntax (websearch_to_tsquery): quoted phrases, OR,
+# and -term to exclude.
+
+import time
+import argparse
+from sqlalchemy import text
+from db.migrations import SEARCH_CONFIG
+from pipeline import metrics
+
+# target -> (table, id column, text shown in the snippet, extra columns)
+SEARCH_TARGETS = {
+    'layoffs': ('layoff_events', 'layoff_id', 'description',
+                ['num_laid_off', 'percent_laid_off', 'source_url']),
+    'rounds':  ('funding_rounds', 'round_id', 'details',
+                ['round_type', 'amount']),
+}
+
+SEARCH_SQL = """
+WITH q AS (SELECT websearch_to_tsquery('{config}', :query) AS query),
+hits AS (
+    SELECT t.{id_column}, t.company_id, t.date, t.{text_column}, {extra},
+           ts_rank_cd(t.search_vector, q.query, 32) AS rank
+    FROM {table} t, q
+    WHERE t.search_vector @@ q.query
+      AND (CAST(:since AS date) IS NULL OR t.date >= CAST(:since AS date))
+      AND (CAST(:until AS date) IS NULL OR t.date <= CAST(:until AS date))
+    ORDER BY rank DESC, t.date DESC NULLS LAST, t.{id_column}
+    LIMIT :limit
+)
+SELECT h.*, c.name AS company_name,
+       ts_headline('{config}', coalesce(h.{text_column}, ''), q.query,
+                   'MaxFragments=2, MaxWords=20, MinWords=5') AS snippet
+FROM hits h
+JOIN companies c ON c.company_id = h.company_id
+CROSS JOIN q
+ORDER BY h.rank DESC, h.date DESC NULLS LAST, h.{id_column}
+"""
+
+def search(session, target: str, query: str, limit: int = 20, since=None, until=None) -> list:
+    """
+    The best-matching rows of target ('layoffs' or 'rounds') for query, joined
+    to their company, as dicts with rank and snippet; since/until bound the
+    event date.
+    """
+    table, id_column, text_column, extra = SEARCH_TARGETS[target]
+    sql = SEARCH_SQL.format(config=SEARCH_CONFIG, table=table, id_column=id_column,
+                            text_column=text_column,
+                            extra=', '.join(f"t.{c}" for c in extra))
+    with metrics.timed('search', target=target):
+        rows = session.execute(text(sql), {
+            'query': query, 'limit': limit,
+            'since': since, 'until': until,
+        })
+        return [dict(r._mapping) for r in rows]
+
+def search_layoffs(session, query: str, **kwargs) -> list:
+    return search(session, 'layoffs', query, **kwargs)
+
+def search_funding_rounds(session, query: str, **kwargs) -> list:
+    return search(session, 'rounds', query, **kwargs)
+
+def main():
+    from db.session import SessionLocal
+    parser = argparse.ArgumentParser(description="Full-text search over layoffs and funding rounds")
+    parser.add_argument("target", choices=list(SEARCH_TARGETS))
+    parser.add_argument("query")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--since", help="earliest event date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="latest event date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        start = time.perf_counter()
+        results = search(session, args.target, args.query, args.limit, args.since, args.until)
+        elapsed = time.perf_counter() - start
+    finally:
+        session.close()
+    for r in results:
+        print(f"{r['rank']:.3f}  {r['date']}  {r['company_name']}: {r['snippet']}")
+    print(f"  … {len(results)} results in {elapsed * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
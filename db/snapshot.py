@@ -0,0 +1,411 @@
+# db/snapshot.py
+#
+# Columnar snapshots of the knowledge-graph tables, so analysts read Parquet
+# files instead of running full-table queries against the primary database.
+#
+# Every table is streamed from one REPEATABLE READ transaction (the tables
+# agree with each other) in chunks into Parquet files: zstd-compressed,
+# low-cardinality strings dictionary-encoded, funding rounds and layoff
+# events hive-partitioned by year (funding_rounds/year=2024/...).
+#
+# Exports after the first one append: only rows whose updated_at is newer
+# than the table's mark are written, as new part files, plus the ids of rows
+# deleted since (DeletedRecord tombstones). The reader keeps the latest
+# version of every row and drops deleted ones; --full rewrites the snapshot
+# from scratch, which also compacts the appended versions away.
+#
+#   python -m db.snapshot export snapshot/
+#   python -m db.snapshot export snapshot/ --full
+#   python -m db.snapshot info snapshot/
+#
+#   from db.snapshot import Snapshot
+#   snap = Snapshot("snapshot")
+#   rounds = snap.read("funding_rounds", filter=pc.field("year") >= 2023)  # partition pruning
+#   companies = snap.mapped("companies")   # memory-mapped Arrow IPC, zero-copy
+#
+# Requires pyarrow (optional dependency, only this module uses it).
+
+import os
+import json
+import time
+import shutil
+import argparse
+from datetime import datetime, timedelta
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+from dotenv import load_dotenv
+
+load_dotenv()
+SNAPSHOT_PATH        = os.getenv("SNAPSHOT_PATH", "snapshot")
+SNAPSHOT_CHUNK_SIZE  = int(os.getenv("SNAPSHOT_CHUNK_SIZE", "50000"))
+SNAPSHOT_COMPRESSION = os.getenv("SNAPSHOT_COMPRESSION", "zstd")
+SNAPSHOT_LAG         = float(os.getenv("SNAPSHOT_LAG", "300"))  # seconds re-read before each mark
+
+FORMAT_VERSION = 1
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+PARTITION = ds.partitioning(pa.schema([('year', pa.int16())]), flavor='hive')
+
+# table -> (primary key, DeletedRecord entity, date column partitioned by year,
+#           [(column, Arrow type)], dictionary-encoded columns)
+TABLES = {
+    'companies': ('company_id', 'Company', None, [
+        ('company_id',     pa.int32()),
+        ('name',           pa.string()),
+        ('type',           pa.string()),
+        ('founded_year',   pa.int32()),
+        ('website',        pa.string()),
+        ('employee_count', pa.int32()),
+        ('hq_location',    pa.string()),
+        ('external_ids',   pa.string()),   # JSON text
+        ('canonical_id',   pa.int32()),    # set on aliases merged by db/canonical.py
+        ('created_at',     TIMESTAMP),
+        ('updated_at',     TIMESTAMP),
+    ], ['type', 'hq_location']),
+    'layoff_events': ('layoff_id', 'LayoffEvent', 'date', [
+        ('layoff_id',        pa.int32()),
+        ('company_id',       pa.int32()),
+        ('date',             pa.date32()),
+        ('num_laid_off',     pa.int32()),
+        ('percent_laid_off', pa.float64()),
+        ('description',      pa.string()),
+        ('source_url',       pa.string()),
+        ('created_at',       TIMESTAMP),
+        ('updated_at',       TIMESTAMP),
+    ], ['source_url']),
+    'investors': ('investor_id', 'Investor', None, [
+        ('investor_id',  pa.int32()),
+        ('name',         pa.string()),
+        ('type',         pa.string()),
+        ('external_ids', pa.string()),
+        ('created_at',   TIMESTAMP),
+        ('updated_at',   TIMESTAMP),
+    ], ['type']),
+    'funding_rounds': ('round_id', 'FundingRound', 'date', [
+        ('round_id',   pa.int32()),
+        ('company_id', pa.int32()),
+        ('date',       pa.date32()),
+        ('round_type', pa.string()),
+        ('amount',     pa.float64()),
+        ('details',    pa.string()),
+        ('created_at', TIMESTAMP),
+        ('updated_at', TIMESTAMP),
+    ], ['round_type']),
+    'funding_round_investors': ('id', 'INVESTED_IN', None, [
+        ('id',          pa.int32()),
+        ('round_id',    pa.int32()),
+        ('investor_id', pa.int32()),
+        ('created_at',  TIMESTAMP),
+        ('updated_at',  TIMESTAMP),
+    ], []),
+}
+JSON_COLUMNS = {'external_ids'}
+DELETED_SCHEMA = pa.schema([('id', pa.int32()), ('deleted_at', TIMESTAMP)])
+
+def read_schema(table):
+    """Arrow schema of a table as the reader returns it (dictionary columns, year partition)."""
+    _, _, partition, columns, dictionary = TABLES[table]
+    fields = [pa.field(name, pa.dictionary(pa.int32(), pa.string()) if name in dictionary else typ)
+              for name, typ in columns]
+    if partition:
+        fields.append(pa.field('year', pa.int16()))
+    return pa.schema(fields)
+
+def write_schema(table):
+    _, _, partition, columns, _ = TABLES[table]
+    fields = [pa.field(name, typ) for name, typ in columns]
+    if partition:
+        fields.append(pa.field('year', pa.int16()))
+    return pa.schema(fields)
+
+def load_manifest(path):
+    manifest_path = os.path.join(path, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as fh:
+        manifest = json.load(fh)
+    if manifest.get('format') != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported snapshot format {manifest.get('format')}, "
+                         f"re-export with --full")
+    return manifest
+
+def save_manifest(path, manifest):
+    # Written last and replaced atomically: part files an interrupted export
+    # left behind are not listed, so readers never see them
+    tmp = os.path.join(path, 'manifest.json.tmp')
+    with open(tmp, 'w') as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, os.path.join(path, 'manifest.json'))
+
+# -- export --------------------------------------------------------------------
+
+def _record_batches(result, table, seen):
+    """Convert the chunks of a server-side cursor to RecordBatches; seen tracks rows and max updated_at."""
+    _, _, partition, columns, _ = TABLES[table]
+    schema = write_schema(table)
+    names = [name for name, _ in columns]
+    for chunk in result.partitions():
+        values = list(zip(*chunk))
+        arrays = []
+        for name, typ, column in zip(names, [t for _, t in columns], values):
+            if name in JSON_COLUMNS:
+                column = [None if v is None else json.dumps(v, sort_keys=True) for v in column]
+            arrays.append(pa.array(column, type=typ))
+        if partition:
+            arrays.append(pc.year(arrays[names.index(partition)]).cast(pa.int16()))
+        seen['rows'] += len(chunk)
+        mark = chunk[-1][names.index('updated_at')]  # rows arrive in updated_at order
+        if seen['mark'] is None or mark > seen['mark']:
+            seen['mark'] = mark
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def overlap(since):
+    """
+    since moved back by SNAPSHOT_LAG. updated_at and deleted_at are set when the
+    writing transaction starts, so a row committed after an export can carry a
+    timestamp older than its mark; latest_versions() drops the re-read copies.
+    """
+    return since - timedelta(seconds=SNAPSHOT_LAG) if since is not None else None
+
+def export_table(session, out_dir, table, since, generation, chunk_size, compression):
+    """
+    Append the rows of table updated after overlap(since) (all rows when None)
+    as part files of this generation; returns (files written, rows, new mark).
+    """
+    from sqlalchemy import select
+    from db.models import Base
+    _, _, partition, columns, dictionary = TABLES[table]
+    t = Base.metadata.tables[table]
+    stmt = select(*[t.c[name] for name, _ in columns])
+    if since is not None:
+        stmt = stmt.where(t.c.updated_at > overlap(since))
+    stmt = stmt.order_by(t.c.updated_at).execution_options(yield_per=chunk_size)
+
+    seen = {'rows': 0, 'mark': since}
+    files = []
+    parquet = ds.ParquetFileFormat()
+    ds.write_dataset(
+        _record_batches(session.execute(stmt), table, seen),
+        os.path.join(out_dir, table),
+        schema=write_schema(table),
+        format=parquet,
+        file_options=parquet.make_write_options(compression=compression,
+                                                use_dictionary=dictionary or False),
+        partitioning=PARTITION if partition else None,
+        basename_template=f"part-{generation:05d}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        file_visitor=lambda f: files.append(os.path.relpath(f.path, out_dir)),
+    )
+    return files, seen['rows'], seen['mark']
+
+def export_deletions(session, out_dir, table, since, generation):
+    """Ids of table's rows deleted after overlap(since) (ever, when None) as one Parquet file; None if there are none."""
+    from sqlalchemy import select
+    from db.models import DeletedRecord
+    _, entity, *_ = TABLES[table]
+    stmt = select(DeletedRecord.entity_id, DeletedRecord.deleted_at).where(DeletedRecord.entity == entity)
+    if since is not None:
+        stmt = stmt.where(DeletedRecord.deleted_at > overlap(since))
+    rows = session.execute(stmt).all()
+    if not rows:
+        return None
+    ids, deleted_at = zip(*rows)
+    relpath = os.path.join('_deleted', f"{table}-{generation:05d}.parquet")
+    os.makedirs(os.path.join(out_dir, '_deleted'), exist_ok=True)
+    pq.write_table(pa.table([pa.array(ids, pa.int32()), pa.array(deleted_at, TIMESTAMP)],
+                            schema=DELETED_SCHEMA),
+                   os.path.join(out_dir, relpath))
+    return relpath
+
+def export_snapshot(path: str = SNAPSHOT_PATH, full: bool = False,
+                    chunk_size: int = SNAPSHOT_CHUNK_SIZE,
+                    compression: str = SNAPSHOT_COMPRESSION) -> dict:
+    """
+    Export the tables to path: append the rows changed since the previous
+    export, or rewrite everything when full is set or there is no snapshot
+    yet. Returns the manifest also saved as manifest.json.
+    """
+    from sqlalchemy import select, func
+    from db.session import SessionLocal
+    from db.models import DeletedRecord
+    from pipeline import metrics
+
+    manifest = None if full else load_manifest(path)
+    # A full export is built next to the old snapshot and swapped in at the end
+    out_dir = path if manifest else f"{path}.tmp"
+    if manifest is None:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.makedirs(out_dir)
+        manifest = {'format': FORMAT_VERSION, 'generation': 0, 'deletions_mark': None,
+                    'tables': {t: {'mark': None, 'rows': 0, 'files': [], 'deleted_files': [],
+                                   'appends': 0} for t in TABLES}}
+    generation = manifest['generation'] + 1
+    appending = generation > 1
+    print(f"{'Appending to' if appending else 'Exporting'} snapshot {path} (generation {generation})…")
+
+    start = time.perf_counter()
+    session = SessionLocal()
+    try:
+        # One snapshot for every table, so a round never references a missing company
+        session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+        deletions_since = manifest['deletions_mark'] and datetime.fromisoformat(manifest['deletions_mark'])
+        deletions_mark = session.execute(select(func.max(DeletedRecord.deleted_at))).scalar()
+
+        for table in TABLES:
+            state = manifest['tables'][table]
+            since = datetime.fromisoformat(state['mark']) if state['mark'] else None
+            with metrics.stage(f"snapshot:{table}", incremental=appending) as st:
+                files, rows, mark = export_table(session, out_dir, table, since, generation,
+                                                 chunk_size, compression)
+                st.rows += rows
+            if appending:
+                deleted = export_deletions(session, out_dir, table, deletions_since, generation)
+                if deleted:
+                    state['deleted_files'].append(deleted)
+            state['files'] += files
+            state['rows'] += rows
+            state['mark'] = mark.isoformat() if mark else None
+            if appending and rows:
+                state['appends'] += 1
+            print(f"  {table:<24} {rows:>10} rows  {len(files)} files")
+        session.rollback()
+    finally:
+        session.close()
+
+    manifest['generation'] = generation
+    manifest['deletions_mark'] = deletions_mark.isoformat() if deletions_mark else None
+    manifest['exported_at'] = datetime.now().astimezone().isoformat()
+    save_manifest(out_dir, manifest)
+    if out_dir != path:
+        if os.path.exists(path):
+            old = f"{path}.old"
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(path, old)
+            os.replace(out_dir, path)
+            shutil.rmtree(old)
+        else:
+            os.replace(out_dir, path)
+    print(f"  … exported in {time.perf_counter() - start:.1f}s")
+    return manifest
+
+# -- reader --------------------------------------------------------------------
+
+def latest_versions(data, key, deleted_ids=None):
+    """Keep the newest version (by updated_at) of every key and drop deleted keys."""
+    if deleted_ids is not None and len(deleted_ids):
+        data = data.filter(pc.invert(pc.is_in(data[key], value_set=deleted_ids)))
+    data = data.take(pc.sort_indices(data, sort_keys=[(key, 'ascending'),
+                                                      ('updated_at', 'descending')]))
+    keys = data[key].to_numpy()
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    return data.filter(pa.array(first))
+
+class Snapshot:
+    """
+    Read access to an exported snapshot. read() scans the Parquet files
+    (column projection, filters, year partition pruning); mapped() returns a
+    whole table memory-mapped from an Arrow IPC copy made on first use.
+    """
+    def __init__(self, path: str = SNAPSHOT_PATH):
+        self.path = path
+        self.manifest = load_manifest(path)
+        if self.manifest is None:
+            raise FileNotFoundError(f"{path}: no snapshot (run `python -m db.snapshot export {path}`)")
+        self.filesystem = fs.LocalFileSystem(use_mmap=True)
+
+    @property
+    def tables(self):
+        return list(self.manifest['tables'])
+
+    def dataset(self, table) -> ds.Dataset:
+        """The table's Parquet files as a pyarrow dataset (may hold several versions of a row)."""
+        _, _, partition, _, dictionary = TABLES[table]
+        state = self.manifest['tables'][table]
+        parquet = ds.ParquetFileFormat(read_options={'dictionary_columns': dictionary})
+        return ds.dataset(
+            [os.path.join(self.path, f) for f in state['files']],
+            schema=read_schema(table),
+            format=parquet,
+            filesystem=self.filesystem,
+            partitioning=PARTITION if partition else None,
+            partition_base_dir=os.path.join(self.path, table),
+        )
+
+    def deleted_ids(self, table):
+        files = self.manifest['tables'][table]['deleted_files']
+        if not files:
+            return None
+        return pa.concat_arrays([pq.read_table(os.path.join(self.path, f), columns=['id'],
+                                               filesystem=self.filesystem)['id'].combine_chunks()
+                                 for f in files])
+
+    def read(self, table, columns=None, filter=None) -> pa.Table:
+        """
+        The table's current rows. columns and filter (a pyarrow.compute
+        expression, e.g. pc.field('year') == 2024) are pushed into the scan;
+        the filter applies to each row's latest version only.
+        """
+        key = TABLES[table][0]
+        state = self.manifest['tables'][table]
+        if not state['appends'] and not state['deleted_files']:
+            return self.dataset(table).to_table(columns=columns, filter=filter)
+        # Appended versions or deletions: read the key and updated_at too, to pick the latest
+        dataset, deleted = self.dataset(table), self.deleted_ids(table)
+        wanted = columns and list(dict.fromkeys(columns + [key, 'updated_at']))
+        data = latest_versions(dataset.to_table(columns=wanted, filter=filter), key, deleted)
+        if filter is not None:
+            # The filter may match an older version of a row whose latest version it
+            # rejects; keep only rows that are their key's latest version overall
+            latest = latest_versions(dataset.to_table(columns=[key, 'updated_at']), key, deleted)
+            newest = latest['updated_at'].take(pc.index_in(data[key], value_set=latest[key]))
+            data = data.filter(pc.equal(data['updated_at'], newest))
+        return data.select(columns) if columns else data
+
+    def mapped(self, table) -> pa.Table:
+        """
+        The whole table memory-mapped from an uncompressed Arrow IPC file
+        (written on first use for this generation), so repeated analytics
+        share the page cache instead of decoding Parquet into private memory.
+        """
+        cache_dir = os.path.join(self.path, '_arrow')
+        cache = os.path.join(cache_dir, f"{table}-{self.manifest['generation']:05d}.arrow")
+        if not os.path.exists(cache):
+            os.makedirs(cache_dir, exist_ok=True)
+            # IPC files allow one dictionary per column, so merge the per-file ones
+            data = self.read(table).unify_dictionaries()
+            tmp = f"{cache}.tmp"
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, data.schema) as writer:
+                writer.write_table(data)
+            os.replace(tmp, cache)
+            for name in os.listdir(cache_dir):
+                if name.startswith(f"{table}-") and os.path.join(cache_dir, name) != cache:
+                    os.remove(os.path.join(cache_dir, name))  # earlier generations
+        return pa.ipc.open_file(pa.memory_map(cache, 'r')).read_all()
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar Parquet snapshots of the Postgres tables")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("export", help="append changed rows (or rewrite with --full)")
+    p.add_argument("path", nargs="?", default=SNAPSHOT_PATH)
+    p.add_argument("--full", action="store_true", help="rewrite the snapshot from scratch")
+    p.add_argument("--chunk-size", type=int, default=SNAPSHOT_CHUNK_SIZE)
+    p = sub.add_parser("info", help="tables, rows and files in a snapshot")
+    p.add_argument("path", nargs="?", default=SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_snapshot(args.path, full=args.full, chunk_size=args.chunk_size)
+        return
+    snap = Snapshot(args.path)
+    print(f"{args.path}: generation {snap.manifest['generation']}, "
+          f"exported {snap.manifest.get('exported_at')}")
+    for table, state in snap.manifest['tables'].items():
+        print(f"  {table:<24} {state['rows']:>10} rows written  {len(state['files']):>4} files  "
+              f"{state['appends']} appends  mark {state['mark']}")
+
+if __name__ == "__main__":
+    main()
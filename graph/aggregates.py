@@ -0,0 +1,171 @@
+# graph/aggregates.py
+#
+# Precomputed rollups stored as node properties, so dashboards read
+# c.total_raised or i.portfolio_size instead of re-aggregating every
+# RAISED / UNDERWENT_LAYOFF / INVESTED_IN relationship per page view.
+#
+#   Company:  total_raised, funding_round_count, last_round_date,
+#             investor_count, layoff_event_count, total_laid_off, last_layoff_date
+#   Investor: portfolio_size, investment_count, last_investment_date
+#
+# The rollups are computed set-based in Postgres and written with one UNWIND
+# SET per batch. On an incremental sync only the companies and investors
+# touched by rounds, layoffs, investor links or tombstones newer than the
+# previous sync's marks are recomputed.
+
+from sqlalchemy import text
+
+AGGREGATES_ENTITY = 'aggregates'
+
+# Entities whose ids have changed since the given marks. :full selects every
+# canonical company / investor; a NULL mark means "since the beginning".
+CHANGED_COMPANIES_SQL = """
+    SELECT company_id FROM companies WHERE :full AND canonical_id IS NULL
+    UNION
+    SELECT company_id FROM funding_rounds
+    WHERE updated_at > coalesce(CAST(:rounds_since AS timestamptz), '-infinity')
+    UNION
+    SELECT company_id FROM layoff_events
+    WHERE updated_at > coalesce(CAST(:layoffs_since AS timestamptz), '-infinity')
+    UNION
+    SELECT f.company_id FROM funding_round_investors l
+    JOIN funding_rounds f ON f.round_id = l.round_id
+    WHERE l.updated_at > coalesce(CAST(:links_since AS timestamptz), '-infinity')
+    UNION
+    SELECT CAST(payload->>'company_id' AS integer) FROM deleted_records
+    WHERE entity IN ('LayoffEvent', 'FundingRound') AND payload IS NOT NULL
+      AND deleted_at > coalesce(CAST(:deletions_since AS timestamptz), '-infinity')
+    UNION
+    SELECT f.company_id FROM deleted_records d
+    JOIN funding_rounds f ON f.round_id = CAST(d.payload->>'round_id' AS integer)
+    WHERE d.entity = 'INVESTED_IN'
+      AND d.deleted_at > coalesce(CAST(:deletions_since AS timestamptz), '-infinity')
+"""
+
+CHANGED_INVESTORS_SQL = """
+    SELECT investor_id FROM investors WHERE :full
+    UNION
+    SELECT investor_id FROM funding_round_investors
+    WHERE updated_at > coalesce(CAST(:links_since AS timestamptz), '-infinity')
+    UNION
+    SELECT l.investor_id FROM funding_round_investors l
+    JOIN funding_rounds f ON f.round_id = l.round_id
+    WHERE f.updated_at > coalesce(CAST(:rounds_since AS timestamptz), '-infinity')
+    UNION
+    SELECT CAST(payload->>'investor_id' AS integer) FROM deleted_records
+    WHERE entity = 'INVESTED_IN' AND payload IS NOT NULL
+      AND deleted_at > coalesce(CAST(:deletions_since AS timestamptz), '-infinity')
+"""
+
+# Companies without rounds or layoffs get zeros, so a deletion clears the rollup
+COMPANY_AGGREGATES_SQL = f"""
+WITH changed AS ({CHANGED_COMPANIES_SQL}),
+rounds AS (
+    SELECT company_id, sum(amount) AS total_raised, count(*) AS rounds, max(date) AS last_round
+    FROM funding_rounds WHERE company_id IN (SELECT company_id FROM changed)
+    GROUP BY company_id
+),
+backers AS (
+    SELECT f.company_id, count(DISTINCT l.investor_id) AS investors
+    FROM funding_rounds f JOIN funding_round_investors l ON l.round_id = f.round_id
+    WHERE f.company_id IN (SELECT company_id FROM changed)
+    GROUP BY f.company_id
+),
+layoffs AS (
+    SELECT company_id, count(*) AS events, sum(num_laid_off) AS laid_off, max(date) AS last_layoff
+    FROM layoff_events WHERE company_id IN (SELECT company_id FROM changed)
+    GROUP BY company_id
+)
+SELECT c.company_id,
+       coalesce(r.total_raised, 0) AS total_raised,
+       coalesce(r.rounds, 0)       AS funding_round_count,
+       r.last_round                AS last_round_date,
+       coalesce(b.investors, 0)    AS investor_count,
+       coalesce(l.events, 0)       AS layoff_event_count,
+       coalesce(l.laid_off, 0)     AS total_laid_off,
+       l.last_layoff               AS last_layoff_date
+FROM companies c
+JOIN changed ch ON ch.company_id = c.company_id
+LEFT JOIN rounds r  ON r.company_id = c.company_id
+LEFT JOIN backers b ON b.company_id = c.company_id
+LEFT JOIN layoffs l ON l.company_id = c.company_id
+WHERE c.canonical_id IS NULL
+ORDER BY c.company_id
+"""
+
+INVESTOR_AGGREGATES_SQL = f"""
+WITH changed AS ({CHANGED_INVESTORS_SQL}),
+portfolio AS (
+    SELECT l.investor_id,
+           count(DISTINCT f.company_id) AS companies,
+           count(*)                     AS investments,
+           max(f.date)                  AS last_investment
+    FROM funding_round_investors l JOIN funding_rounds f ON f.round_id = l.round_id
+    WHERE l.investor_id IN (SELECT investor_id FROM changed)
+    GROUP BY l.investor_id
+)
+SELECT i.investor_id,
+       coalesce(p.companies, 0)   AS portfolio_size,
+       coalesce(p.investments, 0) AS investment_count,
+       p.last_investment          AS last_investment_date
+FROM investors i
+JOIN changed ch ON ch.investor_id = i.investor_id
+LEFT JOIN portfolio p ON p.investor_id = i.investor_id
+ORDER BY i.investor_id
+"""
+
+COMPANY_AGGREGATES_QUERY = """
+UNWIND $rows AS row
+MATCH (c:Company {company_id: row.company_id})
+SET c.total_raised        = row.total_raised,
+    c.funding_round_count = row.funding_round_count,
+    c.last_round_date     = date(row.last_round_date),
+    c.investor_count      = row.investor_count,
+    c.layoff_event_count  = row.layoff_event_count,
+    c.total_laid_off      = row.total_laid_off,
+    c.last_layoff_date    = date(row.last_layoff_date)
+"""
+
+INVESTOR_AGGREGATES_QUERY = """
+UNWIND $rows AS row
+MATCH (i:Investor {investor_id: row.investor_id})
+SET i.portfolio_size       = row.portfolio_size,
+    i.investment_count     = row.investment_count,
+    i.last_investment_date = date(row.last_investment_date)
+"""
+
+# (label, Postgres rollup, Cypher write)
+AGGREGATE_PLAN = [
+    ('Company (aggregates)', COMPANY_AGGREGATES_SQL, COMPANY_AGGREGATES_QUERY),
+    ('Investor (aggregates)', INVESTOR_AGGREGATES_SQL, INVESTOR_AGGREGATES_QUERY),
+]
+
+def aggregate_row(r):
+    row = dict(r._mapping)
+    for key, value in row.items():
+        if hasattr(value, 'isoformat'):
+            row[key] = value.isoformat()
+    return row
+
+def changed_aggregates(sql_session, marks, batch_size):
+    """
+    Yield (label, Cypher write, rows) for every rollup to refresh. marks holds
+    the previous sync's 'FundingRound', 'LayoffEvent', 'INVESTED_IN' and
+    'deletions' marks; None means recompute everything.
+    """
+    if marks is None:
+        # Every entity through :full; an 'infinity' mark skips the change scans
+        params = dict.fromkeys(['rounds_since', 'layoffs_since', 'links_since', 'deletions_since'],
+                               'infinity')
+        params['full'] = True
+    else:
+        params = {
+            'full':            False,
+            'rounds_since':    marks.get('FundingRound'),
+            'layoffs_since':   marks.get('LayoffEvent'),
+            'links_since':     marks.get('INVESTED_IN'),
+            'deletions_since': marks.get('deletions'),
+        }
+    for label, sql, query in AGGREGATE_PLAN:
+        rows = sql_session.execute(text(sql).execution_options(yield_per=batch_size), params)
+        yield label, query, (aggregate_row(r) for r in rows)
@@ -0,0 +1,260 @@
+# graph/bulk_export.py
+#
+# Full graph rebuilds through `neo4j-admin database import` instead of Bolt.
+# The Postgres tables are streamed into gzip-compressed node and relationship
+# CSV files (one header file plus id-range part files per table), written by
+# parallel worker processes that all read the same Postgres snapshot, and an
+# import.sh with the matching neo4j-admin command is written next to them.
+#
+#   python -m graph.bulk_export export/ --workers 8 --mark-synced
+#   ./export/import.sh            # with Neo4j stopped
+#   python -m graph.neo4j_loader --incremental   # constraints + catch-up
+#
+# Node properties match the row builders used by graph/neo4j_loader.py, so an
+# imported graph and a MERGE-loaded one are interchangeable.
+
+import os
+import csv
+import gzip
+import json
+import time
+import shlex
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import select, func, text
+from db.session import SessionLocal, engine
+from db.models import (
+    Company,
+    LayoffEvent,
+    Investor,
+    FundingRound,
+    FundingRoundInvestor,
+    DeletedRecord,
+)
+from graph.parallel import id_ranges
+from pipeline import metrics
+from graph.neo4j_loader import (
+    company_row,
+    layoff_row,
+    investor_row,
+    funding_round_row,
+    underwent_layoff_row,
+    raised_row,
+    invested_in_row,
+    stream_changed_rows,
+    save_high_water_marks,
+    DELETIONS_ENTITY,
+)
+from graph.aggregates import AGGREGATES_ENTITY
+from dotenv import load_dotenv
+
+load_dotenv()
+EXPORT_WORKERS     = int(os.getenv("EXPORT_WORKERS", str(os.cpu_count() or 4)))
+# Rows per part file; large tables are split so several workers share them
+EXPORT_PART_ROWS   = int(os.getenv("EXPORT_PART_ROWS", "1000000"))
+EXPORT_GZIP_LEVEL  = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+EXPORT_CHUNK_SIZE  = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+NEO4J_DATABASE     = os.getenv("NEO4J_DATABASE", "neo4j")
+
+# (file stem, import group, model, id column, sync entity, row builder,
+#  [(row key, header field)]). Node files carry the label as the import group,
+# relationship files the relationship type; ids are imported as integers.
+NODE_FILES = [
+    ('companies', 'Company', Company, 'company_id', 'Company', company_row, [
+        ('company_id',     'company_id:ID(Company)'),
+        ('name',           'name'),
+        ('type',           'type'),
+        ('founded_year',   'founded_year:int'),
+        ('website',        'website'),
+        ('employee_count', 'employee_count:int'),
+        ('hq_location',    'hq_location'),
+        ('external_ids',   'external_ids'),
+    ]),
+    ('layoff_events', 'LayoffEvent', LayoffEvent, 'layoff_id', 'LayoffEvent', layoff_row, [
+        ('layoff_id',        'layoff_id:ID(LayoffEvent)'),
+        ('date',             'date:date'),
+        ('num_laid_off',     'num_laid_off:int'),
+        ('percent_laid_off', 'percent_laid_off:float'),
+        ('description',      'description'),
+        ('source_url',       'source_url'),
+    ]),
+    ('investors', 'Investor', Investor, 'investor_id', 'Investor', investor_row, [
+        ('investor_id',  'investor_id:ID(Investor)'),
+        ('name',         'name'),
+        ('type',         'type'),
+        ('external_ids', 'external_ids'),
+    ]),
+    ('funding_rounds', 'FundingRound', FundingRound, 'round_id', 'FundingRound', funding_round_row, [
+        ('round_id',   'round_id:ID(FundingRound)'),
+        ('date',       'date:date'),
+        ('round_type', 'round_type'),
+        ('amount',     'amount:float'),
+        ('details',    'details'),
+    ]),
+]
+RELATIONSHIP_FILES = [
+    ('underwent_layoff', 'UNDERWENT_LAYOFF', LayoffEvent, 'layoff_id', None, underwent_layoff_row, [
+        ('company_id', ':START_ID(Company)'),
+        ('layoff_id',  ':END_ID(LayoffEvent)'),
+    ]),
+    ('raised', 'RAISED', FundingRound, 'round_id', None, raised_row, [
+        ('company_id', ':START_ID(Company)'),
+        ('round_id',   ':END_ID(FundingRound)'),
+    ]),
+    ('invested_in', 'INVESTED_IN', FundingRoundInvestor, 'id', 'INVESTED_IN', invested_in_row, [
+        ('investor_id', ':START_ID(Investor)'),
+        ('round_id',    ':END_ID(FundingRound)'),
+    ]),
+]
+EXPORT_FILES = {spec[0]: spec for spec in NODE_FILES + RELATIONSHIP_FILES}
+
+def header_path(out_dir, stem):
+    return os.path.join(out_dir, f"{stem}.header.csv")
+
+def part_path(out_dir, stem, part):
+    return os.path.join(out_dir, f"{stem}.part{part:04d}.csv.gz")
+
+def _init_worker():
+    engine.dispose(close=False)  # forked workers open their own connections
+
+def export_part(stem, part, id_range, out_dir, snapshot, gzip_level, chunk_size):
+    """Write one id range of one table as a gzipped CSV part; returns (stem, rows)."""
+    _, _, model, id_column, _, to_row, columns = EXPORT_FILES[stem]
+    keys = [key for key, _ in columns]
+    session = SessionLocal()
+    try:
+        conn = session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+        # Read exactly what the coordinator saw, whichever worker gets the part
+        conn.execute(text("SET TRANSACTION SNAPSHOT :snapshot"), {'snapshot': snapshot})
+        rows = stream_changed_rows(session, model, None, chunk_size, id_column, id_range)
+        total = 0
+        with gzip.open(part_path(out_dir, stem, part), 'wt', encoding='utf-8', newline='',
+                       compresslevel=gzip_level) as fh:
+            writer = csv.writer(fh)
+            for r in rows:
+                row = to_row(r)
+                writer.writerow([row[k] for k in keys])
+                total += 1
+    finally:
+        session.close()
+    return stem, total
+
+def import_command(out_dir, parts, database=NEO4J_DATABASE):
+    """The neo4j-admin invocation for the files in out_dir (paths relative to it)."""
+    args = [
+        'neo4j-admin', 'database', 'import', 'full', database,
+        '--overwrite-destination', '--id-type=integer', '--multiline-fields=true',
+        # csv writes None as an empty field; leave the property unset, as the Bolt loader does
+        '--ignore-empty-strings=true',
+    ]
+    for flag, specs in [('--nodes', NODE_FILES), ('--relationships', RELATIONSHIP_FILES)]:
+        for stem, group, *_ in specs:
+            files = [os.path.basename(header_path(out_dir, stem))]
+            files += [os.path.basename(part_path(out_dir, stem, p)) for p in parts.get(stem, [])]
+            args.append(f"{flag}={group}={','.join(files)}")
+    return args
+
+def write_import_script(out_dir, command):
+    path = os.path.join(out_dir, 'import.sh')
+    with open(path, 'w') as fh:
+        fh.write("#!/bin/sh\n# Run with the Neo4j server stopped; replaces the database.\n")
+        fh.write('cd "$(dirname "$0")" || exit 1\n')
+        fh.write(' \\\n  '.join(shlex.quote(a) for a in command) + '\n')
+    os.chmod(path, 0o755)
+    return path
+
+def export_for_import(out_dir: str, workers: int = EXPORT_WORKERS, part_rows: int = EXPORT_PART_ROWS,
+                      gzip_level: int = EXPORT_GZIP_LEVEL, chunk_size: int = EXPORT_CHUNK_SIZE,
+                      mark_synced: bool = False) -> dict:
+    """
+    Export every graph node and relationship to neo4j-admin import CSVs in
+    out_dir and write import.sh. All parts are read from one exported
+    Postgres snapshot, so relationships never point at a node missing from
+    the node files. With mark_synced=True the sync high-water marks are set
+    to that snapshot, so the next incremental load only sends later changes.
+    Returns the manifest (row counts, marks) also saved as manifest.json.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    session = SessionLocal()
+    try:
+        # Hold the snapshot open in this transaction until every worker is done
+        conn = session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+        snapshot = conn.execute(text("SELECT pg_export_snapshot()")).scalar()
+
+        tasks, parts, marks = [], {}, {}
+        for stem, _, model, id_column, entity, _, columns in NODE_FILES + RELATIONSHIP_FILES:
+            with open(header_path(out_dir, stem), 'w', newline='') as fh:
+                csv.writer(fh).writerow([field for _, field in columns])
+
+            table = model.__table__
+            lo, hi, count, mark = session.execute(select(
+                func.min(table.c[id_column]), func.max(table.c[id_column]),
+                func.count(), func.max(table.c.updated_at),
+            )).one()
+            if entity:
+                marks[entity] = mark
+            ranges = id_ranges(lo, hi, max(1, -(-count // part_rows)))
+            parts[stem] = list(range(len(ranges)))
+            tasks += [(stem, i, r) for i, r in enumerate(ranges)]
+        marks[DELETIONS_ENTITY] = session.execute(select(func.max(DeletedRecord.deleted_at))).scalar()
+        # The CSVs carry no rollups; the next sync recomputes all of them
+        marks[AGGREGATES_ENTITY] = None
+
+        print(f"Exporting {len(tasks)} CSV parts with {workers} workers…")
+        engine.dispose()  # don't share idle pooled connections with forked workers
+        totals = dict.fromkeys(EXPORT_FILES, 0)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool, \
+                metrics.stage('bulk_export', parts=len(tasks), workers=workers) as st:
+            # Widest id ranges first so a large table doesn't start last
+            futures = [
+                pool.submit(export_part, stem, part, id_range, out_dir, snapshot,
+                            gzip_level, chunk_size)
+                for stem, part, id_range in sorted(tasks, key=lambda t: t[2][0] - t[2][1])
+            ]
+            for future in futures:
+                stem, total = future.result()
+                totals[stem] += total
+                st.rows += total
+        session.rollback()
+
+        elapsed = time.perf_counter() - start
+        for stem, total in totals.items():
+            print(f"  {stem:<18} {total:>10} rows")
+        print(f"  … exported in {elapsed:.1f}s")
+
+        command = import_command(out_dir, parts)
+        script = write_import_script(out_dir, command)
+        manifest = {
+            'exported_at': datetime.now().astimezone().isoformat(),
+            'rows':        totals,
+            'marks':       {e: m.isoformat() if m else None for e, m in marks.items()},
+            'command':     command,
+        }
+        with open(os.path.join(out_dir, 'manifest.json'), 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+
+        if mark_synced:
+            save_high_water_marks(session, marks)
+            print("  sync marks set to the export snapshot")
+        print(f"Import with: {script} (Neo4j stopped), then "
+              f"`python -m graph.neo4j_loader --incremental` to create constraints and catch up")
+        return manifest
+    finally:
+        session.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the graph as neo4j-admin import CSVs")
+    parser.add_argument("out_dir", nargs="?", default="export")
+    parser.add_argument("--workers", type=int, default=EXPORT_WORKERS)
+    parser.add_argument("--part-rows", type=int, default=EXPORT_PART_ROWS)
+    parser.add_argument("--gzip-level", type=int, default=EXPORT_GZIP_LEVEL)
+    parser.add_argument("--mark-synced", action="store_true",
+                        help="set the incremental sync marks to the exported snapshot")
+    args = parser.parse_args()
+    export_for_import(args.out_dir, args.workers, args.part_rows, args.gzip_level,
+                      mark_synced=args.mark_synced)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+# graph/csr.py
+#
+# Compact in-memory copy of the graph for local analytics (co-investor
+# recommendations, k-hop questions, degree statistics) without a Neo4j round
+# trip per query. Built straight from the Postgres tables with NumPy:
+#
+#   - each node type is a sorted int32 array of database ids; a node's local
+#     index is its position there (np.searchsorted), so there are no
+#     per-node Python objects or dicts
+#   - each relationship type is a CSR adjacency in both directions
+#     (int64 indptr + int32 indices, ~8 bytes per edge and direction)
+#   - FundingRound and LayoffEvent dates are int32 days since 1970-01-01
+#
+# Saved as a directory of .npy files and reopened memory-mapped, so a reload
+# is instant and only the pages a query touches are read.
+#
+#   python -m graph.csr build graph.csr
+#   python -m graph.csr stats graph.csr
+#   python -m graph.csr co-investors graph.csr 42 --top 10
+#   python -m graph.csr funded-before-layoff graph.csr --within-days 365
+#
+# Requires numpy (optional dependency, only this module uses it).
+
+import os
+import json
+import time
+import shutil
+import argparse
+from datetime import date, datetime, timezone
+import numpy as np
+
+NODE_TYPES = ['Company', 'FundingRound', 'Investor', 'LayoffEvent']
+# name -> (source node type, target node type), as in the Neo4j graph
+RELATIONSHIPS = {
+    'RAISED':           ('Company', 'FundingRound'),
+    'UNDERWENT_LAYOFF': ('Company', 'LayoffEvent'),
+    'INVESTED_IN':      ('Investor', 'FundingRound'),
+}
+DATED_TYPES = ['FundingRound', 'LayoffEvent']
+
+EPOCH   = date(1970, 1, 1)
+NO_DATE = np.iinfo(np.int32).min
+FORMAT_VERSION = 1
+CSR_CHUNK_SIZE = int(os.getenv("CSR_CHUNK_SIZE", "100000"))
+
+def build_csr(src, dst, n_src):
+    """(indptr, indices) with the dst of every src grouped by src (stable in input order)."""
+    order = np.argsort(src, kind='stable')
+    indices = dst[order].astype(np.int32, copy=False)
+    indptr = np.zeros(n_src + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_src), out=indptr[1:])
+    return indptr, indices
+
+def gather(indptr, indices, rows):
+    """Concatenated neighbor lists of rows, plus the row position each neighbor came from."""
+    rows = np.asarray(rows, dtype=np.int64)
+    starts, ends = indptr[rows], indptr[rows + 1]
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    # Position of every neighbor inside indices: its row's start plus its rank in the row
+    first = np.cumsum(lengths) - lengths
+    offsets = starts[owner] + (np.arange(total) - first[owner])
+    return indices[offsets], owner
+
+class CSRGraph:
+    """
+    Company-FundingRound-Investor-LayoffEvent graph as id arrays and CSR
+    adjacencies. Node arguments and results are local indices unless a
+    method says database ids; use index_of()/ids_of() to convert.
+    """
+    def __init__(self, ids, adjacency, days, meta=None):
+        self.ids       = ids        # node type -> sorted int32 database ids
+        self.adjacency = adjacency  # (relationship, reverse) -> (indptr, indices)
+        self.days      = days       # node type -> int32 days since epoch, NO_DATE if unknown
+        self.meta      = meta or {}
+
+    # -- ids -----------------------------------------------------------------
+
+    def count(self, node_type) -> int:
+        return len(self.ids[node_type])
+
+    def index_of(self, node_type, db_ids):
+        """Local indices of database ids; -1 where the id is not in the graph."""
+        ids = self.ids[node_type]
+        db_ids = np.atleast_1d(np.asarray(db_ids, dtype=np.int64))
+        pos = np.searchsorted(ids, db_ids)
+        found = pos < len(ids)
+        found[found] = ids[pos[found]] == db_ids[found]
+        return np.where(found, pos, -1)
+
+    def ids_of(self, node_type, indices):
+        return self.ids[node_type][np.asarray(indices, dtype=np.int64)]
+
+    # -- traversal -----------------------------------------------------------
+
+    def csr(self, relationship, reverse=False):
+        return self.adjacency[(relationship, reverse)]
+
+    def end_type(self, relationship, reverse=False):
+        src, dst = RELATIONSHIPS[relationship]
+        return src if reverse else dst
+
+    def neighbors(self, relationship, node, reverse=False):
+        """Neighbor indices of one node along relationship (reverse: against its direction)."""
+        indptr, indices = self.csr(relationship, reverse)
+        return indices[indptr[node]:indptr[node + 1]]
+
+    def expand(self, relationship, frontier, reverse=False, unique=True):
+        """All neighbors of the frontier nodes in one vectorized step."""
+        indptr, indices = self.csr(relationship, reverse)
+        found, _ = gather(indptr, indices, frontier)
+        return np.unique(found) if unique else found
+
+    def traverse(self, frontier, path):
+        """
+        Follow path, a list of (relationship, reverse) steps, from the
+        frontier indices; returns the distinct nodes reached at the end.
+        E.g. investor -> companies: [('INVESTED_IN', False), ('RAISED', True)].
+        """
+        frontier = np.unique(np.asarray(frontier, dtype=np.int64))
+        for relationship, reverse in path:
+            frontier = self.expand(relationship, frontier, reverse)
+        return frontier
+
+    def degree(self, relationship, reverse=False):
+        indptr, _ = self.csr(relationship, reverse)
+        return np.diff(indptr)
+
+    def degree_stats(self) -> dict:
+        """Degree distribution summary for every relationship, in both directions."""
+        stats = {}
+        for relationship, (src, dst) in RELATIONSHIPS.items():
+            for reverse, node_type in [(False, src), (True, dst)]:
+                deg = self.degree(relationship, reverse)
+                key = f"{node_type} {'<-' if reverse else '->'}[{relationship}]"
+                if len(deg) == 0:
+                    stats[key] = {'nodes': 0}
+                    continue
+                stats[key] = {
+                    'nodes':    len(deg),
+                    'edges':    int(deg.sum()),
+                    'isolated': int((deg == 0).sum()),
+                    'mean':     round(float(deg.mean()), 3),
+                    'median':   float(np.median(deg)),
+                    'p99':      float(np.percentile(deg, 99)),
+                    'max':      int(deg.max()),
+                }
+        return stats
+
+    # -- analytics -----------------------------------------------------------
+
+    def co_investors(self, investor, top=None):
+        """
+        (investor indices, shared round counts) of everyone who invested in a
+        round alongside `investor`, most shared rounds first.
+        """
+        rounds = self.neighbors('INVESTED_IN', investor)
+        partners = self.expand('INVESTED_IN', rounds, reverse=True, unique=False)
+        counts = np.bincount(partners, minlength=self.count('Investor'))
+        counts[investor] = 0
+        found = np.flatnonzero(counts)
+        order = np.lexsort((found, -counts[found]))[:top]
+        return found[order], counts[found[order]]
+
+    def co_investment_projection(self, min_shared=1, max_round_size=50):
+        """
+        Investor-investor projection of the INVESTED_IN bipartite graph:
+        arrays (a, b, shared rounds) with a < b. Rounds with more than
+        max_round_size investors are left out, as they would add
+        quadratically many weak pairs.
+        """
+        indptr, indices = self.csr('INVESTED_IN', reverse=True)  # round -> investors
+        sizes = np.diff(indptr)
+        n = self.count('Investor')
+        codes = []
+        # Rounds of equal size are stacked into a matrix and paired in one step
+        for k in np.unique(sizes[(sizes >= 2) & (sizes <= max_round_size)]):
+            rounds = np.flatnonzero(sizes == k)
+            members, _ = gather(indptr, indices, rounds)
+            members = np.sort(members.reshape(len(rounds), k), axis=1).astype(np.int64)
+            i, j = np.triu_indices(k, 1)
+            codes.append((members[:, i] * n + members[:, j]).ravel())
+        if not codes:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        pairs, shared = np.unique(np.concatenate(codes), return_counts=True)
+        keep = shared >= min_shared
+        pairs, shared = pairs[keep], shared[keep]
+        return pairs // n, pairs % n, shared
+
+    def funded_before_layoff(self, within_days=None):
+        """
+        Distinct (investor index, company index) pairs where the investor
+        funded a round of the company and the company had a layoff after the
+        round's date (within within_days of it, if given).
+        """
+        round_company = self.company_of('FundingRound')
+        layoff_company = self.company_of('LayoffEvent')
+        round_day = self.days['FundingRound'].astype(np.int64)
+        layoff_day = self.days['LayoffEvent'].astype(np.int64)
+
+        # Layoffs as sorted (company, day) keys, so "first layoff of company c
+        # after day d" is one searchsorted for all investments at once
+        dated = (layoff_day != NO_DATE) & (layoff_company >= 0)
+        keys = np.sort((layoff_company[dated] << 32) | (layoff_day[dated] - NO_DATE))
+
+        investors, rounds = self.edges('INVESTED_IN')
+        keep = (round_day[rounds] != NO_DATE) & (round_company[rounds] >= 0)
+        investors, rounds = investors[keep], rounds[keep]
+        companies = round_company[rounds]
+        after = round_day[rounds] - NO_DATE + 1
+        pos = np.searchsorted(keys, (companies << 32) | after)
+        hit = pos < len(keys)
+        nxt = keys[np.minimum(pos, len(keys) - 1)]
+        hit &= (nxt >> 32) == companies
+        if within_days is not None:
+            hit &= (nxt & 0xFFFFFFFF) < after + within_days
+        pairs = np.unique((investors[hit] << 32) | companies[hit])
+        return pairs >> 32, pairs & 0xFFFFFFFF
+
+    def company_of(self, node_type):
+        """Company index of every FundingRound or LayoffEvent (each has exactly one)."""
+        relationship = 'RAISED' if node_type == 'FundingRound' else 'UNDERWENT_LAYOFF'
+        indptr, indices = self.csr(relationship, reverse=True)
+        company = np.full(self.count(node_type), -1, dtype=np.int64)
+        has = np.diff(indptr) > 0
+        company[has] = indices[indptr[:-1][has]]
+        return company
+
+    def edges(self, relationship):
+        """(source indices, target indices) of every edge, as int64 arrays."""
+        indptr, indices = self.csr(relationship)
+        src = np.repeat(np.arange(len(indptr) - 1, dtype=np.int64), np.diff(indptr))
+        return src, indices.astype(np.int64)
+
+    def nbytes(self) -> int:
+        arrays = list(self.ids.values()) + list(self.days.values())
+        arrays += [a for pair in self.adjacency.values() for a in pair]
+        return sum(a.nbytes for a in arrays)
+
+# -- build from Postgres -------------------------------------------------------
+
+def _fetch(session, stmt, columns, chunk_size):
+    """Stream a select into one int64 array per column."""
+    parts = [[] for _ in range(columns)]
+    result = session.execute(stmt.execution_options(yield_per=chunk_size))
+    for chunk in result.partitions():
+        block = np.array(chunk, dtype=np.int64).reshape(-1, columns)
+        for i in range(columns):
+            parts[i].append(block[:, i])
+    return [np.concatenate(p) if p else np.empty(0, dtype=np.int64) for p in parts]
+
+def _local(ids, db_ids):
+    """(local indices, found mask) of db_ids in the sorted ids array."""
+    if len(ids) == 0:
+        return np.zeros(len(db_ids), dtype=np.int64), np.zeros(len(db_ids), dtype=bool)
+    pos = np.minimum(np.searchsorted(ids, db_ids), len(ids) - 1)
+    return pos, ids[pos] == db_ids
+
+def build_graph(chunk_size: int = CSR_CHUNK_SIZE) -> CSRGraph:
+    """Read the graph's nodes and edges from Postgres into a CSRGraph."""
+    from sqlalchemy import select, func
+    from db.session import SessionLocal
+    from db.models import Company, FundingRound, Investor, LayoffEvent, FundingRoundInvestor
+
+    def day(column):
+        return func.coalesce(column - EPOCH, int(NO_DATE))
+
+    start = time.perf_counter()
+    session = SessionLocal()
+    try:
+        (companies,) = _fetch(session, select(Company.company_id)
+                              .where(Company.canonical_id.is_(None))
+                              .order_by(Company.company_id), 1, chunk_size)
+        (investors,) = _fetch(session, select(Investor.investor_id)
+                              .order_by(Investor.investor_id), 1, chunk_size)
+        rounds, round_companies, round_days = _fetch(session, select(
+            FundingRound.round_id, FundingRound.company_id, day(FundingRound.date)
+        ).order_by(FundingRound.round_id), 3, chunk_size)
+        layoffs, layoff_companies, layoff_days = _fetch(session, select(
+            LayoffEvent.layoff_id, LayoffEvent.company_id, day(LayoffEvent.date)
+        ).order_by(LayoffEvent.layoff_id), 3, chunk_size)
+        link_investors, link_rounds = _fetch(session, select(
+            FundingRoundInvestor.investor_id, FundingRoundInvestor.round_id
+        ), 2, chunk_size)
+    finally:
+        session.close()
+
+    ids = {
+        'Company':      companies.astype(np.int32),
+        'FundingRound': rounds.astype(np.int32),
+        'Investor':     investors.astype(np.int32),
+        'LayoffEvent':  layoffs.astype(np.int32),
+    }
+    days = {
+        'FundingRound': round_days.astype(np.int32),
+        'LayoffEvent':  layoff_days.astype(np.int32),
+    }
+    edge_lists = {
+        # Rounds and layoffs are in id order, so their local index is their position
+        'RAISED':           (round_companies, np.arange(len(rounds))),
+        'UNDERWENT_LAYOFF': (layoff_companies, np.arange(len(layoffs))),
+        'INVESTED_IN':      (link_investors, link_rounds),
+    }
+    adjacency, dropped = {}, {}
+    for relationship, (src_ids, dst) in edge_lists.items():
+        src_type, dst_type = RELATIONSHIPS[relationship]
+        src, src_ok = _local(ids[src_type], src_ids)
+        if relationship == 'INVESTED_IN':
+            dst, dst_ok = _local(ids[dst_type], dst)
+        else:
+            dst_ok = np.ones(len(dst), dtype=bool)
+        keep = src_ok & dst_ok
+        dropped[relationship] = int((~keep).sum())
+        src, dst = src[keep], dst[keep]
+        adjacency[(relationship, False)] = build_csr(src, dst, len(ids[src_type]))
+        adjacency[(relationship, True)] = build_csr(dst, src, len(ids[dst_type]))
+
+    meta = {
+        'format':    FORMAT_VERSION,
+        'built_at':  datetime.now(timezone.utc).isoformat(),
+        'seconds':   round(time.perf_counter() - start, 3),
+        'nodes':     {t: len(a) for t, a in ids.items()},
+        'edges':     {r: int(len(adjacency[(r, False)][1])) for r in RELATIONSHIPS},
+        'dropped_edges': dropped,
+    }
+    return CSRGraph(ids, adjacency, days, meta)
+
+# -- persistence ---------------------------------------------------------------
+
+def _arrays(graph):
+    for node_type, a in graph.ids.items():
+        yield f"ids.{node_type}", a
+    for node_type, a in graph.days.items():
+        yield f"days.{node_type}", a
+    for (relationship, reverse), (indptr, indices) in graph.adjacency.items():
+        direction = 'rev' if reverse else 'fwd'
+        yield f"{relationship}.{direction}.indptr", indptr
+        yield f"{relationship}.{direction}.indices", indices
+
+def save_graph(graph: CSRGraph, path: str):
+    """Write the graph as a directory of .npy files, replacing path atomically."""
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in _arrays(graph):
+        np.save(os.path.join(tmp, f"{name}.npy"), array)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as fh:
+        json.dump(graph.meta, fh, indent=2)
+    if os.path.exists(path):
+        old = f"{path}.old"
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old)
+    else:
+        os.replace(tmp, path)
+
+def load_graph(path: str, mmap: bool = True) -> CSRGraph:
+    """Open a saved graph; with mmap the arrays are paged in from disk on use."""
+    with open(os.path.join(path, 'meta.json')) as fh:
+        meta = json.load(fh)
+    if meta.get('format') != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported CSR format {meta.get('format')}, rebuild it")
+    mode = 'r' if mmap else None
+
+    def load(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+
+    ids  = {t: load(f"ids.{t}") for t in NODE_TYPES}
+    days = {t: load(f"days.{t}") for t in DATED_TYPES}
+    adjacency = {
+        (r, reverse): (load(f"{r}.{d}.indptr"), load(f"{r}.{d}.indices"))
+        for r in RELATIONSHIPS for reverse, d in [(False, 'fwd'), (True, 'rev')]
+    }
+    return CSRGraph(ids, adjacency, days, meta)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local CSR copy of the graph for analytics")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="build from Postgres and save")
+    p.add_argument("path")
+    p = sub.add_parser("stats", help="node/edge counts and degree distributions")
+    p.add_argument("path")
+    p = sub.add_parser("co-investors", help="investors sharing the most rounds with one investor")
+    p.add_argument("path")
+    p.add_argument("investor_id", type=int)
+    p.add_argument("--top", type=int, default=10)
+    p = sub.add_parser("funded-before-layoff", help="investors whose portfolio companies later laid off")
+    p.add_argument("path")
+    p.add_argument("--within-days", type=int)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        graph = build_graph()
+        save_graph(graph, args.path)
+        print(f"Built {graph.meta['nodes']} nodes, {graph.meta['edges']} edges "
+              f"in {graph.meta['seconds']}s ({graph.nbytes() / 2**20:.1f} MB) -> {args.path}")
+        return
+
+    start = time.perf_counter()
+    graph = load_graph(args.path)
+    if args.command == "stats":
+        print(json.dumps({'meta': graph.meta, 'degrees': graph.degree_stats()}, indent=2))
+    elif args.command == "co-investors":
+        (investor,) = graph.index_of('Investor', args.investor_id)
+        if investor < 0:
+            parser.error(f"investor {args.investor_id} is not in the graph")
+        partners, shared = graph.co_investors(investor, args.top)
+        for investor_id, n in zip(graph.ids_of('Investor', partners), shared):
+            print(f"  investor {investor_id}: {n} shared rounds")
+    elif args.command == "funded-before-layoff":
+        investors, companies = graph.funded_before_layoff(args.within_days)
+        counts = np.bincount(investors, minlength=graph.count('Investor'))
+        top = np.argsort(-counts)[:20]
+        print(f"{len(investors)} investor/company pairs")
+        for investor, n in zip(top, counts[top]):
+            if n:
+                print(f"  investor {graph.ids_of('Investor', investor)}: {n} companies")
+    print(f"  … {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,10 @@
 
 import os
 import json
-from neo4j import GraphDatabase
+import time
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
 from db.session import SessionLocal
 from db.models import (
     Company,
@@ -10,148 +13,529 @@ from db.models import (
     Investor,
     FundingRound,
     FundingRoundInvestor,
+    DeletedRecord,
+    GraphSyncState,
 )
+from sqlalchemy import select, func
+from graph.parallel import id_ranges, retry_transient, run_concurrently
+from graph.schema import ensure_schema
+from graph.aggregates import changed_aggregates, AGGREGATES_ENTITY
+from graph.queries import bump_load_generation
+from pipeline import metrics, clients
 from dotenv import load_dotenv
 
 load_dotenv()
-NEO4J_URI      = os.getenv("NEO4J_URI")
-NEO4J_USER     = os.getenv("NEO4J_USER")
-NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+NEO4J_URI        = os.getenv("NEO4J_URI")
+NEO4J_USER       = os.getenv("NEO4J_USER")
+NEO4J_PASSWORD   = os.getenv("NEO4J_PASSWORD")
+NEO4J_BATCH_SIZE = int(os.getenv("NEO4J_BATCH_SIZE", "1000"))
+NEO4J_WORKERS    = int(os.getenv("NEO4J_WORKERS", "1"))
+NEO4J_RETRIES    = int(os.getenv("NEO4J_RETRIES", "5"))
+NEO4J_SECONDARY_INDEXES = os.getenv("NEO4J_SECONDARY_INDEXES", "1") == "1"
+NEO4J_SYNC_LAG   = float(os.getenv("NEO4J_SYNC_LAG", "300"))  # seconds re-read before each mark
 
-def load_to_neo4j():
-    print("Connecting to Neo4j…")
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-    sql_session = SessionLocal()
+# Each statement receives a list of parameter maps as $rows and upserts the
+# whole batch in one round trip. The serial load MERGEs nodes and their
+# relationships in the same statement; the parallel load runs the *_NODE_
+# and relationship statements in separate phases.
+COMPANY_QUERY = """
+UNWIND $rows AS row
+MERGE (co:Company {company_id: row.company_id})
+SET co.name           = row.name,
+    co.type           = row.type,
+    co.founded_year   = row.founded_year,
+    co.website        = row.website,
+    co.employee_count = row.employee_count,
+    co.hq_location    = row.hq_location,
+    co.external_ids   = row.external_ids
+"""
 
-    with driver.session() as neo_session:
-        # 1) Companies
-        print("Upserting Company nodes…")
-        for c in sql_session.query(Company).all():
-            ext_ids = json.dumps(c.external_ids) if c.external_ids else None
-            neo_session.run(
-                """
-                MERGE (co:Company {company_id: $company_id})
-                SET co.name           = $name,
-                    co.type           = $type,
-                    co.founded_year   = $founded_year,
-                    co.website        = $website,
-                    co.employee_count = $employee_count,
-                    co.hq_location    = $hq_location,
-                    co.external_ids   = $external_ids
-                """,
-                {
-                    'company_id':     c.company_id,
-                    'name':           c.name,
-                    'type':           c.type,
-                    'founded_year':   c.founded_year,
-                    'website':        c.website,
-                    'employee_count': c.employee_count,
-                    'hq_location':    c.hq_location,
-                    'external_ids':   ext_ids,
-                }
-            )
+LAYOFF_NODE_QUERY = """
+UNWIND $rows AS row
+MERGE (ev:LayoffEvent {layoff_id: row.layoff_id})
+SET ev.date             = date(row.date),
+    ev.num_laid_off     = row.num_laid_off,
+    ev.percent_laid_off = row.percent_laid_off,
+    ev.description      = row.description,
+    ev.source_url       = row.source_url
+"""
 
-        # 2) LayoffEvents
-        print("Upserting LayoffEvent nodes…")
-        for e in sql_session.query(LayoffEvent).all():
-            neo_session.run(
-                """
-                MERGE (ev:LayoffEvent {layoff_id: $layoff_id})
-                SET ev.date             = date($date),
-                    ev.num_laid_off     = $num_laid_off,
-                    ev.percent_laid_off = $percent_laid_off,
-                    ev.description      = $description,
-                    ev.source_url       = $source_url
-                """,
-                {
-                    'layoff_id':       e.layoff_id,
-                    'date':            e.date.isoformat(),
-                    'num_laid_off':    e.num_laid_off,
-                    'percent_laid_off': e.percent_laid_off,
-                    'description':     e.description,
-                    'source_url':      e.source_url or "",
-                }
-            )
-            neo_session.run(
-                """
-                MATCH (co:Company {company_id: $company_id})
-                MATCH (ev:LayoffEvent {layoff_id: $layoff_id})
-                MERGE (co)-[:UNDERWENT_LAYOFF]->(ev)
-                """,
-                {
-                    'company_id': e.company_id,
-                    'layoff_id':  e.layoff_id
-                }
-            )
+UNDERWENT_LAYOFF_QUERY = """
+UNWIND $rows AS row
+MATCH (co:Company {company_id: row.company_id})
+MATCH (ev:LayoffEvent {layoff_id: row.layoff_id})
+MERGE (co)-[:UNDERWENT_LAYOFF]->(ev)
+"""
 
-        # 3) Investors
-        print("Upserting Investor nodes…")
-        for inv in sql_session.query(Investor).all():
-            inv_ext = json.dumps(inv.external_ids) if inv.external_ids else None
-            neo_session.run(
-                """
-                MERGE (i:Investor {investor_id: $investor_id})
-                SET i.name         = $name,
-                    i.type         = $type,
-                    i.external_ids = $external_ids
-                """,
-                {
-                    'investor_id':  inv.investor_id,
-                    'name':         inv.name,
-                    'type':         inv.type,
-                    'external_ids': inv_ext,
-                }
-            )
+LAYOFF_QUERY = LAYOFF_NODE_QUERY + """WITH ev, row
+MATCH (co:Company {company_id: row.company_id})
+MERGE (co)-[:UNDERWENT_LAYOFF]->(ev)
+"""
+
+INVESTOR_QUERY = """
+UNWIND $rows AS row
+MERGE (i:Investor {investor_id: row.investor_id})
+SET i.name         = row.name,
+    i.type         = row.type,
+    i.external_ids = row.external_ids
+"""
+
+FUNDING_ROUND_NODE_QUERY = """
+UNWIND $rows AS row
+MERGE (f:FundingRound {round_id: row.round_id})
+SET f.date       = date(row.date),
+    f.round_type = row.round_type,
+    f.amount     = row.amount,
+    f.details    = row.details
+"""
+
+RAISED_QUERY = """
+UNWIND $rows AS row
+MATCH (c:Company {company_id: row.company_id})
+MATCH (f:FundingRound {round_id: row.round_id})
+MERGE (c)-[:RAISED]->(f)
+"""
+
+FUNDING_ROUND_QUERY = FUNDING_ROUND_NODE_QUERY + """WITH f, row
+MATCH (c:Company {company_id: row.company_id})
+MERGE (c)-[:RAISED]->(f)
+"""
+
+INVESTED_IN_QUERY = """
+UNWIND $rows AS row
+MATCH (i:Investor {investor_id: row.investor_id})
+MATCH (f:FundingRound {round_id: row.round_id})
+MERGE (i)-[:INVESTED_IN]->(f)
+"""
+
+DELETE_NODE_QUERY = """
+UNWIND $rows AS row
+MATCH (n:{label} {{{key}: row.entity_id}})
+DETACH DELETE n
+"""
+
+DELETE_INVESTED_IN_QUERY = """
+UNWIND $rows AS row
+MATCH (:Investor {investor_id: row.investor_id})-[r:INVESTED_IN]->(:FundingRound {round_id: row.round_id})
+DELETE r
+"""
+
+def company_row(c):
+    return {
+        'company_id':     c.company_id,
+        'name':           c.name,
+        'type':           c.type,
+        'founded_year':   c.founded_year,
+        'website':        c.website,
+        'employee_count': c.employee_count,
+        'hq_location':    c.hq_location,
+        'external_ids':   json.dumps(c.external_ids) if c.external_ids else None,
+    }
+
+def layoff_row(e):
+    return {
+        'layoff_id':        e.layoff_id,
+        'company_id':       e.company_id,
+        'date':             e.date.isoformat(),
+        'num_laid_off':     e.num_laid_off,
+        'percent_laid_off': e.percent_laid_off,
+        'description':      e.description,
+        'source_url':       e.source_url or "",
+    }
+
+def investor_row(inv):
+    return {
+        'investor_id':  inv.investor_id,
+        'name':         inv.name,
+        'type':         inv.type,
+        'external_ids': json.dumps(inv.external_ids) if inv.external_ids else None,
+    }
+
+def funding_round_row(fr):
+    return {
+        'round_id':   fr.round_id,
+        'company_id': fr.company_id,
+        'date':       fr.date.isoformat() if fr.date else None,
+        'round_type': fr.round_type,
+        'amount':     fr.amount,
+        'details':    fr.details,
+    }
+
+def underwent_layoff_row(e):
+    return {
+        'company_id': e.company_id,
+        'layoff_id':  e.layoff_id,
+    }
+
+def raised_row(fr):
+    return {
+        'company_id': fr.company_id,
+        'round_id':   fr.round_id,
+    }
+
+def invested_in_row(link):
+    return {
+        'investor_id': link.investor_id,
+        'round_id':    link.round_id,
+    }
+
+def batched(rows, batch_size):
+    """Group an iterable of rows into lists of at most batch_size."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class _Raised:
+    def __init__(self, exc):
+        self.exc = exc
+
+_DONE = object()
+
+def prefetched(iterable, depth=2):
+    """
+    Consume iterable on a background thread, keeping at most depth items
+    ready, so Postgres reads overlap with the Neo4j writes of the previous batch.
+    """
+    ready = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as exc:
+            put(_Raised(exc))
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = ready.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Raised):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+def _run_batch(tx, query, rows):
+    tx.run(query, rows=rows).consume()
+
+def _write_batch(neo_session, query, rows):
+    # An unmanaged transaction: session.execute_write would retry on its own
+    # inside retry_transient's attempts
+    with neo_session.begin_transaction() as tx:
+        _run_batch(tx, query, rows)
+        tx.commit()
 
-        # 4) FundingRounds
-        print("Upserting FundingRound nodes & RAISING relationships…")
-        for fr in sql_session.query(FundingRound).all():
-            neo_session.run(
-                """
-                MERGE (f:FundingRound {round_id: $round_id})
-                SET f.date        = date($date),
-                    f.round_type = $round_type,
-                    f.amount     = $amount,
-                    f.details    = $details
-                """,
-                {
-                    'round_id':   fr.round_id,
-                    'date':       fr.date.isoformat() if fr.date else None,
-                    'round_type': fr.round_type,
-                    'amount':     fr.amount,
-                    'details':    fr.details,
-                }
+def report_rate(label, total, elapsed, batch_size):
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"  {label}: {total} rows in {elapsed:.2f}s ({rate:,.0f} rows/s, batch={batch_size})")
+
+def write_batches(neo_session, label, query, rows, batch_size=NEO4J_BATCH_SIZE,
+                  attempts=NEO4J_RETRIES, verbose=True):
+    """
+    Send rows to Neo4j in UNWIND batches, one explicit write transaction per
+    batch, and report the throughput for this entity type. A batch that fails
+    with a transient error (e.g. deadlock) is retried up to attempts times.
+    """
+    total = 0
+    start = time.perf_counter()
+    for batch in prefetched(batched(rows, batch_size)):
+        with metrics.timed('neo4j_write', label=label):
+            retry_transient(_write_batch, neo_session, query, batch, attempts=attempts)
+        metrics.inc('neo4j_rows_total', len(batch), label=label)
+        total += len(batch)
+    if verbose:
+        report_rate(label, total, time.perf_counter() - start, batch_size)
+    return total
+
+# Sync order matters: nodes referenced by a relationship MERGE must exist first.
+# (entity, model, graph key, upsert query, row builder, message)
+SYNC_PLAN = [
+    ('Company', Company, 'company_id', COMPANY_QUERY, company_row,
+     "Upserting Company nodes…"),
+    ('LayoffEvent', LayoffEvent, 'layoff_id', LAYOFF_QUERY, layoff_row,
+     "Upserting LayoffEvent nodes & UNDERWENT_LAYOFF relationships…"),
+    ('Investor', Investor, 'investor_id', INVESTOR_QUERY, investor_row,
+     "Upserting Investor nodes…"),
+    ('FundingRound', FundingRound, 'round_id', FUNDING_ROUND_QUERY, funding_round_row,
+     "Upserting FundingRound nodes & RAISED relationships…"),
+    ('INVESTED_IN', FundingRoundInvestor, None, INVESTED_IN_QUERY, invested_in_row,
+     "Linking Investors to FundingRounds…"),
+]
+
+# Parallel load: each phase is split into id-range partitions written
+# concurrently, and every node phase finishes before the relationship phase
+# starts. (label, sync entity, model, id column, query, row builder, tracks mark)
+NODE_PHASE = [
+    ('Company', 'Company', Company, 'company_id', COMPANY_QUERY, company_row, True),
+    ('Investor', 'Investor', Investor, 'investor_id', INVESTOR_QUERY, investor_row, True),
+    ('LayoffEvent', 'LayoffEvent', LayoffEvent, 'layoff_id', LAYOFF_NODE_QUERY, layoff_row, True),
+    ('FundingRound', 'FundingRound', FundingRound, 'round_id', FUNDING_ROUND_NODE_QUERY,
+     funding_round_row, True),
+]
+RELATIONSHIP_PHASE = [
+    ('UNDERWENT_LAYOFF', 'LayoffEvent', LayoffEvent, 'layoff_id', UNDERWENT_LAYOFF_QUERY,
+     underwent_layoff_row, False),
+    ('RAISED', 'FundingRound', FundingRound, 'round_id', RAISED_QUERY, raised_row, False),
+    ('INVESTED_IN', 'INVESTED_IN', FundingRoundInvestor, 'id', INVESTED_IN_QUERY,
+     invested_in_row, True),
+]
+PARTITIONS_PER_WORKER = 4
+
+DELETIONS_ENTITY = 'deletions'
+
+@clients.provider('neo4j_driver')
+def _neo4j_driver():
+    from neo4j import GraphDatabase
+    return GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+
+def get_high_water_marks(sql_session):
+    return {s.entity: s.high_water_mark for s in sql_session.query(GraphSyncState).all()}
+
+def save_high_water_marks(sql_session, marks):
+    now = datetime.now(timezone.utc)
+    for entity, mark in marks.items():
+        state = sql_session.get(GraphSyncState, entity) or GraphSyncState(entity=entity)
+        state.high_water_mark = mark
+        state.last_synced_at  = now
+        sql_session.add(state)
+    sql_session.commit()
+
+def overlap(since):
+    """
+    since moved back by NEO4J_SYNC_LAG. updated_at is the writing transaction's
+    start time, so a row committed after the last sync can carry an older
+    timestamp than its mark; re-reading the lag window picks it up again
+    (the MERGEs and deletes are idempotent).
+    """
+    return since - timedelta(seconds=NEO4J_SYNC_LAG) if since is not None else None
+
+class HighWaterMark:
+    """Remembers the newest updated_at among the rows streamed through it (never below since)."""
+    def __init__(self, since):
+        self.value = since
+
+    def see(self, row):
+        if self.value is None or row.updated_at > self.value:
+            self.value = row.updated_at
+        return row
+
+def stream_changed_rows(sql_session, model, since, chunk_size, id_column=None, id_range=None):
+    """
+    Column-only select of the rows of model inserted or updated after
+    overlap(since) (all rows when since is None), fetched from a server-side
+    cursor in chunks of chunk_size so memory stays flat however large the
+    table is.
+    id_range restricts the rows to an inclusive range of id_column.
+    """
+    table = model.__table__
+    stmt = select(table)
+    if since is not None:
+        stmt = stmt.where(table.c.updated_at > overlap(since))
+    if id_range is not None:
+        stmt = stmt.where(table.c[id_column].between(*id_range))
+    if 'canonical_id' in table.c:
+        # Aliases merged by db/canonical.py have no node of their own
+        stmt = stmt.where(table.c.canonical_id.is_(None))
+    stmt = stmt.order_by(table.c.updated_at).execution_options(yield_per=chunk_size)
+    return sql_session.execute(stmt)
+
+def sync_deletions(neo_session, sql_session, since, batch_size):
+    """Replay DeletedRecord tombstones newer than since (less the overlap); returns the new mark."""
+    q = sql_session.query(DeletedRecord)
+    if since is not None:
+        q = q.filter(DeletedRecord.deleted_at > overlap(since))
+    tombstones = q.order_by(DeletedRecord.deleted_at).all()
+    if not tombstones:
+        return since
+
+    # Relationships first, then child nodes, then companies
+    for entity, _, key, _, _, _ in reversed(SYNC_PLAN):
+        rows = [t for t in tombstones if t.entity == entity]
+        if not rows:
+            continue
+        if key is None:
+            query = DELETE_INVESTED_IN_QUERY
+            params = (t.payload for t in rows if t.payload)
+        else:
+            query = DELETE_NODE_QUERY.format(label=entity, key=key)
+            params = ({'entity_id': t.entity_id} for t in rows)
+        write_batches(neo_session, f"{entity} (deleted)", query, params, batch_size)
+    return max(since, tombstones[-1].deleted_at) if since is not None else tombstones[-1].deleted_at
+
+def sync_aggregates(neo_session, sql_session, marks, batch_size):
+    """
+    Refresh the Company/Investor rollup properties (see graph/aggregates.py)
+    for entities changed since marks (less the overlap), or for all of them
+    when marks is None.
+    """
+    if marks is not None:
+        marks = {entity: overlap(mark) for entity, mark in marks.items()}
+    total = 0
+    for label, query, rows in changed_aggregates(sql_session, marks, batch_size):
+        total += write_batches(neo_session, label, query, rows, batch_size)
+    sql_session.rollback()
+    return total
+
+def load_serial(neo_session, sql_session, marks, batch_size):
+    """Write SYNC_PLAN in order over one session; returns the new high-water marks."""
+    new_marks = {}
+    for entity, model, _, query, to_row, message in SYNC_PLAN:
+        print(message)
+        mark = HighWaterMark(marks.get(entity))
+        with metrics.stage(f"neo4j:{entity}") as st:
+            rows = stream_changed_rows(sql_session, model, mark.value, batch_size)
+            st.rows = write_batches(
+                neo_session, entity, query,
+                (to_row(mark.see(r)) for r in rows),
+                batch_size,
             )
-            neo_session.run(
-                """
-                MATCH (c:Company {company_id: $company_id})
-                MATCH (f:FundingRound {round_id: $round_id})
-                MERGE (c)-[:RAISED]->(f)
-                """,
-                {
-                    'company_id': fr.company_id,
-                    'round_id':   fr.round_id
-                }
+        new_marks[entity] = mark.value
+    return new_marks
+
+def load_partition(driver, task, since, id_range, batch_size, attempts):
+    """Write one id range of one phase task over its own Postgres and Neo4j sessions."""
+    label, _, model, id_column, query, to_row, _ = task
+    mark = HighWaterMark(since)
+    sql_session = SessionLocal()
+    try:
+        with driver.session() as neo_session:
+            rows = stream_changed_rows(sql_session, model, since, batch_size, id_column, id_range)
+            total = write_batches(
+                neo_session, label, query,
+                (to_row(mark.see(r)) for r in rows),
+                batch_size, attempts=attempts, verbose=False,
             )
+    finally:
+        sql_session.close()
+    return total, mark.value
+
+def load_phases_parallel(driver, sql_session, marks, batch_size, workers):
+    """
+    Run NODE_PHASE then RELATIONSHIP_PHASE, each as id-range partitions spread
+    over `workers` threads. Batches retry transient errors such as deadlocks.
+    Returns the new high-water mark of every tracked entity.
+    """
+    new_marks = {}
+    for name, phase in [("nodes", NODE_PHASE), ("relationships", RELATIONSHIP_PHASE)]:
+        print(f"Loading {name} with {workers} workers…")
+        jobs = []
+        for task in phase:
+            _, entity, model, id_column, _, _, tracks_mark = task
+            if tracks_mark:
+                new_marks[entity] = marks.get(entity)
+            column = model.__table__.c[id_column]
+            lo, hi = sql_session.execute(select(func.min(column), func.max(column))).one()
+            jobs += [(task, r) for r in id_ranges(lo, hi, workers * PARTITIONS_PER_WORKER)]
+        sql_session.rollback()  # release the snapshot held by the min/max reads
 
-        # 5) INVESTED_IN edges
-        print("Linking Investors to FundingRounds…")
-        for link in sql_session.query(FundingRoundInvestor).all():
-            neo_session.run(
-                """
-                MATCH (i:Investor {investor_id: $investor_id})
-                MATCH (f:FundingRound {round_id: $round_id})
-                MERGE (i)-[:INVESTED_IN]->(f)
-                """,
-                {
-                    'investor_id': link.investor_id,
-                    'round_id':    link.round_id
-                }
+        start = time.perf_counter()
+        with metrics.stage(f"neo4j:{name}", workers=workers, partitions=len(jobs)) as st:
+            results = run_concurrently(
+                lambda job: load_partition(driver, job[0], marks.get(job[0][1]), job[1],
+                                           batch_size, NEO4J_RETRIES),
+                jobs, workers,
             )
+            st.rows = sum(total for total, _ in results)
+        elapsed = time.perf_counter() - start
+
+        totals = {task[0]: 0 for task in phase}
+        for (task, _), (total, mark) in zip(jobs, results):
+            label, entity, *_, tracks_mark = task
+            totals[label] += total
+            if tracks_mark and mark is not None:
+                current = new_marks.get(entity)
+                new_marks[entity] = mark if current is None else max(current, mark)
+        for label, total in totals.items():
+            report_rate(label, total, elapsed, batch_size)
+    return new_marks
+
+def load_to_neo4j(batch_size: int = NEO4J_BATCH_SIZE, incremental: bool = False,
+                  workers: int = NEO4J_WORKERS):
+    """
+    Push the Postgres tables into Neo4j. With incremental=True only rows
+    changed since the last successful sync (per-entity high-water mark on
+    updated_at) are sent, and tombstoned deletions are applied.
+
+    Rows are streamed from Postgres batch_size at a time and each chunk goes
+    straight into one UNWIND write, so memory does not grow with table size.
+    With workers > 1 the load runs through load_phases_parallel instead.
+    """
+    print("Connecting to Neo4j…")
+    driver = clients.get('neo4j_driver')
+    sql_session = SessionLocal()
+
+    stored_marks = get_high_water_marks(sql_session)
+    marks = stored_marks if incremental else {}
+    new_marks = {}
+    if incremental:
+        print("Incremental sync since", {e: str(m) for e, m in marks.items()} or "the beginning")
+
+    try:
+        # MERGE keys must be backed by constraints before the first write
+        ensure_schema(driver, secondary=NEO4J_SECONDARY_INDEXES)
+
+        with driver.session() as neo_session, \
+                metrics.stage('neo4j_load', incremental=incremental, workers=workers):
+            if workers > 1:
+                new_marks.update(load_phases_parallel(driver, sql_session, marks, batch_size, workers))
+            else:
+                new_marks.update(load_serial(neo_session, sql_session, marks, batch_size))
+
+            # MERGE never removes anything, so deletions are replayed in both modes
+            print("Applying deletions…")
+            with metrics.stage('neo4j:deletions'):
+                new_marks[DELETIONS_ENTITY] = sync_deletions(
+                    neo_session, sql_session, stored_marks.get(DELETIONS_ENTITY), batch_size
+                )
+
+            # Rollups are refreshed for what this sync sent; without a previous
+            # rollup pass (first load, full reload, bulk import) all are recomputed
+            print("Refreshing Company & Investor aggregates…")
+            rollup_marks = stored_marks if incremental and stored_marks.get(AGGREGATES_ENTITY) else None
+            with metrics.stage('neo4j:aggregates', incremental=rollup_marks is not None) as st:
+                st.rows = sync_aggregates(neo_session, sql_session, rollup_marks, batch_size)
+            new_marks[AGGREGATES_ENTITY] = datetime.now(timezone.utc)
 
-    sql_session.close()
-    driver.close()
+        # Only advance the marks once every entity has been written
+        save_high_water_marks(sql_session, new_marks)
+        # Query services (graph/queries.py) drop their cached results on the new generation
+        generation = bump_load_generation(driver)
+        print(f"  load generation {generation}")
+    finally:
+        sql_session.close()
+        driver.close()
+        clients.reset('neo4j_driver')
     print("Neo4j load complete!")
 
 if __name__ == "__main__":
-    load_to_neo4j()
+    import argparse
+    parser = argparse.ArgumentParser(description="Load Postgres data into Neo4j")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only push rows changed since the last successful sync")
+    parser.add_argument("--batch-size", type=int, default=NEO4J_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=NEO4J_WORKERS,
+                        help="parallel Neo4j sessions (1 = serial load)")
+    args = parser.parse_args()
+    load_to_neo4j(batch_size=args.batch_size, incremental=args.incremental,
+                  workers=args.workers)
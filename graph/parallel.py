@@ -0,0 +1,51 @@
+# graph/parallel.py
+#
+# Small helpers for the multi-worker Neo4j load: id-range partitioning,
+# a thread pool that fails fast, and retries for transient Neo4j errors.
+
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+
+def id_ranges(lo, hi, partitions):
+    """Split the inclusive id range [lo, hi] into at most `partitions` inclusive ranges."""
+    if lo is None or hi is None:
+        return []
+    span = hi - lo + 1
+    partitions = max(1, min(partitions, span))
+    step = -(-span // partitions)  # ceil division
+    return [(start, min(start + step - 1, hi)) for start in range(lo, hi + 1, step)]
+
+def retry_transient(fn, *args, attempts=5, base_delay=0.2, **kwargs):
+    """
+    Call fn, retrying on the errors the driver's managed transactions retry:
+    TransientError (deadlocks, lock timeouts) and lost connections, with
+    exponential backoff. The last error is re-raised once attempts run out.
+    fn must not retry on its own (use an unmanaged transaction).
+    """
+    # only graph loads pay for the driver import
+    from neo4j.exceptions import TransientError, ServiceUnavailable, SessionExpired
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except (TransientError, ServiceUnavailable, SessionExpired) as e:
+            if attempt == attempts:
+                raise
+            delay = base_delay * 2 ** (attempt - 1)
+            reason = getattr(e, 'code', None) or type(e).__name__
+            print(f"  ⚠️ transient error ({reason}), retry {attempt}/{attempts - 1} in {delay:.1f}s")
+            time.sleep(delay)
+
+def run_concurrently(fn, items, workers):
+    """
+    Run fn(item) for every item on a pool of `workers` threads and return the
+    results in item order. The first failure cancels pending work and is raised.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fn, item) for item in items]
+        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        for f in pending:
+            f.cancel()
+        for f in done:
+            if f.exception() is not None:
+                raise f.exception()
+        return [f.result() for f in futures]
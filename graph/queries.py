@@ -0,0 +1,298 @@
+# graph/queries.py
+#
+# Query service for the common graph questions (the README's sample queries
+# and a few dashboard lookups). Consumers call named, parameterized queries
+# instead of opening their own sessions:
+#
+#   from graph.queries import run_query
+#   run_query('latest_form_d_rounds', limit=10)
+#   run_query('company_layoffs', name='Acme Therapeutics')
+#
+# All queries share one driver (and its connection pool) per process and go
+# through a size-bounded LRU cache whose entries also expire after a TTL.
+# Every successful load_to_neo4j run increments a load generation stored in
+# the graph (a (:GraphMeta {key: 'load'}) node); the service re-reads it at
+# most every QUERY_GENERATION_CHECK seconds and drops the whole cache when it
+# changes, so results never outlive the load they were computed from by more
+# than that interval.
+#
+#   python -m graph.queries --list
+#   python -m graph.queries latest_form_d_rounds limit=5 --repeat 100 --stats
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict, deque
+from dotenv import load_dotenv
+from pipeline import metrics, clients
+
+load_dotenv()
+NEO4J_URI              = os.getenv("NEO4J_URI")
+NEO4J_USER             = os.getenv("NEO4J_USER")
+NEO4J_PASSWORD         = os.getenv("NEO4J_PASSWORD")
+QUERY_POOL_SIZE        = int(os.getenv("QUERY_POOL_SIZE", "50"))
+QUERY_CACHE_SIZE       = int(os.getenv("QUERY_CACHE_SIZE", "1000"))      # cached results
+QUERY_CACHE_TTL        = float(os.getenv("QUERY_CACHE_TTL", "3600"))      # seconds
+QUERY_GENERATION_CHECK = float(os.getenv("QUERY_GENERATION_CHECK", "5"))  # seconds
+
+LOAD_GENERATION_QUERY = """
+MATCH (m:GraphMeta {key: 'load'})
+RETURN m.generation AS generation
+"""
+
+BUMP_LOAD_GENERATION_QUERY = """
+MERGE (m:GraphMeta {key: 'load'})
+SET m.generation = coalesce(m.generation, 0) + 1,
+    m.loaded_at  = datetime()
+RETURN m.generation AS generation
+"""
+
+# name -> (Cypher, default parameters)
+QUERIES = {
+    'latest_form_d_rounds': ("""
+        MATCH (c:Company)-[:RAISED]->(f:FundingRound {round_type: 'Form D'})
+        RETURN c.name AS company, f.date AS date, f.amount AS amount
+        ORDER BY f.date DESC
+        LIMIT $limit
+    """, {'limit': 10}),
+    'recent_layoffs': ("""
+        MATCH (c:Company)-[:UNDERWENT_LAYOFF]->(e:LayoffEvent)
+        RETURN c.name AS company, e.date AS date, e.num_laid_off AS num_laid_off,
+               e.percent_laid_off AS percent_laid_off
+        ORDER BY e.date DESC
+        LIMIT $limit
+    """, {'limit': 20}),
+    'company_layoffs': ("""
+        MATCH (c:Company {name: $name})-[:UNDERWENT_LAYOFF]->(e:LayoffEvent)
+        RETURN e.date AS date, e.num_laid_off AS num_laid_off,
+               e.percent_laid_off AS percent_laid_off, e.description AS description
+        ORDER BY e.date DESC
+        LIMIT $limit
+    """, {'limit': 20}),
+    'company_rounds': ("""
+        MATCH (c:Company {name: $name})-[:RAISED]->(f:FundingRound)
+        OPTIONAL MATCH (i:Investor)-[:INVESTED_IN]->(f)
+        RETURN f.date AS date, f.round_type AS round_type, f.amount AS amount,
+               collect(i.name) AS investors
+        ORDER BY date DESC
+        LIMIT $limit
+    """, {'limit': 20}),
+    'company_summary': ("""
+        MATCH (c:Company {name: $name})
+        RETURN c.name AS company, c.type AS type, c.total_raised AS total_raised,
+               c.funding_round_count AS funding_round_count, c.last_round_date AS last_round_date,
+               c.investor_count AS investor_count, c.total_laid_off AS total_laid_off,
+               c.last_layoff_date AS last_layoff_date
+    """, {}),
+    'top_funded_companies': ("""
+        MATCH (c:Company)
+        WHERE c.total_raised > 0
+        RETURN c.name AS company, c.total_raised AS total_raised,
+               c.last_round_date AS last_round_date, c.total_laid_off AS total_laid_off
+        ORDER BY c.total_raised DESC
+        LIMIT $limit
+    """, {'limit': 10}),
+    'investor_portfolio': ("""
+        MATCH (i:Investor {name: $name})-[:INVESTED_IN]->(f:FundingRound)<-[:RAISED]-(c:Company)
+        RETURN c.name AS company, count(f) AS rounds, max(f.date) AS last_round_date
+        ORDER BY last_round_date DESC
+        LIMIT $limit
+    """, {'limit': 50}),
+    'layoff_search': ("""
+        CALL db.index.fulltext.queryNodes('layoff_description', $query) YIELD node, score
+        MATCH (c:Company)-[:UNDERWENT_LAYOFF]->(node)
+        RETURN c.name AS company, node.date AS date, node.description AS description, score
+        ORDER BY score DESC
+        LIMIT $limit
+    """, {'limit': 20}),
+}
+
+@clients.provider('neo4j_query_driver')
+def _neo4j_query_driver():
+    # Separate from the loader's 'neo4j_driver', which load_to_neo4j closes when it finishes
+    from neo4j import GraphDatabase
+    return GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD),
+                                max_connection_pool_size=QUERY_POOL_SIZE)
+
+def bump_load_generation(driver) -> int:
+    """Increment the graph's load generation; called at the end of a successful load."""
+    with driver.session() as neo_session:
+        return neo_session.execute_write(
+            lambda tx: tx.run(BUMP_LOAD_GENERATION_QUERY).single()['generation']
+        )
+
+def cache_key(name, params) -> str:
+    return json.dumps([name, params], sort_keys=True, default=str)
+
+class LatencyStats:
+    """Count, mean and recent percentiles of one query's latencies, in milliseconds."""
+    def __init__(self, window=1000):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {'count': 0}
+        recent = sorted(self.recent)
+        pct = lambda p: round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 3)
+        return {'count': self.count, 'mean_ms': round(self.total / self.count * 1000, 3),
+                'p50_ms': pct(0.50), 'p95_ms': pct(0.95), 'p99_ms': pct(0.99)}
+
+class QueryService:
+    """
+    Named graph queries behind a shared driver and an LRU + TTL result cache
+    invalidated by the graph's load generation. Thread-safe; results are
+    lists of dicts shared between callers, so treat them as read-only.
+    """
+    def __init__(self, driver=None, max_entries=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL,
+                 generation_check=QUERY_GENERATION_CHECK, queries=None):
+        self._driver          = driver
+        self.max_entries      = max_entries
+        self.ttl              = ttl
+        self.generation_check = generation_check
+        self.queries          = dict(QUERIES, **(queries or {}))
+        self.lock             = threading.Lock()
+        self._cache           = OrderedDict()   # key -> (stored_at, rows), oldest first
+        self._generation      = None
+        self._checked_at      = None
+        self._counts          = dict.fromkeys(['hits', 'misses', 'expired', 'evictions',
+                                               'invalidations'], 0)
+        self._latency         = {}              # (query, 'hit'|'miss') -> LatencyStats
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = clients.get('neo4j_query_driver')
+        return self._driver
+
+    def _read(self, cypher, params):
+        with self.driver.session(default_access_mode='READ') as neo_session:
+            return neo_session.execute_read(lambda tx: [r.data() for r in tx.run(cypher, params)])
+
+    def check_generation(self, force=False):
+        """Re-read the load generation (at most every generation_check seconds); clear the cache if it moved."""
+        now = time.monotonic()
+        with self.lock:
+            if not force and self._checked_at is not None \
+                    and now - self._checked_at < self.generation_check:
+                return self._generation
+            self._checked_at = now
+        rows = self._read(LOAD_GENERATION_QUERY, {})
+        generation = rows[0]['generation'] if rows else None
+        with self.lock:
+            if generation != self._generation:
+                if self._cache:
+                    self._counts['invalidations'] += 1
+                    metrics.inc('query_cache_invalidations_total')
+                self._cache.clear()
+                self._generation = generation
+        return generation
+
+    def run(self, name: str, **params) -> list:
+        """Rows of query name with params (over its defaults), from the cache when fresh."""
+        if name not in self.queries:
+            raise KeyError(f"unknown query {name!r}; known: {', '.join(sorted(self.queries))}")
+        cypher, defaults = self.queries[name]
+        params = dict(defaults, **params)
+        start = time.perf_counter()
+        generation = self.check_generation()
+        key = cache_key(name, params)
+
+        with self.lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                stored_at, rows = entry
+                if time.monotonic() - stored_at <= self.ttl:
+                    self._cache.move_to_end(key)
+                    self._record(name, 'hit', start)
+                    return rows
+                del self._cache[key]
+                self._counts['expired'] += 1
+
+        with metrics.timed('graph_read', query=name):
+            rows = self._read(cypher, params)
+        with self.lock:
+            # A read that started before another thread saw a new generation may hold old rows
+            if self._generation == generation:
+                self._cache[key] = (time.monotonic(), rows)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+                    self._counts['evictions'] += 1
+            self._record(name, 'miss', start)
+        return rows
+
+    def _record(self, name, result, start):
+        # Called with the lock held
+        self._counts['hits' if result == 'hit' else 'misses'] += 1
+        self._latency.setdefault((name, result), LatencyStats()).add(time.perf_counter() - start)
+        metrics.inc('query_cache_lookups_total', query=name, result=result)
+
+    def invalidate(self):
+        """Drop every cached result now."""
+        with self.lock:
+            self._cache.clear()
+            self._counts['invalidations'] += 1
+
+    def stats(self) -> dict:
+        """Cache counters, hit ratio, current generation and per-query latency (hits and misses separately)."""
+        with self.lock:
+            lookups = self._counts['hits'] + self._counts['misses']
+            return dict(
+                self._counts,
+                entries=len(self._cache),
+                hit_ratio=round(self._counts['hits'] / lookups, 4) if lookups else None,
+                generation=self._generation,
+                latency={f"{name}:{result}": s.summary()
+                         for (name, result), s in sorted(self._latency.items())},
+            )
+
+@clients.provider('graph_queries')
+def _query_service():
+    return QueryService()
+
+def run_query(name: str, **params) -> list:
+    """Run a named query through the process-wide QueryService."""
+    return clients.get('graph_queries').run(name, **params)
+
+def query_stats() -> dict:
+    return clients.get('graph_queries').stats()
+
+def _parse_param(text):
+    key, _, value = text.partition('=')
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a named graph query through the cached query service")
+    parser.add_argument("name", nargs="?", help="query name (see --list)")
+    parser.add_argument("params", nargs="*", metavar="KEY=VALUE", help="query parameters (JSON values)")
+    parser.add_argument("--list", action="store_true", help="list the named queries and exit")
+    parser.add_argument("--repeat", type=int, default=1, help="run the query this many times")
+    parser.add_argument("--stats", action="store_true", help="print cache and latency stats")
+    args = parser.parse_args()
+
+    if args.list or not args.name:
+        for name, (_, defaults) in QUERIES.items():
+            print(f"{name:<22} defaults: {defaults or '-'}")
+        return
+    params = dict(_parse_param(p) for p in args.params)
+    for _ in range(args.repeat):
+        rows = run_query(args.name, **params)
+    for row in rows:
+        print(json.dumps(row, default=str))
+    if args.stats:
+        print(json.dumps(query_stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# graph/schema.py
+#
+# Constraints and indexes the loader relies on. Every MERGE/MATCH in
+# graph/neo4j_loader.py looks nodes up by their id property; without a
+# uniqueness constraint each lookup is a label scan.
+
+import time
+
+# Uniqueness constraints double as the lookup index for each MERGE key
+CONSTRAINTS = {
+    'company_id_unique':   ('Company', 'company_id'),
+    'layoff_id_unique':    ('LayoffEvent', 'layoff_id'),
+    'investor_id_unique':  ('Investor', 'investor_id'),
+    'round_id_unique':     ('FundingRound', 'round_id'),
+    # Singleton holding the load generation read by graph/queries.py
+    'graph_meta_key_unique': ('GraphMeta', 'key'),
+}
+
+# Optional indexes used by the sample queries in the README
+SECONDARY_INDEXES = {
+    'company_name':        ('Company', 'name'),
+    'investor_name':       ('Investor', 'name'),
+    'funding_round_date':  ('FundingRound', 'date'),
+    'funding_round_type':  ('FundingRound', 'round_type'),
+    'layoff_event_date':   ('LayoffEvent', 'date'),
+}
+
+# Full-text indexes over the free-text properties, queried with
+# db.index.fulltext.queryNodes (see README); the Postgres side is db/search.py
+FULLTEXT_INDEXES = {
+    'layoff_description':    ('LayoffEvent', ['description']),
+    'funding_round_details': ('FundingRound', ['round_type', 'details']),
+}
+
+def wait_for_indexes(neo_session, names, timeout=300, poll=1.0):
+    """Block until every named index is ONLINE; raise if one FAILED or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while True:
+        states = {
+            r['name']: r['state']
+            for r in neo_session.run(
+                "SHOW INDEXES YIELD name, state WHERE name IN $names RETURN name, state",
+                names=list(names),
+            )
+        }
+        failed = [n for n, state in states.items() if state == 'FAILED']
+        if failed:
+            raise RuntimeError(f"Neo4j indexes failed to populate: {failed}")
+        pending = [n for n in names if states.get(n) != 'ONLINE']
+        if not pending:
+            return
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Neo4j indexes not ONLINE after {timeout}s: {pending}")
+        time.sleep(poll)
+
+def ensure_schema(driver, secondary=True, timeout=300):
+    """
+    Idempotently create the uniqueness constraints on every MERGE key, the
+    full-text indexes (and, optionally, the secondary indexes), then wait
+    until they are ONLINE.
+    """
+    print("Ensuring Neo4j constraints & indexes…")
+    index_names = []
+    with driver.session() as neo_session:
+        for name, (label, prop) in CONSTRAINTS.items():
+            neo_session.run(
+                f"CREATE CONSTRAINT {name} IF NOT EXISTS "
+                f"FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+            ).consume()
+            # The backing index of a constraint carries the constraint's name
+            index_names.append(name)
+        for name, (label, props) in FULLTEXT_INDEXES.items():
+            fields = ', '.join(f"n.{p}" for p in props)
+            neo_session.run(
+                f"CREATE FULLTEXT INDEX {name} IF NOT EXISTS FOR (n:{label}) ON EACH [{fields}]"
+            ).consume()
+            index_names.append(name)
+        if secondary:
+            for name, (label, prop) in SECONDARY_INDEXES.items():
+                neo_session.run(
+                    f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
+                ).consume()
+                index_names.append(name)
+        wait_for_indexes(neo_session, index_names, timeout=timeout)
+    print(f"  {len(index_names)} constraints/indexes ONLINE")
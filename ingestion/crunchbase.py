@@ -1,14 +1,50 @@
-import os, time, requests, json
+import os, requests
 from db.session import SessionLocal
-from db.models  import Company, Investor, FundingRound, FundingRoundInvestor
-from datetime import datetime
+from db.models  import Company, FundingRound, FundingRoundInvestor
+from db.bulk    import BulkWriter, BULK_BATCH_SIZE
+from datetime import datetime, timedelta, timezone
 from dotenv     import load_dotenv
+from requests.adapters import HTTPAdapter
+from sqlalchemy import select, update, or_
+from ingestion.http_cache import get_cache
+from ingestion.throttle import TokenBucket, TransientHTTPError, retry_with_backoff, bounded_map
+from pipeline import metrics, clients
 
 load_dotenv()
 CB_API_KEY = os.getenv('CRUNCHBASE_API_KEY')
 SEARCH_URL = 'https://api.crunchbase.com/api/v4/searches/organizations'
 BASE_URL   = 'https://api.crunchbase.com/api/v4/organizations'
 
+# Requests/sec allowed by the Crunchbase plan (200/min by default), concurrent
+# requests, and how old an enrichment may get before it is refreshed
+CRUNCHBASE_RATE         = float(os.getenv('CRUNCHBASE_RATE', str(200 / 60)))
+CRUNCHBASE_WORKERS      = int(os.getenv('CRUNCHBASE_WORKERS', '8'))
+CRUNCHBASE_REFRESH_DAYS = float(os.getenv('CRUNCHBASE_REFRESH_DAYS', '30'))
+
+cb_limiter = TokenBucket(rate=CRUNCHBASE_RATE)
+
+# One pooled, keep-alive session shared by all worker threads
+@clients.provider('crunchbase_http')
+def _crunchbase_http():
+    http = requests.Session()
+    http.headers['X-Cb-User-Key'] = CB_API_KEY or ''
+    http.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=CRUNCHBASE_WORKERS))
+    return http
+
+def cb_request(method: str, url: str, body: dict | None = None) -> dict:
+    """Crunchbase API call returning the JSON payload, served from the response cache when fresh."""
+    def call():
+        with metrics.timed('http_request', source='crunchbase'):
+            resp = clients.get('crunchbase_http').request(method, url, json=body, timeout=30)
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise TransientHTTPError(f"{resp.status_code} for {url}", response=resp)
+        resp.raise_for_status()
+        return resp.json()
+
+    def fetch():
+        return retry_with_backoff(call, limiter=cb_limiter)
+    return get_cache().fetch('crunchbase', f"{method} {url}", fetch, body=body)
+
 def search_crunchbase(name: str) -> str | None:
     """Return the first matching Crunchbase UUID for this company name."""
     body = {
@@ -20,81 +56,141 @@ def search_crunchbase(name: str) -> str | None:
         },
         "options": {"pagination": {"limit": 1}}
     }
-    resp = requests.post(SEARCH_URL, json=body, headers={'X-Cb-User-Key': CB_API_KEY})
-    resp.raise_for_status()
-    items = resp.json().get('data', {}).get('items', [])
+    items = cb_request('POST', SEARCH_URL, body).get('data', {}).get('items', [])
     return items[0].get('uuid') if items else None
 
-def upsert_crunchbase_data():
-    session = SessionLocal()
-    try:
-        companies = session.query(Company).all()
-        for c in companies:
-            ext = c.external_ids or {}
-
-            # 1) If we don't have a cb id yet, try to look it up and store it
-            if 'crunchbase' not in ext:
-                uuid = search_crunchbase(c.name)
-                if not uuid:
-                    continue  # no match
-                ext['crunchbase'] = uuid
-                c.external_ids = ext
-                session.commit()
+def stale_companies(session, cutoff, batch_size):
+    """
+    Yield lists of (company_id, name, external_ids) for canonical companies never
+    enriched or enriched before cutoff, paging by company_id so no table-wide result is held.
+    """
+    last_id = 0
+    while True:
+        rows = session.execute(
+            select(Company.company_id, Company.name, Company.external_ids)
+            .where(Company.company_id > last_id)
+            .where(Company.canonical_id.is_(None))
+            .where(or_(Company.crunchbase_enriched_at.is_(None),
+                       Company.crunchbase_enriched_at < cutoff))
+            .order_by(Company.company_id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].company_id
 
-            cb_uuid = ext['crunchbase']
-
-            # 2) Fetch & upsert core company details (optional)
-            details = requests.get(
-                f"{BASE_URL}/{cb_uuid}",
-                headers={'X-Cb-User-Key': CB_API_KEY}
-            ).json().get('data', {}).get('properties', {})
-            c.website      = details.get('homepage_url')   or c.website
-            c.type         = details.get('primary_role')   or c.type
-            fy = details.get('founded_on')
-            c.founded_year = int(fy[:4]) if fy else c.founded_year
-            session.commit()
-
-            # 3) Fetch funding rounds
-            fr_url = f"{BASE_URL}/{cb_uuid}/funding_rounds"
-            for rd in requests.get(fr_url, headers={'X-Cb-User-Key': CB_API_KEY}).json().get('data', []):
-                p = rd.get('properties', {})
-                # parse date
-                try:
-                    d = datetime.fromisoformat(p.get('announced_on')).date()
-                except:
-                    d = None
-
-                fr = FundingRound(
-                    company_id = c.company_id,
-                    date       = d,
-                    round_type = p.get('series'),
-                    amount     = float(p.get('money_raised_usd') or 0),
-                    details    = p.get('short_description')
-                )
-                session.add(fr)
-                session.commit()
+def fetch_company(row) -> dict | None:
+    """Network half of the enrichment (runs on worker threads): uuid, details and rounds."""
+    ext = dict(row.external_ids or {})
 
-                # link each investor
-                inv_items = rd.get('relationships', {}).get('investors', {}).get('items', [])
-                for inv in inv_items:
-                    name = inv.get('properties', {}).get('name')
-                    if not name:
-                        continue
-                    inv_obj = session.query(Investor).filter_by(name=name).first()
-                    if not inv_obj:
-                        inv_obj = Investor(name=name)
-                        session.add(inv_obj)
-                        session.commit()
-                    session.add(FundingRoundInvestor(
-                        round_id    = fr.round_id,
-                        investor_id = inv_obj.investor_id
-                    ))
-                session.commit()
+    # 1) If we don't have a cb id yet, try to look it up
+    if 'crunchbase' not in ext:
+        uuid = search_crunchbase(row.name)
+        if not uuid:
+            return None  # no match
+        ext['crunchbase'] = uuid
+    cb_uuid = ext['crunchbase']
 
-            time.sleep(1)  # rate-limit
+    # 2) Fetch core company details and funding rounds
+    details = cb_request('GET', f"{BASE_URL}/{cb_uuid}").get('data', {}).get('properties', {})
+    rounds  = cb_request('GET', f"{BASE_URL}/{cb_uuid}/funding_rounds").get('data', [])
+    return {'external_ids': ext, 'details': details, 'rounds': rounds}
 
+def round_uuid(rd: dict) -> str | None:
+    return rd.get('uuid') or rd.get('properties', {}).get('identifier', {}).get('uuid')
+
+def store_company(writer, company_id, fetched, now):
+    """Write one company's enrichment: company fields, rounds (deduped on uuid), investor links."""
+    values = {'company_id': company_id, 'crunchbase_enriched_at': now, 'updated_at': now}
+    if fetched is None:
+        writer.session.execute(update(Company), [values])
+        return
+
+    details = fetched['details']
+    fy = details.get('founded_on')
+    values['external_ids'] = fetched['external_ids']
+    if details.get('homepage_url'):
+        values['website'] = details['homepage_url']
+    if details.get('primary_role'):
+        values['type'] = details['primary_role']
+    if fy:
+        values['founded_year'] = int(fy[:4])
+    writer.session.execute(update(Company), [values])
+
+    # 3) Upsert funding rounds in one statement, keyed on the Crunchbase round uuid
+    round_rows, round_investors = {}, {}
+    for rd in fetched['rounds']:
+        uuid = round_uuid(rd)
+        if not uuid:
+            continue
+        source_key = f"crunchbase:{uuid}"
+        p = rd.get('properties', {})
+        # parse date
+        try:
+            d = datetime.fromisoformat(p.get('announced_on')).date()
+        except:
+            d = None
+
+        round_rows[source_key] = dict(
+            company_id = company_id,
+            date       = d,
+            round_type = p.get('series'),
+            amount     = float(p.get('money_raised_usd') or 0),
+            details    = p.get('short_description'),
+            source_key = source_key
+        )
+        inv_items = rd.get('relationships', {}).get('investors', {}).get('items', [])
+        round_investors[source_key] = [
+            inv.get('properties', {}).get('name') for inv in inv_items
+            if inv.get('properties', {}).get('name')
+        ]
+
+    returned = writer.insert_returning(
+        FundingRound, list(round_rows.values()), FundingRound.source_key, FundingRound.round_id
+    )
+    investor_ids = writer.investor_ids_for(
+        [name for names in round_investors.values() for name in names]
+    )
+    # link each investor
+    for source_key, round_id in returned:
+        for name in round_investors.get(source_key, []):
+            writer.add(FundingRoundInvestor, dict(
+                round_id    = round_id,
+                investor_id = investor_ids[name]
+            ))
+
+def upsert_crunchbase_data(batch_size: int = BULK_BATCH_SIZE, workers: int = CRUNCHBASE_WORKERS,
+                           refresh_days: float = CRUNCHBASE_REFRESH_DAYS):
+    """
+    Enrich companies from Crunchbase. Only companies never enriched, or
+    enriched more than refresh_days ago, are fetched; requests run on
+    `workers` threads over one pooled session under a shared token bucket.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=refresh_days)
+    session = SessionLocal()
+    writer = BulkWriter(session, batch_size)
+    writer.on_conflict(FundingRound, index_elements=['source_key'],
+                       update=['date', 'round_type', 'amount', 'details'])
+    writer.on_conflict(FundingRoundInvestor, index_elements=['round_id', 'investor_id'])
+    enriched = 0
+    try:
+        with metrics.stage('crunchbase_enrich', refresh_days=refresh_days) as st:
+            for rows in stale_companies(session, cutoff, batch_size):
+                for row, fetched, error in bounded_map(fetch_company, rows, workers):
+                    if error is not None:
+                        print("  ⚠️ Crunchbase fetch failed for", row.name, error)
+                        continue
+                    store_company(writer, row.company_id, fetched, datetime.now(timezone.utc))
+                    enriched += 1
+
+                # Commit in batches of companies rather than per row
+                writer.flush()
+                session.commit()
+                print(f"  … {enriched} companies enriched")
+            st.rows = enriched
     finally:
         session.close()
 
 if __name__ == "__main__":
-    upsert_crunchbase_data()
\ No newline at end of file
+    upsert_crunchbase_data()
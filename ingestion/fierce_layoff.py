@@ -1,151 +1,264 @@
 # ingestion/fierce_layoff.py
 
+import os
 import re
-import unicodedata
-from dateutil.parser import parse
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+import argparse
+import requests
+from concurrent.futures import ThreadPoolExecutor
 
 from db.session import SessionLocal
-from db.models import Company, LayoffEvent
-from nlp.layoff_extractor import extract_layoff
-
-def clean_text(text):
-    if isinstance(text, str):
-        text = unicodedata.normalize("NFKD", text)
-        text = re.sub(r'[^\x00-\x7F]+', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def clean_company(company):
-    if isinstance(company, str):
-        company = company.strip()
-        company = re.sub(r':$', '', company)
-    return company
-
-def clean_description(desc):
-    if isinstance(desc, str):
-        desc = re.sub(r'^\w+\.\s*\d+\s*-\s*[^:]+:\s+', '', desc)
-        desc = re.sub(
-            r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d+\s*-\s+[^:\n]+:\s*',
-            '',
-            desc
-        )
-        desc = re.sub(r'\s*(Story|Release)\.?$', '', desc, flags=re.IGNORECASE)
-        desc = desc.replace('""', '"').strip(' ":\n')
-    return desc
-
-def fetch_and_store_layoffs():
+from db.models import LayoffEvent, PageFingerprint, layoff_source_key
+from db.bulk import BulkWriter
+from nlp.layoff_extractor import extract_layoffs
+from ingestion.http_cache import get_cache, CacheMiss
+from ingestion.fierce_parser import parse_entry, parse_tracker_sections, content_hash
+from pipeline import metrics, clients
+
+# "http": plain GET (default); "selenium": render in headless Chrome
+FIERCE_FETCH_BACKEND     = os.getenv("FIERCE_FETCH_BACKEND", "http")
+# Retry a failed plain GET through Selenium before giving up
+FIERCE_SELENIUM_FALLBACK = os.getenv("FIERCE_SELENIUM_FALLBACK", "0") == "1"
+
+# Tracker years or full URLs to crawl, comma-separated, and concurrent page fetches
+FIERCE_TRACKERS = os.getenv("FIERCE_TRACKERS", "2022,2023,2024,2025")
+FIERCE_WORKERS  = int(os.getenv("FIERCE_WORKERS", "4"))
+
+TRACKER_URL_TEMPLATE = "https://www.fiercebiotech.com/biotech/fierce-biotech-layoff-tracker-{year}"
+TRACKER_YEAR = re.compile(r'-((?:19|20)\d{2})/?$')  # entries carry no year; the URL's does
+PAGE_SECTION = ''  # PageFingerprint.section of the whole-page hash
+USER_AGENT  = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+@clients.provider('fierce_http')
+def _fierce_http():
+    http = requests.Session()
+    http.headers['User-Agent'] = USER_AGENT
+    return http
+
+def render_page(url):
+    """Load url in headless Selenium Chrome and return the rendered HTML."""
+    # Selenium is opt-in, so it is only imported when actually used
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
     # -- set up headless Selenium Chrome driver --
     chrome_opts = Options()
     chrome_opts.add_argument("--headless")
     chrome_opts.add_argument("--no-sandbox")
     chrome_opts.add_argument("--disable-dev-shm-usage")
-    chrome_opts.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    )
+    chrome_opts.add_argument(f"user-agent={USER_AGENT}")
     driver = webdriver.Chrome(
         service=Service(ChromeDriverManager().install()),
         options=chrome_opts
     )
+    try:
+        with metrics.timed('http_request', source='fierce_selenium'):
+            driver.get(url)
+            driver.implicitly_wait(10)
+            return driver.page_source
+    finally:
+        driver.quit()
 
-    url = "https://www.fiercebiotech.com/biotech/fierce-biotech-layoff-tracker-2025"
-    driver.get(url)
-    driver.implicitly_wait(10)
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-    driver.quit()
+def http_get_page(url, cached=None):
+    """
+    Plain HTTP GET, made conditional on the cached copy's ETag/Last-Modified;
+    a 304 returns the cached copy unchanged.
+    """
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+    with metrics.timed('http_request', source='fierce'):
+        resp = clients.get('fierce_http').get(url, headers=headers, timeout=30)
+    if resp.status_code == 304 and cached:
+        metrics.inc('http_not_modified_total', source='fierce')
+        return cached
+    resp.raise_for_status()
+    return {
+        'html':          resp.text,
+        'etag':          resp.headers.get('ETag'),
+        'last_modified': resp.headers.get('Last-Modified'),
+    }
 
-    year = url.split('-')[-1]
-    session = SessionLocal()
+def _as_page(cached):
+    # Entries cached before conditional requests hold the bare HTML string
+    return {'html': cached} if isinstance(cached, str) else cached
 
-    try:
-        for header in soup.find_all(['h2', 'h3']):
-            for sibling in header.find_next_siblings():
-                if sibling.name in ['h2', 'h3']:
-                    break
-
-                if sibling.name == 'p' and sibling.strong:
-                    strong_text = sibling.strong.text.strip(':').strip()
-                    parts = strong_text.split('-', 1)
-                    if len(parts) != 2:
-                        continue
-
-                    # Parse date and company
-                    raw_date = clean_text(parts[0].strip())
-                    company_name = clean_company(clean_text(parts[1].strip()))
-                    try:
-                        parsed_date = parse(f"{raw_date} {year}").date()
-                    except ValueError:
-                        parsed_date = parse(f"January 1 {year}").date()
-
-                    # Extract description & URL
-                    full_text = sibling.get_text(separator=' ', strip=True)
-                    desc_raw = full_text.replace(strong_text, '', 1).lstrip(':').strip()
-                    description = clean_description(clean_text(desc_raw))
-                    link_tag = sibling.find('a')
-                    source_url = clean_text(link_tag['href']) if link_tag else None
-
-                    # Idempotency: skip if already stored
-                    existing = session.query(LayoffEvent).filter_by(
-                        company_id=None,  # temporary placeholder
-                        date=parsed_date,
-                        source_url=source_url
-                    ).first()
-                    # We can't filter by company_id yet since company may not exist; do a subquery later
-
-                    # Upsert Company
-                    company = session.query(Company).filter_by(name=company_name).first()
-                    if not company:
-                        company = Company(name=company_name)
-                        session.add(company)
-                        session.commit()
-
-                    # Now re-check existence using real company_id
-                    existing = session.query(LayoffEvent).filter_by(
-                        company_id=company.company_id,
-                        date=parsed_date,
-                        source_url=source_url
-                    ).first()
-                    if existing:
-                        continue
-
-                    # Use LLM to extract layoffs; fallback to regex if missing
-                    try:
-                        info = extract_layoff(description)
-                        num_laid_off = info.num_laid_off
-                        percent_laid_off = info.percent
-                    except Exception:
-                        num_laid_off = None
-                        percent_laid_off = None
-
-                    # Fallback numeric parse
-                    if num_laid_off is None:
-                        m = re.search(r'(\d{1,4})(?=\s*(?:people|employees|\b))', description)
-                        if m:
-                            num_laid_off = int(m.group(1))
-                    if percent_laid_off is None:
-                        m = re.search(r'(\d+(?:\.\d+)?)\s*%', description)
-                        if m:
-                            percent_laid_off = float(m.group(1))
-
-                    # Insert LayoffEvent
-                    event = LayoffEvent(
-                        company_id=company.company_id,
-                        date=parsed_date,
-                        num_laid_off=num_laid_off,
-                        percent_laid_off=percent_laid_off,
-                        description=description,
-                        source_url=source_url
-                    )
-                    session.add(event)
-                    session.commit()
+def fetch_page(url, backend=FIERCE_FETCH_BACKEND):
+    """Return the page HTML, from the response cache when fresh, else revalidated or refetched."""
+    cache = get_cache()
+    cached = cache.get('fierce', url)
+    if cached is not None:
+        return _as_page(cached)['html']
+    if cache.offline:
+        raise CacheMiss(f"fierce: {url} not in cache (offline mode)")
+
+    stale = cache.get('fierce', url, allow_stale=True)
+    stale = _as_page(stale) if stale is not None else None
+    if backend == 'selenium':
+        page = {'html': render_page(url)}
+    else:
+        try:
+            page = http_get_page(url, stale)
+        except requests.RequestException as e:
+            if not FIERCE_SELENIUM_FALLBACK:
+                raise
+            print("  ⚠️ Plain GET failed, falling back to Selenium:", e)
+            page = {'html': render_page(url)}
+    cache.set('fierce', url, page)
+    return page['html']
+
+def tracker_urls(trackers):
+    """Expand tracker years (e.g. "2024") and URLs into tracker page URLs."""
+    if isinstance(trackers, str):
+        trackers = [t.strip() for t in trackers.split(',') if t.strip()]
+    return [
+        t if str(t).startswith('http') else TRACKER_URL_TEMPLATE.format(year=t)
+        for t in trackers
+    ]
 
+def tracker_year(url):
+    """The 4-digit year a tracker URL ends in (e.g. "...-layoff-tracker-2024"), or None."""
+    m = TRACKER_YEAR.search(url)
+    return m.group(1) if m else None
+
+def fetch_pages(urls, workers=FIERCE_WORKERS):
+    """Fetch tracker pages concurrently; returns {url: html} for the pages that loaded."""
+    def fetch(url):
+        try:
+            return url, fetch_page(url)
+        except Exception as e:
+            print("  ⚠️ Could not fetch", url, e)
+            return url, None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls)))) as pool:
+        return {url: html for url, html in pool.map(fetch, urls) if html is not None}
+
+def changed_entries(session, url, html, year):
+    """
+    Compare the page and its sections against the stored fingerprints.
+    Returns (entries, fingerprints): the parsed entries that are new or
+    modified since the last run, and the fingerprints to store once they are saved.
+    """
+    stored = {fp.section: fp for fp in session.query(PageFingerprint).filter_by(url=url)}
+    page_hash = content_hash(html)
+    page = stored.get(PAGE_SECTION)
+    if page is not None and page.content_hash == page_hash:
+        return [], []
+
+    entries = []
+    fingerprints = [PageFingerprint(url=url, section=PAGE_SECTION, content_hash=page_hash)]
+    for title, section_hash, section_entries in parse_tracker_sections(html):
+        fingerprints.append(PageFingerprint(
+            url=url, section=title, content_hash=section_hash,
+            entry_hashes=[h for h, _ in section_entries],
+        ))
+        old = stored.get(title)
+        if old is not None and old.content_hash == section_hash:
+            continue
+        known = set(old.entry_hashes or []) if old is not None else set()
+        for entry_hash, p in section_entries:
+            if entry_hash in known:
+                continue
+            entry = parse_entry(p, year)
+            if entry:
+                entries.append(entry)
+    return entries, fingerprints
+
+def store_layoff_entries(session, entries):
+    """Upsert parsed tracker entries as LayoffEvents; returns the number written."""
+    # Upsert every company on the page in bulk; a modified entry updates its event
+    writer = BulkWriter(session)
+    writer.on_conflict(LayoffEvent, index_elements=['source_key'],
+                       update=['description', 'num_laid_off', 'percent_laid_off'])
+    company_ids = writer.company_ids_for([e[0] for e in entries])
+
+    # An entry listed twice on a page is only written once
+    seen = set()
+    new_events = []
+    for company_name, parsed_date, description, source_url in entries:
+        key = (company_ids[company_name], parsed_date, source_url)
+        if key in seen:
+            continue
+        seen.add(key)
+        new_events.append(dict(
+            company_id=key[0],
+            date=parsed_date,
+            description=description,
+            source_url=source_url,
+            source_key=layoff_source_key(*key)
+        ))
+
+    # Extract layoff numbers for all entries at once (cached, regex-first,
+    # concurrent LLM calls for the rest); fallback to regex if missing
+    infos = extract_layoffs([e['description'] for e in new_events])
+    for fields, info in zip(new_events, infos):
+        description = fields['description']
+        num_laid_off = info.num_laid_off
+        percent_laid_off = info.percent
+
+        # Fallback numeric parse
+        if num_laid_off is None:
+            m = re.search(r'(\d{1,4})(?=\s*(?:people|employees|\b))', description)
+            if m:
+                num_laid_off = int(m.group(1))
+        if percent_laid_off is None:
+            m = re.search(r'(\d+(?:\.\d+)?)\s*%', description)
+            if m:
+                percent_laid_off = float(m.group(1))
+
+        # Upsert LayoffEvent
+        writer.add(LayoffEvent, dict(
+            num_laid_off=num_laid_off,
+            percent_laid_off=percent_laid_off,
+            **fields
+        ))
+    writer.flush()
+    return len(new_events)
+
+def fetch_and_store_layoffs(trackers=FIERCE_TRACKERS, workers: int = FIERCE_WORKERS):
+    """
+    Crawl the layoff tracker pages (years or URLs) concurrently and store
+    their entries. Pages and sections whose content hash is unchanged since
+    the last run are skipped; only new or modified entries are processed.
+    """
+    urls = []
+    for url in tracker_urls(trackers):
+        if tracker_year(url) is None:
+            print(f"  ⚠️ Skipping {url}: tracker URLs must end in a 4-digit year")
+        else:
+            urls.append(url)
+    with metrics.stage('fierce_fetch', pages=len(urls)) as st:
+        pages = fetch_pages(urls, workers)
+        st.rows = len(pages)
+
+    session = SessionLocal()
+    try:
+        with metrics.stage('fierce_store') as st:
+            for url, html in pages.items():
+                entries, fingerprints = changed_entries(session, url, html, tracker_year(url))
+                if not fingerprints:
+                    print(f"→ {url} unchanged since last run")
+                    continue
+                written = store_layoff_entries(session, entries) if entries else 0
+                # Fingerprints are saved with the events, so a failed run retries the page
+                for fp in fingerprints:
+                    session.merge(fp)
+                session.commit()
+                st.rows += written
+                print(f"→ Stored {written} new or updated layoff events from {url}")
     finally:
         session.close()
 
 if __name__ == "__main__":
-    fetch_and_store_layoffs()
+    parser = argparse.ArgumentParser(description="Scrape the Fierce Biotech layoff trackers")
+    parser.add_argument("trackers", nargs="*", help="tracker years or URLs (default: FIERCE_TRACKERS)")
+    parser.add_argument("--workers", type=int, default=FIERCE_WORKERS)
+    args = parser.parse_args()
+    fetch_and_store_layoffs(args.trackers or FIERCE_TRACKERS, args.workers)
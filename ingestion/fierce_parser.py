@@ -0,0 +1,124 @@
+# ingestion/fierce_parser.py
+#
+# Parsing of the Fierce Biotech layoff tracker page, kept free of DB and
+# network imports so it can be benchmarked against saved HTML on its own.
+
+import os
+import re
+import hashlib
+import unicodedata
+from functools import lru_cache
+from dateutil.parser import parse
+from bs4 import BeautifulSoup
+
+# BeautifulSoup tree builder: "lxml" (C parser) by default, "html.parser" as a pure-Python fallback
+FIERCE_PARSER = os.getenv("FIERCE_PARSER", "lxml")
+UNTITLED_SECTION = '(untitled)'  # title of a section whose header has no text
+
+def clean_text(text):
+    if isinstance(text, str):
+        text = unicodedata.normalize("NFKD", text)
+        text = re.sub(r'[^\x00-\x7F]+', '', text)
+        text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+def clean_company(company):
+    if isinstance(company, str):
+        company = company.strip()
+        company = re.sub(r':$', '', company)
+    return company
+
+def clean_description(desc):
+    if isinstance(desc, str):
+        desc = re.sub(r'^\w+\.\s*\d+\s*-\s*[^:]+:\s+', '', desc)
+        desc = re.sub(
+            r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d+\s*-\s+[^:\n]+:\s*',
+            '',
+            desc
+        )
+        desc = re.sub(r'\s*(Story|Release)\.?$', '', desc, flags=re.IGNORECASE)
+        desc = desc.replace('""', '"').strip(' ":\n')
+    return desc
+
+@lru_cache(maxsize=4096)
+def parse_date(raw_date, year):
+    # Many entries share a date, and dateutil's parser is slow
+    try:
+        return parse(f"{raw_date} {year}").date()
+    except ValueError:
+        return parse(f"January 1 {year}").date()
+
+def parse_entry(p, year):
+    """Parse one <p><strong>Date - Company:</strong> description</p> entry, or None."""
+    strong_text = p.strong.text.strip(':').strip()
+    parts = strong_text.split('-', 1)
+    if len(parts) != 2:
+        return None
+
+    # Parse date and company
+    raw_date = clean_text(parts[0].strip())
+    company_name = clean_company(clean_text(parts[1].strip()))
+    parsed_date = parse_date(raw_date, year)
+
+    # Extract description & URL
+    full_text = p.get_text(separator=' ', strip=True)
+    desc_raw = full_text.replace(strong_text, '', 1).lstrip(':').strip()
+    description = clean_description(clean_text(desc_raw))
+    link_tag = p.find('a')
+    source_url = clean_text(link_tag['href']) if link_tag else None
+
+    return company_name, parsed_date, description, source_url
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def iter_sections(soup):
+    """Yield (header, [entry <p> tags]) for every h2/h3 section of the page."""
+    for header in soup.find_all(['h2', 'h3']):
+        paragraphs = []
+        # Walk siblings lazily: find_next_siblings() would collect the rest
+        # of the page for every header before we stop at the next one
+        for sibling in header.next_siblings:
+            if sibling.name in ['h2', 'h3']:
+                break
+
+            if sibling.name == 'p' and sibling.strong:
+                paragraphs.append(sibling)
+        yield header, paragraphs
+
+def parse_tracker(html, year, parser=FIERCE_PARSER):
+    """
+    Return (company_name, date, description, source_url) for every entry
+    under the page's h2/h3 section headers.
+    """
+    soup = BeautifulSoup(html, parser)
+    entries = []
+    for _, paragraphs in iter_sections(soup):
+        for p in paragraphs:
+            entry = parse_entry(p, year)
+            if entry:
+                entries.append(entry)
+    return entries
+
+def parse_tracker_sections(html, parser=FIERCE_PARSER):
+    """
+    Split the page into sections for change detection. Returns a list of
+    (title, section_hash, [(entry_hash, <p> tag)]) where the hashes cover the
+    raw HTML of the section's entries and of each entry; only the entries
+    that changed need to go through parse_entry().
+    """
+    soup = BeautifulSoup(html, parser)
+    sections = []
+    titles = {}
+    for header, paragraphs in iter_sections(soup):
+        # Never '', the section key of the whole-page fingerprint (PAGE_SECTION)
+        title = clean_text(header.get_text(' ', strip=True))[:200] or UNTITLED_SECTION
+        # Disambiguate repeated headers without depending on their position
+        titles[title] = titles.get(title, 0) + 1
+        if titles[title] > 1:
+            title = f"{title} #{titles[title]}"
+
+        raw = [str(p) for p in paragraphs]
+        entries = [(content_hash(p_html), p) for p, p_html in zip(paragraphs, raw)]
+        sections.append((title, content_hash(''.join(raw)), entries))
+    return sections
@@ -1,111 +1,391 @@
 import os
-from datetime import datetime
-from sec_api import QueryApi, ExtractorApi
-from db.session import SessionLocal
-from db.models import Company, FundingRound
+import re
+import argparse
+from datetime import datetime, date, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from db.session import SessionLocal, engine
+from db.models import FundingRound, IngestionCheckpoint
+from db.bulk import BulkWriter
+from ingestion.throttle import TokenBucket, TransientHTTPError, retry_with_backoff, bounded_map
+from ingestion.http_cache import get_cache
+from pipeline import metrics, clients
 from sqlalchemy.exc import IntegrityError
 from dotenv import load_dotenv
 
 load_dotenv()
 SEC_API_KEY = os.getenv("SEC_API_KEY")
 
-# Initialize clients
-query_api     = QueryApi(api_key=SEC_API_KEY)
-extractor_api = ExtractorApi(api_key=SEC_API_KEY)
+# Query API pagination: results per page, and the deepest offset it will serve
+FORMD_PAGE_SIZE   = int(os.getenv("FORMD_PAGE_SIZE", "50"))
+FORMD_MAX_RESULTS = 10000
+# Extraction concurrency, request rate (calls/sec) and DB commit batch size
+FORMD_WORKERS     = int(os.getenv("FORMD_WORKERS", "8"))
+FORMD_RATE        = float(os.getenv("FORMD_RATE", "10"))
+FORMD_BATCH_SIZE  = int(os.getenv("FORMD_BATCH_SIZE", "200"))
+# Backfill sharding: days per sub-window and worker processes
+FORMD_WINDOW_DAYS = int(os.getenv("FORMD_WINDOW_DAYS", "7"))
+FORMD_PROCESSES   = int(os.getenv("FORMD_PROCESSES", "4"))
+CHECKPOINT_SOURCE = "formd"
+# Cache key for search requests (the request body carries the actual query)
+SEC_QUERY_URL     = "https://api.sec-api.io"
+# sec_api raises a bare Exception("API error: <status> - <body>") for failed requests
+SEC_API_ERROR     = re.compile(r'API error: (\d{3}|too many requests)')
 
-def ingest_formd_via_secapi(start_date: str, end_date: str):
+# SEC API clients, built on first use so sec_api and the key are only needed then
+@clients.provider('sec_query')
+def _sec_query():
+    from sec_api import QueryApi
+    return QueryApi(api_key=SEC_API_KEY)
+
+@clients.provider('sec_extractor')
+def _sec_extractor():
+    from sec_api import ExtractorApi
+    return ExtractorApi(api_key=SEC_API_KEY)
+
+# Shared by the search and extractor calls so the whole run stays under the plan limit
+sec_limiter = TokenBucket(rate=FORMD_RATE)
+
+def sec_call(source: str, fn, *args):
     """
-    Pull all Form D filings between start_date and end_date (YYYY-MM-DD),
-    extract amount & first-sale date, and insert FundingRound records.
+    One SEC API request, timed into the per-source HTTP metrics. A 429 or 5xx
+    error is raised as TransientHTTPError, so retry_with_backoff retries it.
     """
-    # Build the search query
-    query = {
-      "query": { 
+    with metrics.timed('http_request', source=source):
+        try:
+            return fn(*args)
+        except Exception as e:
+            m = SEC_API_ERROR.search(str(e))
+            if m and (not m[1].isdigit() or m[1] == '429' or int(m[1]) >= 500):
+                raise TransientHTTPError(str(e)) from e
+            raise
+
+def formd_query(start_date: str, end_date: str, offset: int, size: int) -> dict:
+    return {
+      "query": {
         "query_string": {
           "query": f'formType:"D" AND filedAt:[{start_date} TO {end_date}]'
         }
       },
-      "from": "0",
-      "size": "100",    # adjust upward if you need more
+      "from": str(offset),
+      "size": str(size),
       "sort": [{"filedAt":"desc"}]
     }
 
-    print(f"→ Querying SEC EDGAR for Form D between {start_date} and {end_date}")
-    filings = query_api.get_filings(query).get("filings", [])
+def search_filings(query: dict) -> dict:
+    """Run a Query API search, served from the response cache when fresh."""
+    return get_cache().fetch(
+        "sec_query", SEC_QUERY_URL,
+        lambda: retry_with_backoff(sec_call, "sec_query", clients.get("sec_query").get_filings, query,
+                                   limiter=sec_limiter),
+        body=query,
+    )
 
-    session = SessionLocal()
-    for f in filings:
-        issuer_name = f.get("nameOfIssuer") or f.get("issuerNameExp")
-        detail_url   = f.get("linkToHtml") or f.get("filingDetailUrl")
-        filed_at     = f.get("filedAt")
+def truncated(total: dict) -> bool:
+    """
+    Whether a search total means more hits than the API pages through. Large
+    result sets are reported as {value: 10000, relation: "gte"}, a lower bound.
+    """
+    return total.get("relation") == "gte" or total.get("value", 0) >= FORMD_MAX_RESULTS
 
-        if not issuer_name or not detail_url or not filed_at:
-            continue
+def count_formd_filings(start_date: str, end_date: str) -> dict:
+    """Search total ({value, relation}) of Form D filings in the window, from a one-result search."""
+    resp = search_filings(formd_query(start_date, end_date, 0, 1))
+    return resp.get("total", {})
+
+def iter_formd_filings(start_date: str, end_date: str, page_size: int = FORMD_PAGE_SIZE,
+                       status: dict = None):
+    """
+    Yield every Form D filing filed between start_date and end_date, page by
+    page. If the window holds more than FORMD_MAX_RESULTS filings, the rest
+    cannot be reached; their count (at least 1) is stored in status['unreached'].
+    """
+    offset = 0
+    total  = {}
+    while offset < FORMD_MAX_RESULTS:
+        query = formd_query(start_date, end_date, offset, page_size)
+        resp = search_filings(query)
+        filings = resp.get("filings", [])
+        total = resp.get("total", total)
+        yield from filings
+        offset += len(filings)
+        # A "gte" total is only a lower bound, so reaching it doesn't mean the end
+        if not filings or (offset >= total.get("value", 0) and not truncated(total)):
+            return
+    if status is not None:
+        status['unreached'] = max(1, total.get("value", 0) - offset)
+    print(f"  ⚠️ {'at least ' if total.get('relation') == 'gte' else ''}{total.get('value')} filings "
+          f"between {start_date} and {end_date}; only the first {FORMD_MAX_RESULTS} are reachable "
+          f"— use a smaller window")
+
+def extract_formd(detail_url: str) -> dict:
+    """Fetch the structured Form D data (cached, rate-limited, retried with backoff)."""
+    return get_cache().fetch(
+        "sec", detail_url,
+        lambda: retry_with_backoff(sec_call, "sec", clients.get("sec_extractor").get_extracted_data, detail_url,
+                                   limiter=sec_limiter),
+    ).get("entity", {})
 
-        # Upsert Company by exact name
-        company = session.query(Company).filter_by(name=issuer_name).first()
-        if not company:
-            company = Company(name=issuer_name)
-            session.add(company)
-            try:
-                session.commit()
-            except IntegrityError:
-                session.rollback()
-                company = session.query(Company).filter_by(name=issuer_name).one()
-
-        # Extract the structured Form D data
+def parse_formd(extracted: dict):
+    """Return (amount, first_sale_date) from extracted Form D data."""
+    # Parse amount
+    amount = None
+    amt_obj = extracted.get("offeringAmount")
+    if amt_obj and isinstance(amt_obj, dict):
         try:
-            extracted = extractor_api.get_extracted_data(detail_url).get("entity", {})
-        except Exception as e:
-            print("  ⚠️ Extraction failed for", issuer_name, detail_url, e)
-            continue
+            amount = float(amt_obj.get("value", 0))
+        except Exception:
+            pass
 
-        # Parse amount
-        amount = None
-        amt_obj = extracted.get("offeringAmount")
-        if amt_obj and isinstance(amt_obj, dict):
-            try:
-                amount = float(amt_obj.get("value", 0))
-            except Exception:
-                pass
-
-        # Parse dateOfFirstSale
-        first_sale = None
-        ds = extracted.get("dateOfFirstSale")
-        if ds:
-            try:
-                first_sale = datetime.fromisoformat(ds).date()
-            except Exception:
-                pass
-
-        # Skip if we already have this round (company/date/type)
-        exists = session.query(FundingRound).filter_by(
-            company_id = company.company_id,
-            date       = first_sale,
-            round_type = "Form D",
-            amount     = amount
-        ).first()
-        if exists:
-            continue
+    # Parse dateOfFirstSale
+    first_sale = None
+    ds = extracted.get("dateOfFirstSale")
+    if ds:
+        try:
+            first_sale = datetime.fromisoformat(ds).date()
+        except Exception:
+            pass
+    return amount, first_sale
 
-        # Insert the FundingRound
-        fr = FundingRound(
-            company_id = company.company_id,
+ACCESSION_RE = re.compile(r'/edgar/data/\d+/(\d{10})(\d{2})(\d{6})/')
+
+def formd_source_key(filing: dict, detail_url: str) -> str | None:
+    """'sec:<accession number>' for a filing, taken from the search hit or its URL."""
+    accession = filing.get("accessionNo")
+    if not accession:
+        m = ACCESSION_RE.search(detail_url)
+        accession = '-'.join(m.groups()) if m else None
+    return f"sec:{accession}" if accession else None
+
+def store_formd_batch(writer, batch):
+    """
+    Write a batch of extracted filings: resolve issuers to companies in bulk,
+    drop rounds already stored (company/date/type/amount), insert the rest.
+    Filings already stored under the same accession number are skipped by
+    ON CONFLICT (source_key). Returns the number of rounds inserted.
+    """
+    company_ids = writer.company_ids_for([b[0] for b in batch])
+    seen = writer.existing_keys(
+        FundingRound, ('company_id', 'date', 'round_type', 'amount'),
+        company_ids.values(), round_type="Form D",
+    )
+    before = writer.inserted[FundingRound]
+    for issuer_name, detail_url, filed_at, source_key, amount, first_sale in batch:
+        key = (company_ids[issuer_name], first_sale, "Form D", amount)
+        if key in seen:
+            continue
+        seen.add(key)
+        writer.add(FundingRound, dict(
+            company_id = key[0],
             date       = first_sale,
             round_type = "Form D",
             amount     = amount,
-            details    = f"Filed: {filed_at}; URL: {detail_url}"
-        )
-        session.add(fr)
+            details    = f"Filed: {filed_at}; URL: {detail_url}",
+            source_key = source_key
+        ))
+    writer.flush(FundingRound)
+    writer.session.commit()
+    return writer.inserted[FundingRound] - before
+
+def ingest_formd_via_secapi(start_date: str, end_date: str,
+                            workers: int = FORMD_WORKERS, batch_size: int = FORMD_BATCH_SIZE):
+    """
+    Pull all Form D filings between start_date and end_date (YYYY-MM-DD),
+    extract amount & first-sale date, and insert FundingRound records.
+
+    Search results are paged through in full; extraction runs on `workers`
+    threads behind a shared rate limiter, and rounds are written in bulk every
+    `batch_size` filings as extractions complete. Returns (filings seen,
+    rounds inserted, failed); failed counts the extractions that failed plus
+    any filings past the search API's result cap. Neither is stored, so the
+    window must not be treated as complete.
+    """
+    print(f"→ Querying SEC EDGAR for Form D between {start_date} and {end_date}")
+
+    session = SessionLocal()
+    writer = BulkWriter(session)
+    status = {}
+
+    def candidates():
+        # Filings whose accession number is already stored are skipped before
+        # extraction, checked one search page at a time
+        page = []
+        for f in iter_formd_filings(start_date, end_date, status=status):
+            issuer_name = f.get("nameOfIssuer") or f.get("issuerNameExp")
+            detail_url  = f.get("linkToHtml") or f.get("filingDetailUrl")
+            filed_at    = f.get("filedAt")
+            if issuer_name and detail_url and filed_at:
+                page.append((issuer_name, detail_url, filed_at, formd_source_key(f, detail_url)))
+            if len(page) >= FORMD_PAGE_SIZE:
+                yield from new_filings(page)
+                page = []
+        yield from new_filings(page)
+
+    def new_filings(page):
+        stored = writer.existing_source_keys(FundingRound, [c[3] for c in page])
+        return [c for c in page if c[3] is None or c[3] not in stored]
+
+    writer.on_conflict(FundingRound, index_elements=['source_key'])
+    seen = inserted = failed = 0
+    batch = []
+    try:
+        with metrics.stage('formd_ingest', start=start_date, end=end_date) as st:
+            results = bounded_map(lambda c: extract_formd(c[1]), candidates(), workers)
+            for (issuer_name, detail_url, filed_at, source_key), extracted, error in results:
+                seen += 1
+                if error is not None:
+                    failed += 1
+                    print("  ⚠️ Extraction failed for", issuer_name, detail_url, error)
+                    continue
+
+                amount, first_sale = parse_formd(extracted)
+                batch.append((issuer_name, detail_url, filed_at, source_key, amount, first_sale))
+                if len(batch) >= batch_size:
+                    inserted += store_formd_batch(writer, batch)
+                    batch = []
+                    print(f"  … {seen} filings processed, {inserted} rounds inserted")
+
+            if batch:
+                inserted += store_formd_batch(writer, batch)
+            failed += status.get('unreached', 0)
+            st.rows = inserted
+            st.fields['filings'] = seen
+            st.fields['failed'] = failed
+            st.fields['unreached'] = status.get('unreached', 0)
+    finally:
+        session.close()
+    print(f"→ Done ingesting Form D filings between {start_date} and {end_date} "
+          f"({seen} filings, {inserted} new rounds{f', {failed} failed' if failed else ''})")
+    return seen, inserted, failed
+
+def split_windows(start_date: str, end_date: str, days: int):
+    """Split [start_date, end_date] into consecutive inclusive windows of `days` days."""
+    start = date.fromisoformat(start_date)
+    end   = date.fromisoformat(end_date)
+    windows = []
+    while start <= end:
+        stop = min(start + timedelta(days=days - 1), end)
+        windows.append((start.isoformat(), stop.isoformat()))
+        start = stop + timedelta(days=1)
+    return windows
+
+def completed_windows(session, source=CHECKPOINT_SOURCE):
+    return {
+        (c.window_start.isoformat(), c.window_end.isoformat())
+        for c in session.query(IngestionCheckpoint).filter_by(source=source)
+    }
+
+def record_checkpoint(start_date: str, end_date: str, seen: int, inserted: int,
+                      source=CHECKPOINT_SOURCE):
+    session = SessionLocal()
+    try:
+        session.add(IngestionCheckpoint(
+            source           = source,
+            window_start     = date.fromisoformat(start_date),
+            window_end       = date.fromisoformat(end_date),
+            records_seen     = seen,
+            records_inserted = inserted,
+        ))
+        session.commit()
+    except IntegrityError:
+        session.rollback()  # another run already finished this window
+    finally:
+        session.close()
+
+def _ingest_window(start_date: str, end_date: str):
+    """
+    Ingest one window, halving it while it holds more filings than the search
+    API can page through. Every (sub-)window whose filings were all reached
+    and extracted is checkpointed; a single day still over the cap is not.
+    Returns (seen, inserted, failed).
+    """
+    seen = inserted = failed = 0
+    if start_date != end_date and truncated(count_formd_filings(start_date, end_date)):
+        days = (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days + 1
+        for sub_start, sub_end in split_windows(start_date, end_date, -(-days // 2)):
+            sub_seen, sub_inserted, sub_failed = _ingest_window(sub_start, sub_end)
+            seen += sub_seen
+            inserted += sub_inserted
+            failed += sub_failed
+    else:
+        seen, inserted, failed = ingest_formd_via_secapi(start_date, end_date)
+    # Incomplete windows stay unrecorded, so a resumed backfill fetches them again
+    if not failed:
+        record_checkpoint(start_date, end_date, seen, inserted)
+    return seen, inserted, failed
+
+def ingest_window(start_date: str, end_date: str):
+    """
+    Ingest one backfill window and checkpoint it as complete. Raises
+    RuntimeError if any extraction failed or filings were past the search
+    cap; the rounds that were extracted are kept, and the window is retried
+    by the next backfill.
+    """
+    seen, inserted, failed = _ingest_window(start_date, end_date)
+    if failed:
+        raise RuntimeError(f"{failed} Form D filings between {start_date} and {end_date} were not "
+                           f"stored (failed extractions or past the search cap); "
+                           f"window not checkpointed")
+    return seen, inserted
+
+def _run_window(window):
+    """Pool task: ingest one window and hand this worker's metrics back to the parent."""
+    metrics.reset()
+    ingest_window(*window)
+    return metrics.snapshot()
+
+def _init_worker(rate: float):
+    # Each process gets its share of the plan's request rate and fresh DB connections
+    global sec_limiter
+    sec_limiter = TokenBucket(rate=rate)
+    engine.dispose(close=False)
+    clients.reset()
+
+def backfill_formd(start_date: str, end_date: str, window_days: int = FORMD_WINDOW_DAYS,
+                   processes: int = FORMD_PROCESSES):
+    """
+    Backfill Form D filings over a long date range: split it into windows of
+    `window_days`, skip windows already checkpointed, and ingest the rest in
+    parallel worker processes. Safe to re-run after a crash.
+    """
+    windows = split_windows(start_date, end_date, window_days)
+    session = SessionLocal()
+    try:
+        done = completed_windows(session)
+    finally:
+        session.close()
+    todo = [w for w in windows if w not in done]
+    print(f"→ Form D backfill {start_date}–{end_date}: {len(windows)} windows, "
+          f"{len(windows) - len(todo)} already done, {processes} processes")
+    if not todo:
+        return
 
-    session.commit()
-    session.close()
-    print(f"→ Done ingesting Form D filings between {start_date} and {end_date}")
+    with metrics.stage('formd_backfill', start=start_date, end=end_date, windows=len(todo)) as st:
+        engine.dispose()  # don't share pooled connections with forked workers
+        failed = []
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(FORMD_RATE / processes,)) as pool:
+            futures = {pool.submit(_run_window, w): w for w in todo}
+            for future in as_completed(futures):
+                window = futures[future]
+                try:
+                    metrics.merge(future.result())
+                except Exception as e:
+                    failed.append(window)
+                    print("  ⚠️ Window failed", window, e)
+        st.rows = len(todo) - len(failed)
+        st.fields['failed_windows'] = len(failed)
+    if failed:
+        raise RuntimeError(f"{len(failed)} Form D windows failed; re-run to resume: {sorted(failed)}")
+    print(f"→ Form D backfill {start_date}–{end_date} complete")
 
 def main():
-    # e.g. Q1 2025
-    ingest_formd_via_secapi("2025-01-01", "2025-03-31")
-    # add more windows as needed
+    parser = argparse.ArgumentParser(description="Ingest SEC Form D filings")
+    parser.add_argument("--start", default="2025-01-01", help="first filing date (YYYY-MM-DD)")
+    parser.add_argument("--end", default="2025-03-31", help="last filing date (YYYY-MM-DD)")
+    parser.add_argument("--window-days", type=int, default=FORMD_WINDOW_DAYS)
+    parser.add_argument("--processes", type=int, default=FORMD_PROCESSES)
+    args = parser.parse_args()
+    backfill_formd(args.start, args.end, args.window_days, args.processes)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,188 @@
+# ingestion/http_cache.py
+#
+# Disk-backed response cache shared by the ingesters. Responses are stored in
+# a SQLite file keyed by source + URL + request body, expire after a per-source
+# TTL, and are evicted least-recently-used once the file exceeds its size cap.
+#
+# With HTTP_CACHE_OFFLINE=1 every lookup is served from the cache regardless of
+# age and a miss raises CacheMiss instead of touching the network, so a run (or
+# a re-parse after a parser change) can be replayed entirely from disk.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from dotenv import load_dotenv
+from pipeline import metrics
+
+load_dotenv()
+HTTP_CACHE_PATH     = os.getenv("HTTP_CACHE_PATH", ".cache/http_cache.sqlite")
+HTTP_CACHE_MAX_MB   = float(os.getenv("HTTP_CACHE_MAX_MB", "1024"))
+HTTP_CACHE_OFFLINE  = os.getenv("HTTP_CACHE_OFFLINE", "0") == "1"
+HTTP_CACHE_DISABLED = os.getenv("HTTP_CACHE_DISABLED", "0") == "1"
+
+# Seconds a response stays fresh, per source (override with HTTP_CACHE_TTL_<SOURCE>)
+DEFAULT_TTLS = {
+    'sec':        30 * 86400,  # extracted filings never change
+    'sec_query':  86400,       # search pages grow as new filings arrive
+    'crunchbase': 7 * 86400,
+    'fierce':     3600,
+    'llm':        365 * 86400,  # keyed by prompt version, so results don't go stale
+}
+
+# set() keeps a running total of the cached bytes instead of summing the table
+# on every write; it is recounted this often since forked workers share the file
+SIZE_RECOUNT_WRITES = 1000
+
+class CacheMiss(LookupError):
+    """Raised in offline mode when a request has no cached response."""
+
+def cache_key(source: str, url: str, body=None) -> str:
+    payload = json.dumps([source, url, body], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResponseCache:
+    def __init__(self, path=HTTP_CACHE_PATH, max_bytes=int(HTTP_CACHE_MAX_MB * 1024 * 1024),
+                 ttls=None, offline=HTTP_CACHE_OFFLINE):
+        self.path      = path
+        self.max_bytes = max_bytes
+        self.ttls      = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.offline   = offline
+        self.lock      = threading.Lock()
+        self._conn     = None
+        self._pid      = None
+        self._size     = None   # running SUM(size), None until counted on this connection
+        self._writes   = 0
+
+    @property
+    def conn(self):
+        # One connection per process; backfill workers are forked
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key         TEXT PRIMARY KEY,
+                    source      TEXT NOT NULL,
+                    url         TEXT NOT NULL,
+                    value       TEXT NOT NULL,
+                    size        INTEGER NOT NULL,
+                    created_at  REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)"
+            )
+            self._pid = os.getpid()
+            self._size = None
+        return self._conn
+
+    def ttl(self, source):
+        override = os.getenv(f"HTTP_CACHE_TTL_{source.upper()}")
+        return float(override) if override else self.ttls.get(source, 86400)
+
+    def get(self, source: str, url: str, body=None, allow_stale=False):
+        """
+        Return the cached response, or None if missing or stale. Offline mode
+        and allow_stale=True (for conditional revalidation) ignore age.
+        """
+        key = cache_key(source, url, body)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                metrics.inc('cache_lookups_total', source=source, result='miss')
+                return None
+            value, created_at = row
+            if not (self.offline or allow_stale) and now - created_at > self.ttl(source):
+                metrics.inc('cache_lookups_total', source=source, result='stale')
+                return None
+            metrics.inc('cache_lookups_total', source=source, result='hit')
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return json.loads(value)
+
+    def set(self, source: str, url: str, value, body=None):
+        data = json.dumps(value)
+        now  = time.time()
+        key  = cache_key(source, url, body)
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, source, url, data, len(data), now, now),
+            )
+            self.conn.commit()
+            self._writes += 1
+            if self._size is None or self._writes % SIZE_RECOUNT_WRITES == 0:
+                self._size = self._count_size()
+            else:
+                self._size += len(data) - (old[0] if old else 0)
+            self._evict()
+
+    def _count_size(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self):
+        """Drop least-recently-used responses until the cache is under 90% of its cap."""
+        if self._size <= self.max_bytes:
+            return
+        # Other processes may have evicted (or added) since the last count
+        self._size = self._count_size()
+        if self._size <= self.max_bytes:
+            return
+        target = self._size - int(self.max_bytes * 0.9)
+        freed  = 0
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.conn.commit()
+        self._size -= freed
+
+    def fetch(self, source: str, url: str, fn, body=None):
+        """
+        Return the cached response for (source, url, body), or call fn() to
+        fetch it and store the result. fn must return a JSON-serializable value.
+        """
+        cached = self.get(source, url, body)
+        if cached is not None:
+            return cached
+        if self.offline:
+            raise CacheMiss(f"{source}: {url} not in cache (offline mode)")
+        value = fn()
+        self.set(source, url, value, body)
+        return value
+
+class NullCache:
+    """Stand-in when HTTP_CACHE_DISABLED=1: always fetches."""
+    offline = False
+
+    def get(self, source, url, body=None, allow_stale=False):
+        return None
+
+    def set(self, source, url, value, body=None):
+        pass
+
+    def fetch(self, source, url, fn, body=None):
+        return fn()
+
+_cache = None
+
+def get_cache():
+    """The process-wide response cache configured from the environment."""
+    global _cache
+    if _cache is None:
+        _cache = NullCache() if HTTP_CACHE_DISABLED else ResponseCache()
+    return _cache
@@ -0,0 +1,94 @@
+# ingestion/throttle.py
+#
+# Shared rate limiting, retry and bounded-concurrency helpers for the
+# ingesters that call paid or rate-limited APIs.
+
+import time
+import random
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second and allows
+    bursts of up to `capacity` tokens.
+    """
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate     = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens   = self.capacity
+        self.updated  = time.monotonic()
+        self.lock     = threading.Lock()
+
+    def _take(self, tokens):
+        """Take tokens if available; otherwise return the seconds to wait."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens  = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1):
+        while True:
+            delay = self._take(tokens)
+            if not delay:
+                return
+            time.sleep(delay)
+
+class TransientHTTPError(requests.HTTPError):
+    """429 or 5xx response, worth retrying after a backoff."""
+
+# Failures worth retrying: a 4xx, an auth or parse error, or an offline cache
+# miss would fail the same way again and only spend rate budget
+TRANSIENT_ERRORS = (TransientHTTPError, requests.ConnectionError, requests.Timeout)
+
+def retry_with_backoff(fn, *args, attempts=5, base_delay=1.0, max_delay=30.0,
+                       retry_on=TRANSIENT_ERRORS, limiter=None, **kwargs):
+    """
+    Call fn(*args, **kwargs), retrying on `retry_on` exceptions (by default
+    TRANSIENT_ERRORS) with jittered exponential backoff. If a limiter is given,
+    a token is taken before every attempt. The last exception is re-raised
+    once attempts run out; any other exception is raised at once.
+    """
+    for attempt in range(1, attempts + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except retry_on:
+            if attempt == attempts:
+                raise
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+def bounded_map(fn, items, workers, max_pending=None):
+    """
+    Run fn(item) on a pool of `workers` threads, pulling from `items` lazily so
+    at most `max_pending` calls are in flight. Yields (item, result, error)
+    tuples in completion order; error is None on success.
+    """
+    max_pending = max_pending or workers * 2
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def fill():
+            while len(pending) < max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                pending[pool.submit(fn, item)] = item
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item  = pending.pop(future)
+                error = future.exception()
+                yield item, (None if error else future.result()), error
+            fill()
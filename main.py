@@ -1,11 +1,72 @@
-from ingestion.fierce_layoff import fetch_and_store_layoffs
-from ingestion.formd_secapi import ingest_formd_via_secapi
-from graph.neo4j_loader import load_to_neo4j
+import os
+import argparse
+from pipeline.runner import Stage, run_pipeline
+from dotenv import load_dotenv
 
-def main():
+load_dotenv()
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "2"))
+
+# Stage bodies import their modules lazily, so a worker only loads what it runs
+
+def fierce_layoffs(params):
+    from ingestion.fierce_layoff import fetch_and_store_layoffs
     fetch_and_store_layoffs()
-    ingest_formd_via_secapi("2025-01-01", "2025-03-31")
-    load_to_neo4j()
+
+def formd(params):
+    from ingestion.formd_secapi import backfill_formd
+    backfill_formd(params['start'], params['end'])
+
+def crunchbase(params):
+    from ingestion.crunchbase import upsert_crunchbase_data
+    upsert_crunchbase_data()
+
+def resolve(params):
+    # Fold name variants across sources into one company before loading the graph
+    from db.canonical import resolve_companies
+    resolve_companies()
+
+def graph_sync(params):
+    # Only rows changed since the last successful sync; the first run loads everything
+    from graph.neo4j_loader import load_to_neo4j
+    load_to_neo4j(incremental=not params['full_reload'])
+
+def snapshot(params):
+    # Parquet copy of the tables for analysts; appends changes unless --full-reload
+    from db.snapshot import export_snapshot
+    export_snapshot(full=params['full_reload'])
+
+STAGES = [
+    Stage('fierce_layoffs',    fierce_layoffs, [], True),
+    Stage('formd',             formd,          [], True),
+    Stage('crunchbase',        crunchbase,     ['fierce_layoffs', 'formd'], False),
+    Stage('resolve_companies', resolve,        ['fierce_layoffs', 'formd', 'crunchbase'], True),
+    Stage('graph_sync',        graph_sync,     ['resolve_companies'], True),
+    Stage('snapshot',          snapshot,       ['resolve_companies'], False),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ingestion → resolution → graph pipeline")
+    parser.add_argument("--stages", nargs="+", metavar="STAGE",
+                        help="stages to run (default: every default stage)")
+    parser.add_argument("--start", default="2025-01-01", help="Form D backfill start date")
+    parser.add_argument("--end", default="2025-03-31", help="Form D backfill end date")
+    parser.add_argument("--full-reload", action="store_true",
+                        help="reload the whole graph (and rewrite the snapshot) instead of syncing changes")
+    parser.add_argument("--workers", type=int, default=PIPELINE_WORKERS,
+                        help="stages run at the same time")
+    parser.add_argument("--fresh", action="store_true",
+                        help="start a new run instead of resuming an unfinished one")
+    parser.add_argument("--list", action="store_true", help="list the stages and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for s in STAGES:
+            deps = ', '.join(s.deps) or '-'
+            print(f"{s.name:<18} after: {deps}{'' if s.default else '  (not run by default)'}")
+        return
+
+    params = {'start': args.start, 'end': args.end, 'full_reload': args.full_reload}
+    run_pipeline(STAGES, args.stages, params, workers=args.workers, fresh=args.fresh)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,165 @@
+# nlp/entity_resolution.py
+#
+# Company-name entity resolution, kept free of DB imports so it can be
+# benchmarked on its own (see benchmarks/bench_entity_resolution.py).
+#
+# Names are normalized (case, punctuation, legal suffixes) into a name key.
+# Names whose keys are equal, or equal once trailing industry words are
+# dropped ("Acme Therapeutics" ~ "Acme"), are grouped directly. Near-duplicate
+# keys are then found with MinHash LSH over character trigrams: only keys that
+# share a band bucket are ever compared, so the work grows roughly linearly
+# with the number of names instead of quadratically.
+
+import os
+import re
+import zlib
+import random
+import unicodedata
+from array import array
+
+# Trigram Jaccard similarity at which two keys are the same company
+RESOLVE_THRESHOLD  = float(os.getenv("RESOLVE_THRESHOLD", "0.7"))
+# LSH banding: bands x rows minhashes per key; a pair becomes a candidate
+# when all rows of any band agree (~50% likely at similarity (1/bands)**(1/rows))
+RESOLVE_BANDS      = int(os.getenv("RESOLVE_BANDS", "8"))
+RESOLVE_ROWS       = int(os.getenv("RESOLVE_ROWS", "4"))
+# Buckets larger than this are skipped rather than compared pairwise
+RESOLVE_MAX_BUCKET = int(os.getenv("RESOLVE_MAX_BUCKET", "200"))
+
+LEGAL_SUFFIXES = frozenset({
+    'inc', 'incorporated', 'corp', 'corporation', 'co', 'company', 'ltd', 'limited',
+    'llc', 'lp', 'llp', 'plc', 'ag', 'sa', 'sas', 'nv', 'bv', 'gmbh', 'se', 'as', 'ab',
+    'oy', 'spa', 'srl', 'pty', 'kk',
+})
+# Trailing words the trackers often leave off ("Vertex" for "Vertex Pharmaceuticals")
+DESCRIPTORS = frozenset({
+    'therapeutics', 'therapeutic', 'tx', 'pharmaceuticals', 'pharmaceutical', 'pharma',
+    'biopharma', 'biopharmaceuticals', 'biotherapeutics', 'biosciences', 'bioscience',
+    'biotech', 'biotechnology', 'biologics', 'bio', 'medicines', 'sciences', 'science',
+    'technologies', 'technology', 'labs', 'laboratories', 'holdings', 'holding', 'group',
+    'international',
+})
+# A one-word core shorter than this is too ambiguous to group on by itself
+MIN_CORE_LENGTH = 4
+
+_PRIME = (1 << 61) - 1
+
+def normalize_company_name(name: str) -> str:
+    """'Acme Therapeutics, Inc.' and 'ACME THERAPEUTICS INC' -> 'acme therapeutics'."""
+    if not name:
+        return ''
+    text = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode().lower()
+    text = re.sub(r'\s/[a-z]{2,3}/?$', '', text)  # EDGAR state tag, e.g. "VERTEX PHARMACEUTICALS INC /MA"
+    text = text.replace('&', ' and ')
+    text = re.sub(r"[.']", '', text)  # S.A. -> sa, Moody's -> moodys
+    tokens = re.sub(r'[^a-z0-9]+', ' ', text).split()
+    if len(tokens) > 1 and tokens[0] == 'the':
+        tokens = tokens[1:]
+    # "Merck & Co., Inc." -> "merck": the dangling "and" goes with the suffix
+    while len(tokens) > 1 and (tokens[-1] in LEGAL_SUFFIXES or tokens[-1] == 'and'):
+        tokens.pop()
+    return ' '.join(tokens)
+
+def match_key(name_key: str) -> str:
+    """The key names are grouped on: name_key without trailing descriptors, when still distinctive."""
+    tokens = name_key.split()
+    while len(tokens) > 1 and tokens[-1] in DESCRIPTORS:
+        tokens.pop()
+    if len(tokens) == 1 and len(tokens[0]) < MIN_CORE_LENGTH:
+        return name_key
+    return ' '.join(tokens)
+
+def shingles(key: str, n: int = 3) -> set:
+    padded = f" {key} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the two keys' character trigrams."""
+    sa, sb = shingles(a), shingles(b)
+    return len(sa & sb) / len(sa | sb)
+
+def hash_functions(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(count)]
+
+def minhash(key: str, funcs) -> list:
+    hashes = [zlib.crc32(s.encode()) for s in shingles(key)]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in funcs]
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 whose root is always the smallest member."""
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, x, y):
+        rx, ry = self.find(x), self.find(y)
+        if rx != ry:
+            self.parent[max(rx, ry)] = min(rx, ry)
+
+def link_similar(keys, sets, threshold, bands, rows, max_bucket):
+    """
+    Union the keys whose similarity reaches threshold, comparing only the
+    candidate pairs that collide in some LSH band. Returns
+    (comparisons made, oversized buckets skipped).
+    """
+    funcs = hash_functions(bands * rows)
+    # One hashed band value per key and band, kept compact for large inputs
+    band_values = [array('q') for _ in range(bands)]
+    for key in keys:
+        sig = minhash(key, funcs)
+        for b in range(bands):
+            band_values[b].append(hash(tuple(sig[b * rows:(b + 1) * rows])))
+
+    comparisons = skipped = 0
+    for values in band_values:
+        buckets = {}
+        for i, value in enumerate(values):
+            buckets.setdefault(value, []).append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if len(members) > max_bucket:
+                skipped += 1
+                continue
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    i, j = members[x], members[y]
+                    if sets.find(i) == sets.find(j):
+                        continue
+                    comparisons += 1
+                    if similarity(keys[i], keys[j]) >= threshold:
+                        sets.union(i, j)
+    return comparisons, skipped
+
+def cluster_names(names, threshold: float = RESOLVE_THRESHOLD, bands: int = RESOLVE_BANDS,
+                  rows: int = RESOLVE_ROWS, max_bucket: int = RESOLVE_MAX_BUCKET, stats=None) -> list:
+    """
+    Resolve names into clusters of the same company. Returns, for each name,
+    the index of its cluster's representative: the cluster member that comes
+    first in `names`, so ordering the input oldest-first keeps existing rows
+    canonical. Pass a dict as `stats` to receive comparison counts.
+    """
+    keys = [match_key(normalize_company_name(n)) for n in names]
+
+    # Identical keys are one cluster without any comparison
+    index_of, first = {}, []
+    for i, key in enumerate(keys):
+        if key and key not in index_of:
+            index_of[key] = len(first)
+            first.append(i)
+    distinct = [keys[i] for i in first]
+
+    sets = UnionFind(len(distinct))
+    comparisons, skipped = link_similar(distinct, sets, threshold, bands, rows, max_bucket)
+    if stats is not None:
+        stats.update(names=len(names), distinct_keys=len(distinct),
+                     comparisons=comparisons, skipped_buckets=skipped)
+
+    return [first[sets.find(index_of[key])] if key else i for i, key in enumerate(keys)]
@@ -1,21 +1,25 @@
 import os
+import re
+import asyncio
 from pydantic import BaseModel
-from langchain import OpenAI, LLMChain, PromptTemplate
 from dotenv import load_dotenv
+from ingestion.http_cache import get_cache
+from pipeline import metrics, clients
 
 # Load OpenAI key from .env
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Max LLM requests in flight during extract_layoffs
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
 
-llm = OpenAI(api_key=OPENAI_API_KEY, temperature=0)
+# Cache namespace for extraction results; bump it when the prompt changes
+EXTRACTOR_VERSION = "layoff-extractor-v1"
 
 class LayoffSchema(BaseModel):
     num_laid_off: int | None
     percent: float | None
 
-prompt = PromptTemplate(
-    input_variables=["description"],
-    template="""
+PROMPT_TEMPLATE = """
 Extract from the following layoff description the number of people laid off and the percentage.
 If a value is missing, return null.
 
@@ -28,10 +32,97 @@ Return a JSON object with two keys:
 - num_laid_off (integer or null)
 - percent (float or null)
 """
+
+# langchain is only imported once a description actually needs the LLM
+@clients.provider('openai_llm')
+def _openai_llm():
+    from langchain import OpenAI
+    return OpenAI(api_key=OPENAI_API_KEY, temperature=0)
+
+@clients.provider('layoff_chain')
+def _layoff_chain():
+    from langchain import LLMChain, PromptTemplate
+    prompt = PromptTemplate(input_variables=["description"], template=PROMPT_TEMPLATE)
+    return LLMChain(llm=clients.get('openai_llm'), prompt=prompt)
+
+# Regex fast path: a single head count and at most one percentage
+COUNT_RE    = re.compile(
+    r'\b(\d{1,3}(?:,\d{3})+|\d+)\s+(?:people|employees|staffers|staff|workers|jobs|positions|roles)\b',
+    re.IGNORECASE,
 )
+PERCENT_RE  = re.compile(r'(\d+(?:\.\d+)?)\s*(?:%|percent\b)', re.IGNORECASE)
+# Wording the regexes can't resolve ("half its staff", "hundreds of jobs")
+VAGUE_RE    = re.compile(r'\b(?:half|third|quarter|fifth|tenth|dozens|hundreds|thousands)\b', re.IGNORECASE)
+
+def normalize_description(description: str) -> str:
+    return ' '.join((description or '').split()).lower()
+
+def regex_extract(description: str) -> LayoffSchema | None:
+    """Return the numbers when the description states them unambiguously, else None."""
+    if not description or VAGUE_RE.search(description):
+        return None
+    counts   = {int(m.replace(',', '')) for m in COUNT_RE.findall(description)}
+    percents = {float(m) for m in PERCENT_RE.findall(description)}
+    if len(counts) != 1 or len(percents) > 1:
+        return None
+    return LayoffSchema(num_laid_off=counts.pop(), percent=percents.pop() if percents else None)
+
+async def _aextract(chain, description: str, semaphore: asyncio.Semaphore) -> LayoffSchema:
+    async with semaphore:
+        with metrics.timed('llm_call', model='openai'):
+            raw = await chain.arun(description=description)
+    return LayoffSchema.parse_raw(raw)
+
+async def _aextract_all(descriptions, concurrency):
+    chain = clients.get('layoff_chain')
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(
+        *(_aextract(chain, d, semaphore) for d in descriptions),
+        return_exceptions=True,
+    )
+
+def extract_layoffs(descriptions: list[str], concurrency: int = LLM_CONCURRENCY) -> list[LayoffSchema]:
+    """
+    Extract layoff numbers for many descriptions. Unambiguous descriptions are
+    handled by regex, previously seen ones come from the persistent cache, and
+    the rest go to the LLM with at most `concurrency` calls in flight. A failed
+    extraction yields a LayoffSchema with both fields None.
+    """
+    cache = get_cache()
+    results = [None] * len(descriptions)
+    todo = {}  # normalized description -> indexes still needing the LLM
+    for i, description in enumerate(descriptions):
+        fast = regex_extract(description)
+        if fast is not None:
+            results[i] = fast
+            metrics.inc('layoff_extractions_total', path='regex')
+            continue
+        key = normalize_description(description)
+        cached = cache.get('llm', EXTRACTOR_VERSION, body=key)
+        if cached is not None:
+            results[i] = LayoffSchema(**cached)
+            metrics.inc('layoff_extractions_total', path='cache')
+            continue
+        todo.setdefault(key, []).append(i)
+
+    if todo and not cache.offline:
+        from langchain.callbacks import get_openai_callback
+        keys = list(todo)
+        metrics.inc('layoff_extractions_total', len(keys), path='llm')
+        with get_openai_callback() as usage:
+            outputs = asyncio.run(_aextract_all([descriptions[todo[k][0]] for k in keys], concurrency))
+        metrics.inc('llm_tokens_total', usage.prompt_tokens, kind='prompt')
+        metrics.inc('llm_tokens_total', usage.completion_tokens, kind='completion')
+        metrics.inc('llm_cost_usd_total', usage.total_cost)
+        for key, out in zip(keys, outputs):
+            if isinstance(out, Exception):
+                print("  ⚠️ LLM extraction failed:", out)
+                continue
+            cache.set('llm', EXTRACTOR_VERSION, out.dict(), body=key)
+            for i in todo[key]:
+                results[i] = out
 
-chain = LLMChain(llm=llm, prompt=prompt)
+    return [r or LayoffSchema(num_laid_off=None, percent=None) for r in results]
 
 def extract_layoff(description: str) -> LayoffSchema:
-    raw = chain.run(description=description)
-    return LayoffSchema.parse_raw(raw)
\ No newline at end of file
+    return extract_layoffs([description])[0]
@@ -0,0 +1,62 @@
+# pipeline/clients.py
+#
+# Registry of lazily built API clients. Modules register a factory under a
+# name at import time, which is cheap: the factory does its own heavy
+# third-party imports (langchain, sec_api, ...) and reads its API key only
+# when the client is first requested, so importing a module, or running a
+# stage that never calls the API, needs neither the package's import time nor
+# the key.
+#
+#   @clients.provider('sec_query')
+#   def _sec_query():
+#       from sec_api import QueryApi
+#       return QueryApi(api_key=SEC_API_KEY)
+#
+#   clients.get('sec_query').get_filings(query)
+#
+# Instances are cached per process; reset() drops them, e.g. in a forked
+# worker that should not reuse its parent's connections.
+
+import threading
+
+_lock      = threading.RLock()  # a factory may get() the clients it builds on
+_providers = {}   # name -> factory()
+_instances = {}   # name -> built client
+
+def register(name: str, factory):
+    """Register factory() as the builder of client `name` (re-registering replaces it)."""
+    with _lock:
+        _providers[name] = factory
+        _instances.pop(name, None)
+
+def provider(name: str):
+    """Decorator form of register()."""
+    def decorate(factory):
+        register(name, factory)
+        return factory
+    return decorate
+
+def get(name: str):
+    """The process-wide client `name`, built on first use."""
+    client = _instances.get(name)
+    if client is not None:
+        return client
+    with _lock:
+        if name not in _instances:
+            if name not in _providers:
+                raise KeyError(f"no client provider registered as {name!r}")
+            _instances[name] = _providers[name]()
+        return _instances[name]
+
+def built() -> list:
+    """Names of the clients built so far in this process."""
+    with _lock:
+        return sorted(_instances)
+
+def reset(name: str | None = None):
+    """Forget the built client `name` (all clients when None); the next get() rebuilds it."""
+    with _lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
@@ -0,0 +1,288 @@
+# pipeline/metrics.py
+#
+# Lightweight instrumentation shared by the ingesters, the LLM extractor and
+# the graph loader: per-process counters and latency histograms, stage
+# timers that emit structured JSON log lines, and an optional Prometheus
+# textfile written when the process exits.
+#
+#   with metrics.stage('formd_ingest', start=start_date) as st:
+#       ...
+#       st.rows += len(batch)
+#
+#   with metrics.timed('http_request', source='sec'):
+#       resp = ...
+#
+# METRICS_PROFILE=cprofile|tracemalloc additionally profiles each stage (or
+# only the stages listed in METRICS_PROFILE_STAGES): cProfile dumps a .prof
+# file per stage into METRICS_PROFILE_DIR, tracemalloc logs the peak traced
+# memory and the top allocation sites. Only the outermost profiled stage of
+# a process is profiled, and cProfile only sees the thread that entered it.
+
+import os
+import sys
+import json
+import time
+import atexit
+import logging
+import threading
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
+METRICS_LOG_PATH       = os.getenv("METRICS_LOG_PATH", "")   # JSON lines; stderr when empty
+METRICS_PROM_PATH      = os.getenv("METRICS_PROM_PATH", "")  # Prometheus textfile; off when empty
+METRICS_PROFILE        = os.getenv("METRICS_PROFILE", "")    # "", "cprofile" or "tracemalloc"
+METRICS_PROFILE_STAGES = {s for s in os.getenv("METRICS_PROFILE_STAGES", "").split(",") if s}
+METRICS_PROFILE_DIR    = os.getenv("METRICS_PROFILE_DIR", "profiles")
+
+PREFIX  = "biotech_kg_"
+# Latency buckets in seconds, from a cached lookup to a whole stage
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800)
+
+_lock       = threading.Lock()
+_counters   = {}   # (name, labels) -> value
+_histograms = {}   # (name, labels) -> [bucket counts..., +Inf count, sum]
+_profiling  = False
+
+logger = logging.getLogger("biotech_kg.metrics")
+logger.propagate = False
+if not logger.handlers:
+    _handler = (logging.FileHandler(METRICS_LOG_PATH) if METRICS_LOG_PATH
+                else logging.StreamHandler(sys.stderr))
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def log_event(event: str, **fields):
+    """Emit one structured JSON log line."""
+    record = {'ts': datetime.now(timezone.utc).isoformat(), 'event': event, 'pid': os.getpid()}
+    record.update(fields)
+    logger.info(json.dumps(record, default=str))
+
+def inc(name: str, value: float = 1, **labels):
+    """Add value to the counter name{labels}."""
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name: str, value: float, **labels):
+    """Record one observation (seconds) in the histogram name{labels}."""
+    key = (name, _labels(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                hist[i] += 1
+                break
+        else:
+            hist[len(BUCKETS)] += 1
+        hist[-1] += value
+
+@contextmanager
+def timed(name: str, **labels):
+    """
+    Time the block into the histogram `<name>_seconds` and count it in
+    `<name>s_total` with outcome="ok" or "error".
+    """
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        observe(f"{name}_seconds", time.perf_counter() - start, **labels)
+        inc(f"{name}s_total", outcome=outcome, **labels)
+
+class Stage:
+    """Handle yielded by stage(): add to .rows, or attach extra fields for the end event."""
+    def __init__(self, name, fields):
+        self.name   = name
+        self.fields = fields
+        self.rows   = 0
+
+def _should_profile(name):
+    return METRICS_PROFILE and not _profiling and (
+        not METRICS_PROFILE_STAGES or name in METRICS_PROFILE_STAGES
+    )
+
+@contextmanager
+def _profile(name, st):
+    global _profiling
+    _profiling = True
+    try:
+        if METRICS_PROFILE == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                os.makedirs(METRICS_PROFILE_DIR, exist_ok=True)
+                path = os.path.join(METRICS_PROFILE_DIR,
+                                    f"{name.replace(':', '_')}-{os.getpid()}-{int(time.time())}.prof")
+                profiler.dump_stats(path)
+                st.fields['profile'] = path
+        elif METRICS_PROFILE == 'tracemalloc':
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start(10)
+            tracemalloc.reset_peak()
+            try:
+                yield
+            finally:
+                _, peak = tracemalloc.get_traced_memory()
+                top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+                st.fields['peak_traced_mb'] = round(peak / 2**20, 2)
+                st.fields['top_allocations'] = [
+                    {'site': str(s.traceback), 'kb': round(s.size / 1024, 1)} for s in top
+                ]
+                if started:
+                    tracemalloc.stop()
+        else:
+            yield
+    finally:
+        _profiling = False
+
+@contextmanager
+def stage(name: str, **fields):
+    """
+    Time a pipeline stage: logs stage_start/stage_end (or stage_failed) JSON
+    events and records `stage_seconds` and `stage_rows_total` for it.
+    """
+    st = Stage(name, dict(fields))
+    log_event('stage_start', stage=name, **fields)
+    start = time.perf_counter()
+    status = 'failed'
+    try:
+        if _should_profile(name):
+            with _profile(name, st):
+                yield st
+        else:
+            yield st
+        status = 'ok'
+    finally:
+        elapsed = time.perf_counter() - start
+        observe('stage_seconds', elapsed, stage=name, status=status)
+        inc('stage_rows_total', st.rows, stage=name)
+        log_event('stage_end' if status == 'ok' else 'stage_failed', stage=name,
+                  seconds=round(elapsed, 3), rows=st.rows, **st.fields)
+
+# -- cross-process aggregation -----------------------------------------------
+
+def snapshot() -> dict:
+    """This process's metrics in a picklable form, for worker processes to return."""
+    with _lock:
+        return {
+            'counters':   list(_counters.items()),
+            'histograms': [(key, list(hist)) for key, hist in _histograms.items()],
+        }
+
+def merge(snap: dict):
+    """Fold a worker's snapshot() into this process's metrics."""
+    with _lock:
+        for key, value in snap['counters']:
+            _counters[key] = _counters.get(key, 0) + value
+        for key, hist in snap['histograms']:
+            mine = _histograms.setdefault(key, [0] * (len(BUCKETS) + 2))
+            for i, value in enumerate(hist):
+                mine[i] += value
+
+def reset():
+    """Clear all metrics, e.g. at the start of a forked worker's task."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+# -- export ------------------------------------------------------------------
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters   = sorted(_counters.items())
+        histograms = sorted((key, list(hist)) for key, hist in _histograms.items())
+    lines, typed = [], set()
+    for (name, labels), value in counters:
+        metric = PREFIX + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+    for (name, labels), hist in histograms:
+        metric = PREFIX + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} histogram")
+            typed.add(metric)
+        cumulative = 0
+        for bound, count in zip(BUCKETS, hist):
+            cumulative += count
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        cumulative += hist[len(BUCKETS)]
+        lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {cumulative}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {hist[-1]}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path: str = METRICS_PROM_PATH):
+    """Atomically write the textfile read by node_exporter's textfile collector."""
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        fh.write(render_prometheus())
+    os.replace(tmp, path)
+
+def _write_at_exit():
+    write_prometheus()
+    with _lock:
+        summary = {f"{name}{_format_labels(labels)}": value for (name, labels), value in _counters.items()}
+    if summary:
+        log_event('run_metrics', counters=summary)
+
+# Forked pool workers leave through os._exit, so only the parent process writes
+atexit.register(_write_at_exit)
+
+# -- database instrumentation ------------------------------------------------
+
+def instrument_engine(engine):
+    """Count and time every SQL statement and commit made through engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_start'].pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+        observe('db_statement_seconds', elapsed, verb=verb)
+        inc('db_statements_total', verb=verb)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get('metrics_start') if context.connection else None
+        if starts:
+            starts.pop()
+        inc('db_errors_total')
+
+    @event.listens_for(engine, "commit")
+    def _commit(conn):
+        inc('db_commits_total')
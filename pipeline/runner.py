@@ -0,0 +1,188 @@
+# pipeline/runner.py
+#
+# Minimal DAG runner for main.py. Stages declare the stages they depend on;
+# every stage whose dependencies have finished is started in a worker
+# process, so independent stages (the layoff scrape and the Form D backfill)
+# run side by side. A failed stage only holds back the stages that depend on
+# it.
+#
+# Progress is stored per stage in pipeline_stage_runs. A run is identified by
+# a key over the selected stages and their parameters: if the latest run
+# with the same key did not finish, the next invocation resumes it and skips
+# the stages that already succeeded.
+
+import json
+import hashlib
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from pipeline import metrics
+
+# SQLAlchemy and db.session (which builds the engine) are imported where the
+# stage records are read and written, so main.py --list and the import stay cheap
+
+# fn(params) runs the stage; deps are stage names; default stages run when
+# no explicit selection is given
+Stage = namedtuple('Stage', ['name', 'fn', 'deps', 'default'])
+
+SUCCEEDED = 'succeeded'
+FAILED    = 'failed'
+RUNNING   = 'running'
+SKIPPED   = 'skipped'
+
+def run_key(stage_names, params) -> str:
+    payload = json.dumps([sorted(stage_names), params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def select_stages(stages, names=None):
+    """The stages to run, in declaration order: `names`, or every default stage."""
+    known = {s.name for s in stages}
+    unknown = set(names or []) - known
+    if unknown:
+        raise ValueError(f"unknown stages {sorted(unknown)}; choose from {sorted(known)}")
+    return [s for s in stages if (s.name in names if names else s.default)]
+
+def effective_deps(stages, selected) -> dict:
+    """
+    For each selected stage, the selected stages it must wait for: its own
+    dependencies, with unselected ones replaced by their dependencies in turn,
+    so `--stages formd graph_sync` still runs graph_sync after formd.
+    """
+    by_name = {s.name: s for s in stages}
+    deps = {}
+    for name in selected:
+        found, seen, stack = set(), set(), list(by_name[name].deps)
+        while stack:
+            dep = stack.pop()
+            if dep in seen:
+                continue
+            seen.add(dep)
+            if dep in selected:
+                found.add(dep)
+            else:
+                stack.extend(by_name[dep].deps)
+        deps[name] = sorted(found)
+    return deps
+
+def resume_state(session, key, selected):
+    """(run_id, succeeded stage names) of the latest unfinished run with this key, else (None, set())."""
+    from sqlalchemy import select
+    from db.models import PipelineStageRun
+    latest = session.execute(
+        select(PipelineStageRun.run_id)
+        .where(PipelineStageRun.run_key == key)
+        .order_by(PipelineStageRun.started_at.desc())
+        .limit(1)
+    ).scalar()
+    if latest is None:
+        return None, set()
+    succeeded = set(session.execute(
+        select(PipelineStageRun.stage)
+        .where(PipelineStageRun.run_id == latest, PipelineStageRun.status == SUCCEEDED)
+    ).scalars())
+    if set(selected) <= succeeded:
+        return None, set()
+    return latest, succeeded
+
+def record(run_id, key, stage, status, error=None):
+    from db.session import SessionLocal
+    from db.models import PipelineStageRun
+    session = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        row = session.get(PipelineStageRun, (run_id, stage)) or PipelineStageRun(
+            run_id=run_id, stage=stage, run_key=key, started_at=now,
+        )
+        row.status = status
+        row.error  = error
+        if status == RUNNING:
+            row.started_at  = now
+            row.finished_at = None
+        else:
+            row.finished_at = now
+        session.add(row)
+        session.commit()
+    finally:
+        session.close()
+
+def _init_worker():
+    from db.session import engine
+    engine.dispose(close=False)  # stage processes open their own connections
+
+def _run_stage(name, fn, params):
+    """Worker side: run one stage and return its metrics (the worker may be reused)."""
+    metrics.reset()
+    with metrics.stage(f"pipeline:{name}"):
+        fn(params)
+    return metrics.snapshot()
+
+def run_pipeline(stages, names=None, params=None, workers=2, fresh=False):
+    """
+    Run the selected stages (default: every default stage) respecting their
+    dependencies, up to `workers` at a time. Stages that aren't selected are
+    treated as done, but ordering through them is kept: a selected stage
+    waits for every selected stage upstream of it. Unless fresh,
+    an unfinished previous run with the same selection and params is
+    resumed. Raises RuntimeError listing the stages that failed or were held
+    back.
+    """
+    from db.session import SessionLocal, engine
+    params = params or {}
+    plan = select_stages(stages, names)
+    selected = {s.name for s in plan}
+    deps = effective_deps(stages, selected)
+    by_name = {s.name: s for s in plan}
+    key = run_key(selected, params)
+
+    session = SessionLocal()
+    try:
+        run_id, done = (None, set()) if fresh else resume_state(session, key, selected)
+    finally:
+        session.close()
+    if run_id is None:
+        run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%fZ")
+        print(f"Pipeline run {run_id}: {', '.join(s.name for s in plan)}")
+    else:
+        print(f"Resuming pipeline run {run_id}; already done: {', '.join(sorted(done)) or 'nothing'}")
+
+    pending = [s.name for s in plan if s.name not in done]
+    failed  = set()
+    running = {}
+    engine.dispose()  # don't share pooled connections with forked workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        while pending or running:
+            # Stages behind a failure can't run in this invocation
+            for name in [n for n in pending if any(d in failed for d in deps[n])]:
+                pending.remove(name)
+                failed.add(name)
+                record(run_id, key, name, SKIPPED, "dependency failed")
+                print(f"  ⏭ {name} skipped: a dependency failed")
+            for name in [n for n in pending if all(d in done for d in deps[n])]:
+                pending.remove(name)
+                record(run_id, key, name, RUNNING)
+                print(f"  ▶ {name}")
+                running[pool.submit(_run_stage, name, by_name[name].fn, params)] = name
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    metrics.merge(future.result())
+                except Exception as e:
+                    failed.add(name)
+                    error = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
+                    record(run_id, key, name, FAILED, error[-4000:])
+                    print(f"  ✖ {name} failed: {e}")
+                else:
+                    done.add(name)
+                    record(run_id, key, name, SUCCEEDED)
+                    print(f"  ✔ {name}")
+
+    if failed:
+        raise RuntimeError(f"Pipeline run {run_id} incomplete; failed or skipped: {sorted(failed)}. "
+                           f"Re-run the same command to resume.")
+    print(f"Pipeline run {run_id} complete")
+    return run_id